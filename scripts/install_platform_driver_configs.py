@@ -78,36 +78,28 @@ def install_configs(input_directory, keep=False):
                            'delete_store',
                            PLATFORM_DRIVER).get(timeout=10)
 
+    configs = []
     with open("config") as f:
         print("Storing main configuration")
-        agent.vip.rpc.call(CONFIGURATION_STORE,
-                           'set_config',
-                           PLATFORM_DRIVER,
-                           'config',
-                           f.read(),
-                           config_type="json").get(timeout=10)
+        configs.append({"config_name": "config", "raw_contents": f.read(), "config_type": "json"})
 
     for name in glob.iglob("registry_configs/*"):
         with open(name) as f:
             print("Storing configuration:", name)
-            agent.vip.rpc.call(CONFIGURATION_STORE,
-                               'set_config',
-                               PLATFORM_DRIVER,
-                               name,
-                               f.read(),
-                               config_type="csv").get(timeout=10)
+            configs.append({"config_name": name, "raw_contents": f.read(), "config_type": "csv"})
 
     for dir_path, _, files in os.walk("devices"):
         for file_name in files:
             name = os.path.join(dir_path, file_name)
             with open(name) as f:
                 print("Storing configuration:", name)
-                agent.vip.rpc.call(CONFIGURATION_STORE,
-                                   'set_config',
-                                   PLATFORM_DRIVER,
-                                   name,
-                                   f.read(),
-                                   config_type="json").get(timeout=10)
+                configs.append({"config_name": name, "raw_contents": f.read(), "config_type": "json"})
+
+    # Store everything as one change so the Platform Driver is only updated once.
+    agent.vip.rpc.call(CONFIGURATION_STORE,
+                       'set_configs',
+                       PLATFORM_DRIVER,
+                       configs).get(timeout=60)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2023 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+"""ZAP authentication rate benchmark.
+
+Builds an auth entry list of ``--entries`` CURVE entries (plus a few regex
+entries, as found on platforms with remote instances and web users) and
+measures how many connection authentications per second the ZAP handler's
+lookup can perform, compared to the previous scan of every entry::
+
+    python auth_benchmark.py --entries 5000 --connections 20000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+from volttron.platform import jsonapi
+from volttron.platform.auth.auth_entry import AuthEntry, AuthEntryIndex
+from volttron.platform.auth.auth_protocols.auth_zmq import ZMQServerAuthentication
+from volttron.platform.auth.auth_utils import dump_user
+from volttron.platform.vip.socket import encode_key
+
+
+def build_entries(count, regex_count):
+    entries = [AuthEntry(credentials=encode_key(os.urandom(32)), user_id="agent{}".format(i),
+                         capabilities=["edit_config_store"])
+               for i in range(count)]
+    entries.extend(AuthEntry(credentials="/{}.*/".format(chr(ord('a') + i)), address="/10\\.0\\..*/",
+                             user_id="remote{}".format(i))
+                   for i in range(regex_count))
+    entries.sort()
+    return entries
+
+
+def linear_authenticate(entries, domain, address, mechanism, credentials):
+    for entry in entries:
+        if entry.match(domain, address, mechanism, credentials):
+            return entry.user_id or dump_user(domain, address, mechanism, *credentials[:1])
+
+
+def run(entries, connections):
+    # Only the attributes used by ZMQServerAuthentication.authenticate.
+    auth_service = SimpleNamespace(allow_any=False, aip=None, auth_entry_index=AuthEntryIndex(entries))
+    authentication = ZMQServerAuthentication.__new__(ZMQServerAuthentication)
+    authentication.auth_service = auth_service
+
+    requests = [("vip", "127.0.0.1:{}".format(i), "CURVE", [random.choice(entries).credentials])
+                for i in range(connections)]
+
+    start = time.perf_counter()
+    for request in requests:
+        linear_authenticate(entries, *request)
+    linear_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for request in requests:
+        authentication.authenticate(*request)
+    indexed_elapsed = time.perf_counter() - start
+
+    return {"entries": len(entries),
+            "connections": connections,
+            "linear_per_second": connections / linear_elapsed,
+            "indexed_per_second": connections / indexed_elapsed,
+            "speedup": linear_elapsed / indexed_elapsed}
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description="Measure ZAP authentication lookups per second.")
+    parser.add_argument('--entries', type=int, default=5000,
+                        help='number of CURVE auth entries')
+    parser.add_argument('--regex-entries', type=int, default=5,
+                        help='number of entries with regex credentials')
+    parser.add_argument('--connections', type=int, default=5000,
+                        help='number of authentications to time')
+    args = parser.parse_args(argv[1:])
+
+    entries = build_entries(args.entries, args.regex_entries)
+    print(jsonapi.dumps(run(entries, args.connections), indent=4))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2023 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+"""Self contained fake driver scale benchmark.
+
+Starts a throw away local platform, configures the platform driver with
+``--devices`` fake devices of ``--points`` points each, installs a SQLite
+historian and ``--subscribers`` listening agents, then measures for
+``--duration`` seconds:
+
+* scrape jitter - deviation of the arrival interval of each device's "all"
+  publish from the configured scrape interval,
+* publish to subscriber latency,
+* publish to historian latency - time until a scraped value can be queried
+  back from the historian,
+* CPU used by the platform process (router and platform services),
+* messages per second delivered to the subscribers.
+
+The results are printed (or written to ``--output``) as JSON so runs can be
+compared before and after a performance change::
+
+    python benchmark.py --devices 200 --points 18 --subscribers 2 --duration 120
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+import gevent
+import psutil
+
+from volttron.platform import get_services_core, jsonapi
+from volttron.platform.agent import utils
+from volttron.platform.agent.known_identities import CONFIGURATION_STORE, PLATFORM_DRIVER, PLATFORM_HISTORIAN
+from volttron.platform.messaging import headers as headers_mod
+from volttron.platform.messaging import topics
+from volttron.platform.vip.agent import Agent
+from volttrontesting.utils.platformwrapper import PlatformWrapper
+from volttrontesting.utils.utils import get_rand_vip
+
+REGISTRY_HEADER = "Point Name,Volttron Point Name,Units,Units Details,Writable,Starting Value,Type,Notes\n"
+REGISTRY_ROW = "Point{0},Point{0},F,-100 to 300,FALSE,{1},float,Benchmark point\n"
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """Return a dictionary of the requested percentiles of values plus count, mean and max."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    result = {"count": len(ordered),
+              "mean": sum(ordered) / len(ordered),
+              "max": ordered[-1]}
+    for point in points:
+        index = min(len(ordered) - 1, int(round(point / 100.0 * (len(ordered) - 1))))
+        result["p{}".format(point)] = ordered[index]
+    return result
+
+
+def build_registry(point_count):
+    return REGISTRY_HEADER + "".join(REGISTRY_ROW.format(i, i % 100) for i in range(point_count))
+
+
+def build_device_config(interval):
+    return {"driver_config": {},
+            "driver_type": "fakedriver",
+            "registry_config": "config://benchmark.csv",
+            "timezone": "UTC",
+            "interval": interval}
+
+
+class BenchmarkSubscriber(Agent):
+    """Records arrival time, delivery latency and inter-arrival jitter of device "all" publishes."""
+
+    def __init__(self, interval, **kwargs):
+        super(BenchmarkSubscriber, self).__init__(**kwargs)
+        self.interval = interval
+        self.recording = False
+        self.message_count = 0
+        self.latencies = []
+        self.jitter = []
+        self._last_arrival = {}
+
+    def on_message(self, peer, sender, bus, topic, headers, message):
+        now = time.time()
+        if not self.recording:
+            return
+        self.message_count += 1
+        if not topic.endswith('/' + topics.DRIVER_TOPIC_ALL):
+            return
+        published = utils.parse_timestamp_string(headers[headers_mod.TIMESTAMP])
+        self.latencies.append(now - published.timestamp())
+        last = self._last_arrival.get(topic)
+        if last is not None:
+            self.jitter.append(abs((now - last) - self.interval))
+        self._last_arrival[topic] = now
+
+
+class BenchmarkRunner(object):
+
+    def __init__(self, devices, points, subscribers, interval, duration, driver_scrape_interval,
+                 historian_sample, historian_poll):
+        self.devices = devices
+        self.points = points
+        self.subscriber_count = subscribers
+        self.interval = interval
+        self.duration = duration
+        self.driver_scrape_interval = driver_scrape_interval
+        self.historian_sample = historian_sample
+        self.historian_poll = historian_poll
+        self.wrapper = None
+        self.control = None
+        self.subscribers = []
+        self.historian_latencies = []
+
+    def setup(self):
+        self.wrapper = PlatformWrapper(messagebus='zmq', ssl_auth=False, auth_enabled=False)
+        self.wrapper.startup_platform(vip_address=get_rand_vip())
+        self.control = self.wrapper.build_agent(identity="benchmark.control")
+
+        database = os.path.join(self.wrapper.volttron_home, "benchmark.sqlite")
+        self.wrapper.install_agent(agent_dir=get_services_core("SQLHistorian"),
+                                   config_file={"connection": {"type": "sqlite",
+                                                               "params": {"database": database}}},
+                                   vip_identity=PLATFORM_HISTORIAN,
+                                   start=True)
+
+        for i in range(self.subscriber_count):
+            agent = self.wrapper.build_agent(identity="benchmark.subscriber{}".format(i),
+                                             agent_class=BenchmarkSubscriber,
+                                             interval=self.interval)
+            agent.vip.pubsub.subscribe('pubsub', topics.DRIVER_TOPIC_BASE, agent.on_message).get(timeout=10)
+            self.subscribers.append(agent)
+
+        self._set_config("benchmark.csv", build_registry(self.points), "csv")
+        self._set_config("config", {"driver_scrape_interval": self.driver_scrape_interval,
+                                    "publish_breadth_first_all": False,
+                                    "publish_depth_first": False,
+                                    "publish_breadth_first": False}, "json")
+        device_config = build_device_config(self.interval)
+        for i in range(self.devices):
+            self._set_config(self._device_config_name(i), device_config, "json")
+
+        self.wrapper.install_agent(agent_dir=get_services_core("PlatformDriverAgent"),
+                                   config_file={}, vip_identity=PLATFORM_DRIVER, start=True)
+
+    def _set_config(self, name, contents, config_type):
+        if not isinstance(contents, str):
+            contents = jsonapi.dumps(contents)
+        self.control.vip.rpc.call(CONFIGURATION_STORE, "set_config", PLATFORM_DRIVER, name, contents,
+                                  config_type=config_type, trigger_callback=False,
+                                  send_update=False).get(timeout=30)
+
+    @staticmethod
+    def _device_config_name(index):
+        return "devices/benchmark/device{}".format(index)
+
+    def _poll_historian(self):
+        """Record the delay between a scrape and the scraped value becoming queryable from the historian."""
+        sample = min(self.historian_sample, self.devices)
+        query_topics = ["benchmark/device{}/Point0".format(i) for i in range(sample)]
+        last_seen = {}
+        while True:
+            for topic in query_topics:
+                try:
+                    result = self.control.vip.rpc.call(PLATFORM_HISTORIAN, "query", topic=topic, count=1,
+                                                       order="LAST_TO_FIRST").get(timeout=10)
+                except Exception:
+                    continue
+                values = result.get("values") if result else None
+                if not values:
+                    continue
+                timestamp = values[0][0]
+                if last_seen.get(topic) != timestamp:
+                    if topic in last_seen:
+                        published = utils.parse_timestamp_string(timestamp).timestamp()
+                        self.historian_latencies.append(time.time() - published)
+                    last_seen[topic] = timestamp
+            gevent.sleep(self.historian_poll)
+
+    def run(self):
+        # Let every device complete at least one scrape before measuring.
+        gevent.sleep(self.interval + self.devices * self.driver_scrape_interval + 5)
+
+        process = psutil.Process(self.wrapper.p_process.pid)
+        cpu_start = process.cpu_times()
+        for agent in self.subscribers:
+            agent.recording = True
+        poller = gevent.spawn(self._poll_historian)
+        start = time.time()
+
+        gevent.sleep(self.duration)
+
+        elapsed = time.time() - start
+        for agent in self.subscribers:
+            agent.recording = False
+        poller.kill()
+        cpu_end = process.cpu_times()
+
+        try:
+            scrape_stats = self.control.vip.rpc.call(PLATFORM_DRIVER, "get_scrape_stats").get(timeout=30)
+        except Exception:
+            scrape_stats = {}
+
+        return self._report(elapsed, cpu_start, cpu_end, scrape_stats)
+
+    def _report(self, elapsed, cpu_start, cpu_end, scrape_stats):
+        cpu_seconds = (cpu_end.user + cpu_end.system) - (cpu_start.user + cpu_start.system)
+        messages = sum(agent.message_count for agent in self.subscribers)
+        latencies = [latency for agent in self.subscribers for latency in agent.latencies]
+        jitter = [value for agent in self.subscribers for value in agent.jitter]
+
+        totals = defaultdict(int)
+        for stats in scrape_stats.values():
+            for key in ("scrapes", "failures", "overruns"):
+                totals[key] += stats[key]
+
+        return {"parameters": {"devices": self.devices,
+                               "points": self.points,
+                               "subscribers": self.subscriber_count,
+                               "interval": self.interval,
+                               "driver_scrape_interval": self.driver_scrape_interval,
+                               "duration": elapsed},
+                "scrape_jitter": percentiles(jitter),
+                "publish_latency": percentiles(latencies),
+                "historian_latency": percentiles(self.historian_latencies),
+                "router_cpu_percent": 100.0 * cpu_seconds / elapsed,
+                "messages_per_second": messages / elapsed,
+                "driver": dict(totals)}
+
+    def teardown(self):
+        for agent in self.subscribers:
+            agent.core.stop()
+        if self.control is not None:
+            self.control.core.stop()
+        if self.wrapper is not None:
+            self.wrapper.shutdown_platform()
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description="Run a local fake driver scale benchmark and report JSON results.")
+    parser.add_argument('--devices', type=int, default=100,
+                        help='number of fake devices')
+    parser.add_argument('--points', type=int, default=18,
+                        help='number of points on each fake device')
+    parser.add_argument('--subscribers', type=int, default=1,
+                        help='number of agents subscribed to all device publishes')
+    parser.add_argument('--interval', type=float, default=10.0,
+                        help='scrape interval of every device in seconds')
+    parser.add_argument('--driver-scrape-interval', type=float, default=0.02,
+                        help='interval between individual device scrapes')
+    parser.add_argument('--duration', type=float, default=60.0,
+                        help='length of the measurement in seconds')
+    parser.add_argument('--historian-sample', type=int, default=10,
+                        help='number of devices polled from the historian to measure latency')
+    parser.add_argument('--historian-poll', type=float, default=0.2,
+                        help='historian polling period in seconds')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    args = parser.parse_args(argv[1:])
+
+    runner = BenchmarkRunner(args.devices, args.points, args.subscribers, args.interval, args.duration,
+                             args.driver_scrape_interval, args.historian_sample, args.historian_poll)
+    try:
+        runner.setup()
+        results = runner.run()
+    finally:
+        runner.teardown()
+
+    output = jsonapi.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
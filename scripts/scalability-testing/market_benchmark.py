@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2023 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+
+"""Market clearing intersection benchmark.
+
+Builds a demand and a supply curve of ``--points`` points each, crossing in
+the middle, and times ``PolyLine.intersection`` (as called by the market
+service's ``OfferManager.settle``) using the sweep over segments with
+overlapping prices, compared to the previous comparison of every pair of
+segments::
+
+    python market_benchmark.py --points 10000
+"""
+
+import argparse
+import sys
+import time
+
+from volttron.platform import jsonapi
+from volttron.platform.agent.base_market_agent.point import Point
+from volttron.platform.agent.base_market_agent.poly_line import PolyLine
+
+
+def build_curve(count, demand):
+    curve = PolyLine()
+    curve.extend([Point(i, (count - i if demand else i) * 100.0 / count) for i in range(count)])
+    return curve
+
+
+def run(count):
+    demand = build_curve(count, True)
+    supply = build_curve(count, False)
+
+    start = time.perf_counter()
+    sweep_segments = PolyLine.sweep_intersects(demand.points, supply.points)
+    sweep_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scan_segments = PolyLine.scan_intersects(demand.points, supply.points)
+    scan_elapsed = time.perf_counter() - start
+
+    assert sweep_segments == scan_segments
+    return {"points": count,
+            "intersection": PolyLine.intersection(demand, supply),
+            "scan_seconds": scan_elapsed,
+            "sweep_seconds": sweep_elapsed,
+            "speedup": scan_elapsed / sweep_elapsed}
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description="Time supply and demand curve intersection.")
+    parser.add_argument('--points', type=int, default=10000,
+                        help='number of points on each curve')
+    args = parser.parse_args(argv[1:])
+
+    print(jsonapi.dumps(run(args.points), indent=4))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
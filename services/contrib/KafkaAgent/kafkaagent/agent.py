@@ -5,8 +5,11 @@ import sys
 import datetime
 from dateutil.parser import parse
 import multiprocessing
-import ast
 import random
+import threading
+from collections import defaultdict
+
+import gevent
 
 # kafka
 from kafka import KafkaConsumer, KafkaProducer
@@ -19,7 +22,18 @@ from volttron.platform import jsonapi
 
 utils.setup_logging()
 _log = logging.getLogger(__name__)
-__version__ = "0.1"
+__version__ = "0.2"
+
+# Producer defaults: wait up to linger_ms to fill batches of up to batch_size bytes before sending.
+DEFAULT_PRODUCER_LINGER_MS = 5
+DEFAULT_PRODUCER_BATCH_SIZE = 16384
+# Messages sent to the producer but not yet acknowledged by the broker before send_to_broker waits for delivery.
+DEFAULT_MAX_PENDING_MESSAGES = 10000
+# Seconds to wait for the producer to deliver its batches when max_pending_messages is reached or the agent stops.
+DEFAULT_PRODUCER_FLUSH_TIMEOUT = 10
+# Consumer defaults: block up to poll_timeout_ms waiting for records and return at most max_poll_records per poll.
+DEFAULT_CONSUMER_POLL_TIMEOUT_MS = 1000
+DEFAULT_CONSUMER_MAX_POLL_RECORDS = 500
 
 
 def kafka_agent(config_path, **kwargs):
@@ -42,6 +56,13 @@ def kafka_agent(config_path, **kwargs):
     kafka_broker_port = config.get('kafka_broker_port')
     kafka_producer_topic = config.get('kafka_producer_topic')
     kafka_consumer_topic = config.get('kafka_consumer_topic')
+    producer_linger_ms = config.get('producer_linger_ms', DEFAULT_PRODUCER_LINGER_MS)
+    producer_batch_size = config.get('producer_batch_size', DEFAULT_PRODUCER_BATCH_SIZE)
+    producer_compression_type = config.get('producer_compression_type')
+    max_pending_messages = config.get('max_pending_messages', DEFAULT_MAX_PENDING_MESSAGES)
+    producer_flush_timeout = config.get('producer_flush_timeout', DEFAULT_PRODUCER_FLUSH_TIMEOUT)
+    consumer_poll_timeout_ms = config.get('consumer_poll_timeout_ms', DEFAULT_CONSUMER_POLL_TIMEOUT_MS)
+    consumer_max_poll_records = config.get('consumer_max_poll_records', DEFAULT_CONSUMER_MAX_POLL_RECORDS)
 
     if 'all' in services_topic_list:
         services_topic_list = [topics.DRIVER_TOPIC_BASE, topics.LOGGER_BASE,
@@ -52,6 +73,13 @@ def kafka_agent(config_path, **kwargs):
                       kafka_broker_port,
                       kafka_producer_topic,
                       kafka_consumer_topic,
+                      producer_linger_ms=producer_linger_ms,
+                      producer_batch_size=producer_batch_size,
+                      producer_compression_type=producer_compression_type,
+                      max_pending_messages=max_pending_messages,
+                      producer_flush_timeout=producer_flush_timeout,
+                      consumer_poll_timeout_ms=consumer_poll_timeout_ms,
+                      consumer_max_poll_records=consumer_max_poll_records,
                       **kwargs)
 
 class KafkaAgent(Agent):
@@ -75,12 +103,20 @@ class KafkaAgent(Agent):
             kafka_broker_port (str): Kafka Broker port
             kafka_producer_topic (str): Topic for messaging from kafka broker to VOLTTRON
             kafka_consumer_topic (str): Topic for messaging from VOLTTRON to Cloud
+            producer_linger_ms (int): Time the producer waits to fill a batch
+            producer_batch_size (int): Maximum size in bytes of a producer batch
+            producer_compression_type (str): Producer batch compression ('gzip', 'snappy', 'lz4' or None)
+            max_pending_messages (int): Unacknowledged messages before waiting for delivery
+            producer_flush_timeout (float): Seconds to wait for delivery
+            consumer_poll_timeout_ms (int): Time a consumer poll waits for records
+            consumer_max_poll_records (int): Maximum records returned by a consumer poll
 
         Returns:
             None
 
         Note:
             Version 0.1: Add - Function 1, 2, 3, 4
+            Version 0.2: Batched producer with delivery callbacks, long poll consumer
     '''
 
     '''
@@ -100,6 +136,13 @@ class KafkaAgent(Agent):
                  kafka_broker_port,
                  kafka_producer_topic,
                  kafka_consumer_topic,
+                 producer_linger_ms=DEFAULT_PRODUCER_LINGER_MS,
+                 producer_batch_size=DEFAULT_PRODUCER_BATCH_SIZE,
+                 producer_compression_type=None,
+                 max_pending_messages=DEFAULT_MAX_PENDING_MESSAGES,
+                 producer_flush_timeout=DEFAULT_PRODUCER_FLUSH_TIMEOUT,
+                 consumer_poll_timeout_ms=DEFAULT_CONSUMER_POLL_TIMEOUT_MS,
+                 consumer_max_poll_records=DEFAULT_CONSUMER_MAX_POLL_RECORDS,
                  **kwargs):
         '''
             Function:
@@ -125,12 +168,23 @@ class KafkaAgent(Agent):
         self.kafka_broker_port = kafka_broker_port
         self.kafka_producer_topic = kafka_producer_topic
         self.kafka_consumer_topic = kafka_consumer_topic
+        self.max_pending_messages = max_pending_messages
+        self.producer_flush_timeout = producer_flush_timeout
+        self.consumer_poll_timeout_ms = consumer_poll_timeout_ms
+        self.consumer_max_poll_records = consumer_max_poll_records
 
         self.default_config = {"services_topic_list": services_topic_list,
                                "kafka_broker_ip": kafka_broker_ip,
                                "kafka_broker_port": kafka_broker_port,
                                "kafka_producer_topic": kafka_producer_topic,
-                               "kafka_consumer_topic": kafka_consumer_topic
+                               "kafka_consumer_topic": kafka_consumer_topic,
+                               "producer_linger_ms": producer_linger_ms,
+                               "producer_batch_size": producer_batch_size,
+                               "producer_compression_type": producer_compression_type,
+                               "max_pending_messages": max_pending_messages,
+                               "producer_flush_timeout": producer_flush_timeout,
+                               "consumer_poll_timeout_ms": consumer_poll_timeout_ms,
+                               "consumer_max_poll_records": consumer_max_poll_records
                                }
 
         _log.info('default_config: {}'.format(self.default_config))
@@ -153,8 +207,20 @@ class KafkaAgent(Agent):
         # produce json messages
         self.kafka_consumer_addr = '{0}:{1}'.format(self.kafka_broker_ip, self.kafka_broker_port)
         self.producer = KafkaProducer(bootstrap_servers=[self.kafka_consumer_addr],
-                        value_serializer=lambda v: jsonapi.dumps(v).encode('utf-8')
-                         )
+                                      value_serializer=lambda v: jsonapi.dumps(v).encode('utf-8'),
+                                      linger_ms=producer_linger_ms,
+                                      batch_size=producer_batch_size,
+                                      compression_type=producer_compression_type)
+
+        # Messages handed to the producer and not yet acknowledged or failed.
+        # Delivery callbacks run on the producer's sender thread, the counters are guarded by _counter_lock.
+        self._counter_lock = threading.Lock()
+        self.pending_messages = 0
+        self.delivered_messages = 0
+        self.failed_messages = 0
+        self._consumer_greenlet = None
+        # Poll running in the hub threadpool, kafka-python blocks in select calls gevent does not patch.
+        self._poll = None
 
     # configuration callbacks
     # lnke : http://volttron.readthedocs.io/en/4.0.1/devguides/agent_development/Agent-Configuration-Store.html
@@ -203,12 +269,50 @@ class KafkaAgent(Agent):
                 'description': 'message from VOLTTRON to KafkaBroker',
                 'message': message
                 }
+            # Backpressure: wait for the broker to catch up rather than buffering without bound.
+            if self.pending_messages >= self.max_pending_messages:
+                _log.warning('Send_to_broker: {} messages pending delivery, flushing producer'.format(
+                    self.pending_messages))
+                self.flush_producer()
+                if self.pending_messages >= self.max_pending_messages:
+                    _log.error('Send_to_broker: broker not keeping up, dropping message from {}'.format(topic))
+                    return
+
             # Send command to Consumer(in Cloud)
-            self.producer.send(self.kafka_consumer_topic, msg)
+            # The producer batches messages in the background, delivery is reported to the callbacks.
+            with self._counter_lock:
+                self.pending_messages += 1
+            future = self.producer.send(self.kafka_consumer_topic, msg)
+            future.add_callback(self._on_send_success)
+            future.add_errback(self._on_send_error)
 
         except Exception as e:
             _log.error('Send_to_broker: {}'.format(e))
 
+    def flush_producer(self):
+        '''
+            Function: Wait up to producer_flush_timeout seconds for the producer to deliver its batches.
+            Args: None
+            Returns: None
+            Note:
+                The flush waits on a thread event, so it runs in the hub threadpool to not block other greenlets.
+        '''
+        try:
+            gevent.get_hub().threadpool.spawn(self.producer.flush, timeout=self.producer_flush_timeout).get()
+        except Exception as e:
+            _log.error('Flush_producer: {}'.format(e))
+
+    def _on_send_success(self, record_metadata):
+        with self._counter_lock:
+            self.pending_messages -= 1
+            self.delivered_messages += 1
+
+    def _on_send_error(self, exc):
+        with self._counter_lock:
+            self.pending_messages -= 1
+            self.failed_messages += 1
+        _log.error('Send_to_broker: delivery failed: {}'.format(exc))
+
     @Core.receiver("onstart")
     def on_message_topic(self, sender, **kwargs):
         '''
@@ -246,46 +350,75 @@ class KafkaAgent(Agent):
         for topic_subscriptions in self.services_topic_list:
             subscriber(topic_subscriptions, self.send_to_broker)
 
-    @Core.periodic(1)
-    def receive_from_broker(self):
+        self._consumer_greenlet = gevent.spawn(self.consume_from_broker)
+
+    @Core.receiver("onstop")
+    def on_stop(self, sender, **kwargs):
         '''
-            Function: Receive message from Kafka broker and Publish message to MessageBus.
-            Args: None
+            Function: Stop consuming and deliver the messages still batched in the producer.
+            Args: .
             Returns: None
-            Note: None
-            Created: SungonLee, 2017-10-20
-            Deleted: .
         '''
-        # partition type : nametuple
-        # if timeout_ms is 0, check that is there any message in broker imm
-        partition = self.consumer.poll(timeout_ms=0, max_records=None)
-
+        if self._consumer_greenlet is not None:
+            self._consumer_greenlet.kill()
+            self._consumer_greenlet = None
+        # The consumer is not thread safe, let a poll still running in the threadpool finish before closing it.
+        if self._poll is not None:
+            self._poll.wait(timeout=self.consumer_poll_timeout_ms / 1000.0 + 1)
+        self.flush_producer()
         try:
-            if len(partition) > 0:
-                for p in partition:
-                    for response in partition[p]:
-                        # _log.info('Receive_from_broker: {}'.format(response))
-                        # convert string to dictionary
-                        response_dict = ast.literal_eval(response.value)
-                        # _log.info('Receive_from_broker: Receive message from kafka broker message: {}'.format(response_dict))
-                        topic = response.topic
-                        # sender = response_dict['sender']
-                        headers = {
-                            'date': str(datetime.datetime.now())
-                            }
-                        message = {
-                            # 'kafka_message_sender': sender,
-                            # 'kafka_message_receiver':'KafkaAgent',
-                            'message': response_dict
-                            }
-
-                        self.vip.pubsub.publish('pubsub', topic, headers, message)
-            else:
-                pass
-                # _log.info('Receive_from_broker: No receive message from kafka broker')
-
+            self.producer.close(timeout=self.producer_flush_timeout)
+            self.consumer.close()
         except Exception as e:
-            _log.error('Receive_from_broker: {}'.format(e))
+            _log.error('On_stop: {}'.format(e))
+
+    def consume_from_broker(self):
+        '''
+            Function: Long poll the Kafka broker until the agent stops.
+            Args: None
+            Returns: None
+            Note:
+                Each poll waits for up to consumer_poll_timeout_ms, so records are published as soon as they
+                arrive instead of on a fixed period.
+        '''
+        while True:
+            try:
+                self.receive_from_broker()
+            except Exception as e:
+                _log.error('Receive_from_broker: {}'.format(e))
+                gevent.sleep(1)
+
+    def receive_from_broker(self):
+        '''
+            Function: Receive messages from Kafka broker and Publish them to MessageBus.
+            Args: None
+            Returns: Number of records received
+            Note:
+                Records are JSON decoded. The records received from a Kafka topic in one poll are published
+                together as one message: {'messages': [record, ...]} on the topic with the same name.
+        '''
+        # partition type : dict of TopicPartition to list of ConsumerRecord
+        # The poll runs in the hub threadpool so waiting for records does not block the other greenlets.
+        self._poll = gevent.get_hub().threadpool.spawn(self.consumer.poll,
+                                                       timeout_ms=self.consumer_poll_timeout_ms,
+                                                       max_records=self.consumer_max_poll_records)
+        partition = self._poll.get()
+        count = 0
+        batches = defaultdict(list)
+        for p in partition:
+            for response in partition[p]:
+                count += 1
+                try:
+                    batches[response.topic].append(jsonapi.loads(response.value))
+                except (TypeError, ValueError) as e:
+                    _log.error('Receive_from_broker: Could not decode record from {}: {}'.format(response.topic, e))
+
+        headers = {
+            'date': str(datetime.datetime.now())
+            }
+        for topic, records in batches.items():
+            self.vip.pubsub.publish('pubsub', topic, headers, {'messages': records})
+        return count
 
 def main(argv=sys.argv):
     '''Main method called to start the agent.'''
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2023 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+
+"""In-process stand-in for a Kafka broker.
+
+Provides the parts of the kafka-python ``KafkaProducer`` and
+``KafkaConsumer`` interfaces used by the KafkaAgent, so the agent's producer
+and consumer paths can be tested without a running broker::
+
+    broker = InProcessBroker()
+    monkeypatch.setattr(agent_module, 'KafkaProducer', broker.producer)
+    monkeypatch.setattr(agent_module, 'KafkaConsumer', broker.consumer)
+
+Like the real producer, sent records are batched and only reach the broker
+when the producer is flushed or a batch of ``batch_size`` records is full.
+Batches are delivered, and their delivery callbacks fired, on the producer's
+own sender thread. Clearing ``broker.online`` holds deliveries back, so
+``flush(timeout)`` raises ``TimeoutError`` like the real producer does when
+the broker is unreachable. Like the real consumer, a poll with no records
+blocks the calling thread for up to ``timeout_ms``.
+"""
+
+import threading
+from collections import defaultdict, namedtuple
+
+TopicPartition = namedtuple('TopicPartition', ['topic', 'partition'])
+ConsumerRecord = namedtuple('ConsumerRecord', ['topic', 'partition', 'offset', 'value'])
+RecordMetadata = namedtuple('RecordMetadata', ['topic', 'partition', 'offset'])
+
+
+class FutureRecordMetadata(object):
+    def __init__(self):
+        self._callbacks = []
+        self._errbacks = []
+
+    def add_callback(self, fn):
+        self._callbacks.append(fn)
+        return self
+
+    def add_errback(self, fn):
+        self._errbacks.append(fn)
+        return self
+
+    def success(self, metadata):
+        for fn in self._callbacks:
+            fn(metadata)
+
+    def failure(self, exc):
+        for fn in self._errbacks:
+            fn(exc)
+
+
+class InProcessBroker(object):
+    def __init__(self, batch_size=100):
+        self.batch_size = batch_size
+        self.topics = defaultdict(list)  # Raw record values by topic.
+        self.fail_topics = set()  # Sends to these topics fail on delivery.
+        self.condition = threading.Condition()
+        self.online = threading.Event()  # Deliveries wait while cleared.
+        self.online.set()
+        self.producers = []
+
+    def producer(self, **configs):
+        producer = InProcessProducer(self, **configs)
+        self.producers.append(producer)
+        return producer
+
+    def consumer(self, **configs):
+        return InProcessConsumer(self, **configs)
+
+    def append(self, topic, value):
+        with self.condition:
+            self.topics[topic].append(value)
+            self.condition.notify_all()
+        return RecordMetadata(topic, 0, len(self.topics[topic]) - 1)
+
+    def close(self):
+        self.online.set()
+        for producer in self.producers:
+            producer.close()
+
+
+class InProcessProducer(object):
+    def __init__(self, broker, value_serializer=None, **configs):
+        self.broker = broker
+        self.value_serializer = value_serializer
+        self.configs = configs
+        self.buffer = []
+        self.flushes = 0
+        self.closed = False
+        self._condition = threading.Condition()
+        self._send_now = False
+        self._in_flight = 0
+        self._sender = threading.Thread(target=self._run, daemon=True)
+        self._sender.start()
+
+    def send(self, topic, value):
+        if self.value_serializer is not None:
+            value = self.value_serializer(value)
+        future = FutureRecordMetadata()
+        with self._condition:
+            self.buffer.append((topic, value, future))
+            self._condition.notify_all()
+        return future
+
+    def flush(self, timeout=None):
+        with self._condition:
+            self.flushes += 1
+            self._send_now = True
+            self._condition.notify_all()
+            if not self._condition.wait_for(lambda: not self.buffer and not self._in_flight, timeout):
+                raise TimeoutError('Timeout after waiting for {} secs.'.format(timeout))
+
+    def close(self, timeout=None):
+        try:
+            self.flush(timeout)
+        finally:
+            with self._condition:
+                self.closed = True
+                self._condition.notify_all()
+            self._sender.join(timeout)
+
+    def _batch_ready(self):
+        return self.closed or (self.buffer and (self._send_now or len(self.buffer) >= self.broker.batch_size))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(self._batch_ready)
+                if self.closed:
+                    return
+                batch, self.buffer = self.buffer, []
+                self._send_now = False
+                self._in_flight = len(batch)
+            while not self.broker.online.wait(0.01):
+                if self.closed:
+                    return
+            for topic, value, future in batch:
+                if topic in self.broker.fail_topics:
+                    future.failure(Exception('Delivery to {} failed'.format(topic)))
+                else:
+                    future.success(self.broker.append(topic, value))
+            with self._condition:
+                self._in_flight = 0
+                self._condition.notify_all()
+
+
+class InProcessConsumer(object):
+    def __init__(self, broker, **configs):
+        self.broker = broker
+        self.configs = configs
+        self.subscription = []
+        self.positions = defaultdict(int)
+        self.closed = False
+
+    def subscribe(self, topics):
+        self.subscription = list(topics)
+
+    def poll(self, timeout_ms=0, max_records=None):
+        with self.broker.condition:
+            self.broker.condition.wait_for(self._available, timeout_ms / 1000.0)
+        records = {}
+        for topic in self.subscription:
+            values = self.broker.topics[topic][self.positions[topic]:]
+            if max_records is not None:
+                values = values[:max_records - sum(len(r) for r in records.values())]
+            if values:
+                start = self.positions[topic]
+                records[TopicPartition(topic, 0)] = [ConsumerRecord(topic, 0, start + i, value)
+                                                     for i, value in enumerate(values)]
+                self.positions[topic] += len(values)
+        return records
+
+    def _available(self):
+        return any(len(self.broker.topics[topic]) > self.positions[topic] for topic in self.subscription)
+
+    def close(self):
+        self.closed = True
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2023 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+
+import gevent
+import pytest
+
+try:
+    from kafkaagent import agent as kafka_agent_module
+except ImportError:
+    pytest.skip("kafka-python not installed.", allow_module_level=True)
+
+from volttron.platform import jsonapi
+from volttron.platform.vip.agent import Agent
+from volttrontesting.utils.utils import AgentMock
+
+from kafka_broker import InProcessBroker
+
+KafkaAgent = kafka_agent_module.KafkaAgent
+
+
+@pytest.fixture()
+def broker(monkeypatch):
+    broker = InProcessBroker(batch_size=100)
+    monkeypatch.setattr(kafka_agent_module, 'KafkaProducer', broker.producer)
+    monkeypatch.setattr(kafka_agent_module, 'KafkaConsumer', broker.consumer)
+    yield broker
+    broker.close()
+
+
+@pytest.fixture()
+def agent(broker):
+    KafkaAgent.__bases__ = (AgentMock.imitate(Agent, Agent()),)
+    return KafkaAgent(['devices'], '127.0.0.1', '9092', 'msg-to-volttron', 'msg-from-volttron',
+                      producer_linger_ms=20, max_pending_messages=3, producer_flush_timeout=0.2,
+                      consumer_poll_timeout_ms=100)
+
+
+def test_producer_config(agent):
+    assert agent.producer.configs['linger_ms'] == 20
+    assert agent.producer.configs['batch_size'] == kafka_agent_module.DEFAULT_PRODUCER_BATCH_SIZE
+
+
+def test_send_to_broker_batches_with_backpressure(agent, broker):
+    for i in range(7):
+        agent.send_to_broker('pubsub', 'sender', '', 'devices/campus/all', {}, [{'a': i}, {}])
+    # Records are only delivered in batches; reaching max_pending_messages flushes the producer.
+    assert agent.producer.flushes == 2
+    assert len(broker.topics['msg-from-volttron']) == 6
+    assert agent.pending_messages == 1
+    assert agent.delivered_messages == 6
+
+    agent.producer.flush()
+    assert agent.pending_messages == 0
+    assert [jsonapi.loads(v)['message'][0]['a'] for v in broker.topics['msg-from-volttron']] == list(range(7))
+
+
+def test_send_to_broker_drops_when_broker_unreachable(agent, broker):
+    broker.online.clear()
+    ticks = []
+
+    def tick():
+        while True:
+            ticks.append(1)
+            gevent.sleep(0.01)
+    ticker = gevent.spawn(tick)
+    try:
+        for i in range(4):
+            agent.send_to_broker('pubsub', 'sender', '', 'devices/campus/all', {}, [{'a': i}, {}])
+    finally:
+        ticker.kill()
+    # The backpressure flush times out in the threadpool without blocking the hub, the fourth message is dropped.
+    assert len(ticks) > 10
+    assert agent.pending_messages == 3
+
+    broker.online.set()
+    agent.producer.flush()
+    assert agent.pending_messages == 0
+    assert agent.delivered_messages == 3
+    assert len(broker.topics['msg-from-volttron']) == 3
+
+
+def test_send_to_broker_delivery_failure(agent, broker):
+    broker.fail_topics.add('msg-from-volttron')
+    agent.send_to_broker('pubsub', 'sender', '', 'devices/campus/all', {}, [{'a': 1}, {}])
+    agent.producer.flush()
+    assert agent.pending_messages == 0
+    assert agent.failed_messages == 1
+
+
+def test_receive_from_broker_publishes_batches(agent, broker):
+    producer = broker.producer(value_serializer=lambda v: jsonapi.dumps(v).encode('utf-8'))
+    for i in range(3):
+        producer.send('msg-to-volttron', {'value': i})
+    producer.flush()
+    broker.append('msg-to-volttron', b'not json')
+
+    assert agent.receive_from_broker() == 4
+    # One publish for all of the records of the topic, the undecodable record is dropped.
+    agent.vip.pubsub.publish.assert_called_once()
+    peer, topic, headers, message = agent.vip.pubsub.publish.call_args[0]
+    assert topic == 'msg-to-volttron'
+    assert message == {'messages': [{'value': 0}, {'value': 1}, {'value': 2}]}
+
+    agent.vip.pubsub.publish.reset_mock()
+    assert agent.receive_from_broker() == 0
+    agent.vip.pubsub.publish.assert_not_called()
+
+
+def test_receive_from_broker_does_not_block_hub(agent):
+    agent.consumer_poll_timeout_ms = 300
+    ticks = []
+
+    def tick():
+        while True:
+            ticks.append(1)
+            gevent.sleep(0.01)
+    ticker = gevent.spawn(tick)
+    try:
+        # The poll waits for records in the threadpool while other greenlets keep running.
+        assert agent.receive_from_broker() == 0
+    finally:
+        ticker.kill()
+    assert len(ticks) > 10
@@ -6,7 +6,7 @@ import sys
 import re
 import zlib
 import base64
-from collections import defaultdict
+from collections import Counter, OrderedDict
 
 from volttron.platform.agent import utils
 from volttron.platform.vip.agent import Agent
@@ -29,10 +29,27 @@ class PrometheusScrapeAgent(Agent):
             self._config_dict = config_path
         else:
             self._config_dict = utils.load_config(config_path)
-        self._cache = defaultdict(dict)
         self._cache_time = self._config_dict.get('cache_timeout', 660)
-        self._tag_delimiter_re = self._config_dict.get('tag_delimiter_re',
-                                                       r"\s+|:|_|\.|/")
+        self._tag_delimiter_re = re.compile(
+            self._config_dict.get('tag_delimiter_re', r"\s+|:|_|\.|/"))
+        self._compression_level = self._config_dict.get('compression_level',
+                                                        1)
+        # (device, topic) -> [value, cached_time, exposition line]. Entries
+        # are kept in the order they were last seen so stale points can be
+        # expired from the front without looking at every series.
+        self._cache = OrderedDict()
+        # Formatted label prefixes, computed once per device and per topic.
+        # The number of cached points using each device and topic is counted
+        # so their labels are dropped when the last of those points expires.
+        self._device_labels = {}
+        self._topic_labels = {}
+        self._device_refs = Counter()
+        self._topic_refs = Counter()
+        # Bumped whenever the exposition body changes. The compressed body
+        # is only rebuilt when the generation differs from the cached one.
+        self._generation = 0
+        self._body_generation = None
+        self._body = None
 
     @Core.receiver("onstart")
     def _starting(self, sender, **kwargs):
@@ -50,44 +67,49 @@ class PrometheusScrapeAgent(Agent):
         return {"data": "another test and stuff", "otherdata": "more testing yo"}
 
     def scrape(self, env, data):
-        scrape_time = get_utc_seconds_from_epoch()
-        keys_to_delete = defaultdict(list)
-        if len(self._cache) > 0:
-            result = "# TYPE volttron_data gauge\n"
-            for device, device_topics in self._cache.items():
-                device_tags = device.replace("-", "_").split('/')
-                for topic, value in device_topics.items():
-                    if value[1] + self._cache_time > scrape_time:
-                        metric_props = re.split(self._tag_delimiter_re,
-                                                topic.lower())
-                        metric_tag_str = (
-                            "campus=\"{}\",building=\"{}\","
-                            "device=\"{}\",").format(*device_tags)
-                        for i, prop in enumerate(metric_props):
-                            metric_tag_str += "tag{}=\"{}\",".format(i, prop)
-                        result += "{}{{{}topic=\"{}\"}} {}\n".format(
-                            re.sub(" |/|-", "_", device), metric_tag_str,
-                            topic.replace(" ", "_"), value[0])
-                    else:
-                        try:
-                            keys_to_delete[device].append(topic)
-                        except Exception as e:
-                            _log.error("Could not delete stale topic")
-                            _log.exception(e)
-                        continue
-        else:
-            result = "#No Data to Scrape"
-        for device, delete_topics in keys_to_delete.items():
-            for topic in delete_topics:
-                del self._cache[device][topic]
-        gzip_compress = zlib.compressobj(9, zlib.DEFLATED,
-                                         zlib.MAX_WBITS | 16)
-        data = gzip_compress.compress(result) + gzip_compress.flush()
-
-        return "200 OK", base64.b64encode(data).decode('ascii'), [
+        self._expire_stale(get_utc_seconds_from_epoch())
+        if self._body_generation != self._generation:
+            if self._cache:
+                result = "# TYPE volttron_data gauge\n" + "".join(
+                    entry[2] for entry in self._cache.values())
+            else:
+                result = "#No Data to Scrape"
+            gzip_compress = zlib.compressobj(self._compression_level,
+                                             zlib.DEFLATED,
+                                             zlib.MAX_WBITS | 16)
+            data = gzip_compress.compress(result.encode('utf-8')) + \
+                gzip_compress.flush()
+            self._body = base64.b64encode(data).decode('ascii')
+            self._body_generation = self._generation
+
+        return "200 OK", self._body, [
             ('Content-Type', 'text/plain'),
             ('Content-Encoding', 'gzip')]
 
+    def _expire_stale(self, now):
+        """Remove points which have not been observed within cache_timeout."""
+        expired = 0
+        while self._cache:
+            key, entry = next(iter(self._cache.items()))
+            if entry[1] + self._cache_time > now:
+                break
+            del self._cache[key]
+            self._release_labels(*key)
+            expired += 1
+        if expired:
+            _log.debug("Expired {} stale points".format(expired))
+            self._generation += 1
+
+    def _release_labels(self, device, topic):
+        self._device_refs[device] -= 1
+        if not self._device_refs[device]:
+            del self._device_refs[device]
+            self._device_labels.pop(device, None)
+        self._topic_refs[topic] -= 1
+        if not self._topic_refs[topic]:
+            del self._topic_refs[topic]
+            self._topic_labels.pop(topic, None)
+
     def _clean_compat(self, sender, topic, headers, message):
         try:
             # 2.0 agents compatability layer makes sender == pubsub.compat so
@@ -194,11 +216,49 @@ class PrometheusScrapeAgent(Agent):
     def _add_to_cache(self, device, topic, value):
         cached_time = get_utc_seconds_from_epoch()
         try:
-            self._cache[device][topic] = (float(value), cached_time)
+            value = float(value)
         except:
             _log.error(
                 "Topic \"{}\" on device \"{}\" contained value that was not "
                 "castable as float".format(topic, device))
+            return
+
+        key = (device, topic)
+        entry = self._cache.get(key)
+        if entry is not None:
+            entry[1] = cached_time
+            self._cache.move_to_end(key)
+            if entry[0] == value:
+                return
+            entry[0] = value
+            entry[2] = self._format_line(device, topic, value)
+        else:
+            self._device_refs[device] += 1
+            self._topic_refs[topic] += 1
+            self._cache[key] = [value, cached_time,
+                                self._format_line(device, topic, value)]
+        self._generation += 1
+
+    def _format_line(self, device, topic, value):
+        device_labels = self._device_labels.get(device)
+        if device_labels is None:
+            device_tags = device.replace("-", "_").split('/')
+            device_tags += [""] * (3 - len(device_tags))
+            device_labels = (
+                "{}{{campus=\"{}\",building=\"{}\",device=\"{}\","
+            ).format(re.sub(" |/|-", "_", device), *device_tags)
+            self._device_labels[device] = device_labels
+
+        topic_labels = self._topic_labels.get(topic)
+        if topic_labels is None:
+            metric_props = self._tag_delimiter_re.split(topic.lower())
+            topic_labels = "".join(
+                "tag{}=\"{}\",".format(i, prop)
+                for i, prop in enumerate(metric_props))
+            topic_labels += "topic=\"{}\"}} ".format(topic.replace(" ", "_"))
+            self._topic_labels[topic] = topic_labels
+
+        return "{}{}{}\n".format(device_labels, topic_labels, value)
 
 
 def main(argv=sys.argv):
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2023 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+import base64
+import zlib
+
+import pytest
+
+from volttron.platform.vip.agent import Agent
+
+from prometheus_scrape import agent as prometheus_module
+
+PrometheusScrapeAgent = prometheus_module.PrometheusScrapeAgent
+
+
+class Clock(object):
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prometheus_module, 'get_utc_seconds_from_epoch', clock)
+    return clock
+
+
+@pytest.fixture()
+def agent(monkeypatch, clock):
+    # The cache does not use the message bus, skip connecting the agent.
+    monkeypatch.setattr(Agent, '__init__', lambda self, **kwargs: None)
+    return PrometheusScrapeAgent({'cache_timeout': 60})
+
+
+def _body(agent):
+    status, body, headers = agent.scrape({}, None)
+    assert status == "200 OK"
+    return body
+
+
+def _text(body):
+    return zlib.decompress(base64.b64decode(body), zlib.MAX_WBITS | 16).decode('utf-8')
+
+
+def test_expire_stale(agent, clock):
+    agent._add_to_cache('campus/building/old', 'Temperature', 1)
+    agent._add_to_cache('campus/building/old', 'Humidity', 1)
+    clock.now += 30
+    agent._add_to_cache('campus/building/new', 'Humidity', 2)
+
+    clock.now += 40
+    text = _text(_body(agent))
+    assert 'campus_building_new' in text
+    assert 'campus_building_old' not in text
+    assert list(agent._cache) == [('campus/building/new', 'Humidity')]
+    # Labels of the expired point are dropped with it.
+    assert list(agent._device_labels) == ['campus/building/new']
+    assert list(agent._topic_labels) == ['Humidity']
+    assert agent._device_refs == {'campus/building/new': 1}
+    assert agent._topic_refs == {'Humidity': 1}
+
+    clock.now += 30
+    assert _text(_body(agent)) == "#No Data to Scrape"
+    assert not agent._device_labels and not agent._topic_labels
+    assert not agent._device_refs and not agent._topic_refs
+
+
+def test_scrape_reuses_body(agent, clock):
+    agent._add_to_cache('campus/building/device', 'Temperature', 1)
+    body = _body(agent)
+    assert _body(agent) is body
+
+    # Seeing the same value again does not change the body.
+    clock.now += 10
+    agent._add_to_cache('campus/building/device', 'Temperature', 1.0)
+    assert _body(agent) is body
+
+    agent._add_to_cache('campus/building/device', 'Temperature', 2)
+    new_body = _body(agent)
+    assert new_body is not body
+    assert 'topic="Temperature"} 2.0\n' in _text(new_body)
+
+
+def test_add_to_cache_rebuilds_changed_lines(agent, monkeypatch):
+    formatted = []
+    format_line = agent._format_line
+
+    def record_format(device, topic, value):
+        formatted.append((device, topic, value))
+        return format_line(device, topic, value)
+    monkeypatch.setattr(agent, '_format_line', record_format)
+
+    agent._add_to_cache('campus/building/device', 'Temperature', 1)
+    agent._add_to_cache('campus/building/device', 'Temperature', '1')
+    agent._add_to_cache('campus/building/device', 'Temperature', 'not a number')
+    agent._add_to_cache('campus/building/device', 'Temperature', 3)
+    assert formatted == [('campus/building/device', 'Temperature', 1.0),
+                         ('campus/building/device', 'Temperature', 3.0)]
+    assert agent._cache[('campus/building/device', 'Temperature')][0] == 3.0
@@ -29,11 +29,13 @@ import time
 import gevent
 
 from volttron.platform.agent import utils
-from volttron.platform.agent.base_historian import BaseHistorian, add_timing_data_to_header
+from volttron.platform.agent.base_historian import (BaseHistorian, INSERT_ENCODINGS, add_timing_data_to_header,
+                                                    encode_insert_records)
 from volttron.platform.agent.known_identities import PLATFORM_HISTORIAN
 from volttron.platform.keystore import KnownHostsStore
 from volttron.platform.messaging import headers as headers_mod
 from volttron.platform.messaging.health import STATUS_BAD, Status
+from volttron.platform.jsonrpc import Error as RpcError, RemoteError
 from volttron.platform.vip.agent.utils import build_agent
 
 DATAMOVER_TIMEOUT_KEY = 'DATAMOVER_TIMEOUT_KEY'
@@ -63,7 +65,8 @@ class DataMover(BaseHistorian):
     """
 
     def __init__(self, destination_vip, destination_serverkey, destination_historian_identity=PLATFORM_HISTORIAN,
-                 remote_identity=None, **kwargs):
+                 remote_identity=None, insert_timeout=10, target_batch_time=2.0, min_batch_size=10,
+                 max_record_retries=3, compression=True, **kwargs):
         """
         :param destination_vip: vip address of the destination volttron
         instance
@@ -76,6 +79,15 @@ class DataMover(BaseHistorian):
         :param destination_historian_identity: vip identity of the
         destination historian. default is 'platform.historian'
         :param destination_instance_name: instance name of destination server
+        :param insert_timeout: seconds to wait for the destination historian
+        to accept a batch
+        :param target_batch_time: batch sizes are adapted so that sending a
+        batch takes about this many seconds
+        :param min_batch_size: smallest number of records sent in a batch
+        :param max_record_retries: number of times a record the destination
+        historian did not accept is sent again before it is dropped
+        :param compression: compress batches if the destination historian
+        supports it
         :param kwargs: additional arguments to be passed along to parent class
         """
         kwargs["process_loop_in_greenlet"] = True
@@ -86,14 +98,31 @@ class DataMover(BaseHistorian):
         self.destination_serverkey = destination_serverkey
         self.destination_historian_identity = destination_historian_identity
         self.remote_identity = remote_identity
+        self.insert_timeout = insert_timeout
+        self.target_batch_time = target_batch_time
+        self.min_batch_size = min_batch_size
+        self.max_record_retries = max_record_retries
+        self.compression = compression
         self._target_platform = None
+        # Encoding negotiated with the destination historian, None for
+        # uncompressed inserts. Negotiated again after a reconnect.
+        self._insert_encoding = None
+        self._encoding_negotiated = False
+        self._batch_size = None
+        # Record id -> number of times the destination did not accept it.
+        self._record_retries = {}
 
         self.local_message_bus = utils.get_messagebus()
         self.rmq_to_rmq_comm = False
         config = {"destination_vip":self.destination_vip,
                   "destination_serverkey": self.destination_serverkey,
                   "destination_historian_identity": self.destination_historian_identity,
-                  "remote_identity": self.remote_identity
+                  "remote_identity": self.remote_identity,
+                  "insert_timeout": self.insert_timeout,
+                  "target_batch_time": self.target_batch_time,
+                  "min_batch_size": self.min_batch_size,
+                  "max_record_retries": self.max_record_retries,
+                  "compression": self.compression
                   }
 
         self.update_default_config(config)
@@ -109,6 +138,13 @@ class DataMover(BaseHistorian):
         self.destination_historian_identity = str(configuration.get('destination_historian_identity',
                                                                     PLATFORM_HISTORIAN))
         self.remote_identity = configuration.get("remote_identity")
+        self.insert_timeout = float(configuration.get("insert_timeout", 10))
+        self.target_batch_time = float(configuration.get("target_batch_time", 2.0))
+        self.min_batch_size = max(1, int(configuration.get("min_batch_size", 10)))
+        self.max_record_retries = int(configuration.get("max_record_retries", 3))
+        self.compression = bool(configuration.get("compression", True))
+        self._encoding_negotiated = False
+        self._batch_size = None
 
     # Redirect the normal capture functions to capture_data.
     def _capture_device_data(self, peer, sender, bus, topic, headers, message):
@@ -172,42 +208,116 @@ class DataMover(BaseHistorian):
                 _log.debug('Could not connect to target')
                 return
 
-        to_send = []
-        for x in to_publish_list:
-            topic = x['topic']
-            headers = x['value']['headers']
-            message = x['value']['message']
-
-            if self.gather_timing_data:
-                add_timing_data_to_header(headers, self.core.agent_uuid or self.core.identity, "forwarded")
-
-            to_send.append({'topic': topic,
-                            'headers': headers,
-                            'message': message})
-
-        with gevent.Timeout(30):
+        if not self._encoding_negotiated:
+            try:
+                self._negotiate_encoding()
+            except gevent.Timeout:
+                self._last_timeout = self.timestamp()
+                self.historian_teardown()
+                _log.error("Timeout when negotiating insert encoding with target.")
+                self.vip.health.set_status(
+                    STATUS_BAD, "Timeout occurred")
+                return
+        if self._batch_size is None:
+            self._batch_size = min(max(self.min_batch_size, 100), self._submit_size_limit)
+
+        position = 0
+        while position < len(to_publish_list):
+            batch = to_publish_list[position:position + self._batch_size]
+            position += len(batch)
+            to_send = []
+            for x in batch:
+                headers = x['value']['headers']
+                if self.gather_timing_data:
+                    add_timing_data_to_header(headers, self.core.agent_uuid or self.core.identity, "forwarded")
+                to_send.append({'topic': x['topic'],
+                                'headers': headers,
+                                'message': x['value']['message']})
+
+            _log.debug("Sending {} records to destination historian.".format(len(to_send)))
+            start = time.time()
             try:
-                _log.debug("Sending to destination historian.")
-
-                self.report_all_handled()
-                # If local and destination platforms are using RMQ message bus,
-                # then shovel will be used to setup the connection and forwarding
-                # of data. All we need to do is perform normal RPC and specify
-                # destination instance name
-                if self.rmq_to_rmq_comm:
-                    kwargs = {"external_platform": self.destination_instance_name}
-                    self.vip.rpc.call(self.destination_historian_identity, 'insert', to_send, **kwargs).get(timeout=10)
+                if self._insert_encoding:
+                    failed = self._call_destination('insert_encoded', self._insert_encoding,
+                                                    encode_insert_records(to_send, self._insert_encoding))
                 else:
-                    self._target_platform.vip.rpc.call(self.destination_historian_identity, 'insert', to_send).get(
-                        timeout=10)
+                    failed = self._call_destination('insert', to_send)
             except gevent.Timeout:
                 self._last_timeout = self.timestamp()
-                if self._target_platform:
-                    self._target_platform.core.stop()
-                self._target_platform = None
+                self._batch_size = max(self.min_batch_size, self._batch_size // 4)
+                self.historian_teardown()
                 _log.error("Timeout when attempting to publish to target.")
                 self.vip.health.set_status(
                     STATUS_BAD, "Timeout occurred")
+                return
+            except Exception as e:
+                self._batch_size = max(self.min_batch_size, self._batch_size // 2)
+                _log.error("Error publishing to target: {}".format(repr(e)))
+                self.vip.health.set_status(
+                    STATUS_BAD, "Error publishing to target")
+                return
+            self._adapt_batch_size(time.time() - start)
+            self._report_batch(batch, failed or [])
+
+    def _call_destination(self, method, *args):
+        # If local and destination platforms are using RMQ message bus,
+        # then shovel will be used to setup the connection and forwarding
+        # of data. All we need to do is perform normal RPC and specify
+        # destination instance name
+        if self.rmq_to_rmq_comm:
+            kwargs = {"external_platform": self.destination_instance_name}
+            return self.vip.rpc.call(self.destination_historian_identity, method, *args, **kwargs).get(
+                timeout=self.insert_timeout)
+        return self._target_platform.vip.rpc.call(self.destination_historian_identity, method, *args).get(
+            timeout=self.insert_timeout)
+
+    def _negotiate_encoding(self):
+        """Pick the first compression the destination historian supports.
+
+        Destination historians without get_insert_encodings receive
+        uncompressed inserts. A timeout is raised to the caller, so the
+        negotiation is tried again after reconnecting.
+        """
+        self._insert_encoding = None
+        if self.compression:
+            try:
+                encodings = self._call_destination('get_insert_encodings')
+            except (RpcError, RemoteError) as e:
+                _log.info("Destination historian does not support compressed inserts: {}".format(repr(e)))
+                encodings = []
+            for encoding in encodings:
+                if encoding in INSERT_ENCODINGS:
+                    self._insert_encoding = encoding
+                    break
+        _log.debug("Using insert encoding {}".format(self._insert_encoding))
+        self._encoding_negotiated = True
+
+    def _adapt_batch_size(self, elapsed):
+        """Grow the batch size while batches are sent well within target_batch_time and shrink it when they are not."""
+        if elapsed < self.target_batch_time / 2:
+            self._batch_size = min(self._submit_size_limit, self._batch_size * 2)
+        elif elapsed > self.target_batch_time:
+            self._batch_size = max(self.min_batch_size, int(self._batch_size * self.target_batch_time / elapsed))
+
+    def _report_batch(self, batch, failed):
+        """Report the records the destination accepted as handled.
+
+        Records at the indexes in failed stay cached to be sent again, up to
+        max_record_retries times.
+        """
+        failed = set(failed)
+        handled = []
+        for index, record in enumerate(batch):
+            if index in failed:
+                retries = self._record_retries.get(record['_id'], 0) + 1
+                if retries <= self.max_record_retries:
+                    self._record_retries[record['_id']] = retries
+                    continue
+                _log.error("Dropping record for {} not accepted by destination historian after {} attempts".format(
+                    record['topic'], retries))
+            self._record_retries.pop(record['_id'], None)
+            handled.append(record)
+        self.report_handled(handled)
 
     def historian_setup(self):
         if self.rmq_to_rmq_comm:
@@ -238,6 +348,7 @@ class DataMover(BaseHistorian):
         if self._target_platform is not None:
             self._target_platform.core.stop()
             self._target_platform = None
+        self._encoding_negotiated = False
 
 
 def main(argv=sys.argv):
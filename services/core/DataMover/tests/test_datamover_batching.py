@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2023 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+import gevent
+import pytest
+from mock import MagicMock
+
+from volttron.platform.jsonrpc import METHOD_NOT_FOUND, MethodNotFound
+from datamover.agent import DataMover
+
+
+@pytest.fixture()
+def datamover():
+    # Only the attributes used by the batching and negotiation code, no platform connection.
+    mover = DataMover.__new__(DataMover)
+    mover.vip = MagicMock()
+    mover.core = MagicMock()
+    mover.gather_timing_data = False
+    mover.rmq_to_rmq_comm = True
+    mover._target_platform = None
+    mover._last_timeout = 0
+    mover.compression = True
+    mover._insert_encoding = None
+    mover._encoding_negotiated = False
+    mover._batch_size = None
+    mover._submit_size_limit = 1000
+    mover.min_batch_size = 10
+    mover.target_batch_time = 2.0
+    mover.max_record_retries = 2
+    mover._record_retries = {}
+    mover.report_handled = MagicMock()
+    return mover
+
+
+def _records(count):
+    return [{'_id': i, 'topic': 'device/point{}'.format(i), 'value': {'headers': {}, 'message': i}}
+            for i in range(count)]
+
+
+@pytest.mark.historian
+def test_negotiation_falls_back_without_get_insert_encodings(datamover):
+    calls = []
+
+    def call_destination(method, *args):
+        calls.append(method)
+        if method == 'get_insert_encodings':
+            raise MethodNotFound(METHOD_NOT_FOUND, 'method "get_insert_encodings" not found')
+        return []
+    datamover._call_destination = call_destination
+
+    datamover.publish_to_historian(_records(3))
+    assert calls == ['get_insert_encodings', 'insert']
+    assert datamover._encoding_negotiated
+    assert datamover._insert_encoding is None
+    assert len(datamover.report_handled.call_args[0][0]) == 3
+
+    # The negotiation is not repeated for the next batch.
+    datamover.publish_to_historian(_records(1))
+    assert calls == ['get_insert_encodings', 'insert', 'insert']
+
+
+@pytest.mark.historian
+def test_negotiation_timeout_backs_off(datamover):
+    def call_destination(method, *args):
+        raise gevent.Timeout()
+    datamover._call_destination = call_destination
+    datamover.historian_teardown = MagicMock()
+
+    datamover.publish_to_historian(_records(3))
+    assert not datamover._encoding_negotiated
+    assert datamover._last_timeout
+    datamover.historian_teardown.assert_called_once()
+    datamover.report_handled.assert_not_called()
+
+
+@pytest.mark.historian
+def test_adapt_batch_size(datamover):
+    datamover._batch_size = 100
+    datamover._adapt_batch_size(0.5)
+    assert datamover._batch_size == 200
+    datamover._adapt_batch_size(1.5)
+    assert datamover._batch_size == 200
+    datamover._adapt_batch_size(8.0)
+    assert datamover._batch_size == 50
+
+    datamover._batch_size = 600
+    datamover._adapt_batch_size(0.1)
+    assert datamover._batch_size == datamover._submit_size_limit
+    datamover._batch_size = 20
+    datamover._adapt_batch_size(100.0)
+    assert datamover._batch_size == datamover.min_batch_size
+
+
+@pytest.mark.historian
+def test_report_batch_retry_limit(datamover):
+    batch = _records(3)
+    for attempt in range(datamover.max_record_retries):
+        datamover._report_batch(batch, [1])
+        # The failed record stays cached to be sent again.
+        assert [r['_id'] for r in datamover.report_handled.call_args[0][0]] == [0, 2]
+        assert datamover._record_retries == {1: attempt + 1}
+
+    # Dropped (reported as handled) once it has been retried max_record_retries times.
+    datamover._report_batch(batch, [1])
+    assert [r['_id'] for r in datamover.report_handled.call_args[0][0]] == [0, 1, 2]
+    assert datamover._record_retries == {}
@@ -27,7 +27,7 @@ import logging
 import sys
 import time
 import traceback
-from urllib.parse import urlparse
+from collections import deque
 
 import gevent
 
@@ -83,6 +83,11 @@ def historian(config_path, **kwargs):
 
     required_target_agents = config.pop('required_target_agents', [])
     cache_only = config.pop('cache_only', False)
+    max_in_flight = config.pop('max_in_flight', 100)
+    publish_timeout = config.pop('publish_timeout', 30)
+    required_target_check_interval = config.pop('required_target_check_interval', 60)
+    min_retry_interval = config.pop('min_retry_interval', 5)
+    max_retry_interval = config.pop('max_retry_interval', 300)
 
     utils.update_kwargs_with_config(kwargs, config)
 
@@ -92,6 +97,11 @@ def historian(config_path, **kwargs):
                             required_target_agents=required_target_agents,
                             cache_only=cache_only,
                             destination_address=destination_address,
+                            max_in_flight=max_in_flight,
+                            publish_timeout=publish_timeout,
+                            required_target_check_interval=required_target_check_interval,
+                            min_retry_interval=min_retry_interval,
+                            max_retry_interval=max_retry_interval,
                             **kwargs)
 
 
@@ -107,6 +117,11 @@ class ForwardHistorian(BaseHistorian):
                  required_target_agents=[],
                  cache_only=False,
                  destination_address=None,
+                 max_in_flight=100,
+                 publish_timeout=30,
+                 required_target_check_interval=60,
+                 min_retry_interval=5,
+                 max_retry_interval=300,
                  **kwargs):
         kwargs["process_loop_in_greenlet"] = True
         super(ForwardHistorian, self).__init__(**kwargs)
@@ -115,7 +130,10 @@ class ForwardHistorian(BaseHistorian):
         self._topic_replace_map = {}
         self.topic_replace_list = topic_replace_list
         self._num_failures = 0
-        self._last_timeout = 0
+        # Time before which no publish is attempted after a failure.
+        self._next_attempt = 0
+        # Time the required target agents were last listed.
+        self._targets_checked = 0
         self._target_platform = None
         self._current_custom_topics = set()
         self.destination_vip = destination_vip
@@ -123,6 +141,11 @@ class ForwardHistorian(BaseHistorian):
         self.required_target_agents = required_target_agents
         self.cache_only = cache_only
         self.destination_address = destination_address
+        self.max_in_flight = max_in_flight
+        self.publish_timeout = publish_timeout
+        self.required_target_check_interval = required_target_check_interval
+        self.min_retry_interval = min_retry_interval
+        self.max_retry_interval = max_retry_interval
         config = {
             "custom_topic_list": custom_topic_list,
             "topic_replace_list": self.topic_replace_list,
@@ -130,7 +153,12 @@ class ForwardHistorian(BaseHistorian):
             "destination_vip": self.destination_vip,
             "destination_serverkey": self.destination_serverkey,
             "cache_only": self.cache_only,
-            "destination_address": self.destination_address
+            "destination_address": self.destination_address,
+            "max_in_flight": self.max_in_flight,
+            "publish_timeout": self.publish_timeout,
+            "required_target_check_interval": self.required_target_check_interval,
+            "min_retry_interval": self.min_retry_interval,
+            "max_retry_interval": self.max_retry_interval
         }
 
         self.update_default_config(config)
@@ -148,6 +176,12 @@ class ForwardHistorian(BaseHistorian):
         self.topic_replace_list = configuration.get('topic_replace_list', [])
         self.cache_only = configuration.get('cache_only', False)
         self.destination_address = configuration.get('destination_address', None)
+        self.max_in_flight = max(1, int(configuration.get('max_in_flight', 100)))
+        self.publish_timeout = float(configuration.get('publish_timeout', 30))
+        self.required_target_check_interval = float(configuration.get('required_target_check_interval', 60))
+        self.min_retry_interval = float(configuration.get('min_retry_interval', 5))
+        self.max_retry_interval = float(configuration.get('max_retry_interval', 300))
+        self._targets_checked = 0
         # Reset the replace map.
         self._topic_replace_map = {}
 
@@ -300,133 +334,172 @@ class ForwardHistorian(BaseHistorian):
             _log.warning("cache_only enabled")
             return
 
-        handled_records = []
-
         _log.debug("publish_to_historian number of items: {}"
                    .format(len(to_publish_list)))
-        parsed = urlparse(self.core.address)
-        next_dest = urlparse(self.destination_vip)
-        current_time = self.timestamp()
-        last_time = self._last_timeout
-        _log.debug('Lasttime: {} currenttime: {}'.format(last_time,
-                                                         current_time))
-        timeout_occurred = False
-        if self._last_timeout:
-            # if we failed we need to wait 60 seconds before we go on.
-            if self.timestamp() < self._last_timeout + 60:
-                _log.debug('Not allowing send < 60 seconds from failure')
-                return
+        if time.time() < self._next_attempt:
+            _log.debug('Not publishing for {:.1f} more seconds after failure'.format(
+                self._next_attempt - time.time()))
+            return
 
         if not self._target_platform:
             self.historian_setup()
         if not self._target_platform:
             _log.error('Could not connect to targeted historian dest_vip {} dest_address {}'.format(
                 self.destination_vip, self.destination_address))
+            self._publish_failed()
             return
 
-        for vip_id in self.required_target_agents:
-            try:
-                self._target_platform.vip.ping(vip_id).get()
-            except Unreachable:
-                skip = "Skipping publish: Target platform not running " \
-                       "required agent {}".format(vip_id)
-                _log.warning(skip)
-                self.vip.health.set_status(
-                    STATUS_BAD, skip)
-                return
-            except Exception as e:
-                err = "Unhandled error publishing to target platform."
-                _log.error(err)
-                _log.error(traceback.format_exc())
-                self.vip.health.set_status(
-                    STATUS_BAD, err)
-                return
+        if not self._required_targets_available():
+            self._publish_failed()
+            return
 
+        # Publishes are sent without waiting for the previous one to be
+        # acknowledged, with at most max_in_flight outstanding. Records are
+        # reported handled one by one as their publish is acknowledged.
+        in_flight = deque()
+        error = None
         for x in to_publish_list:
-            topic = x['topic']
-            value = x['value']
-            # payload = jsonapi.loads(value)
-            payload = value
-            headers = payload['headers']
-            headers['X-Forwarded'] = True
-            if 'X-Forwarded-From' in headers:
-                if not isinstance(headers['X-Forwarded-From'], list):
-                    headers['X-Forwarded-From'] = [headers['X-Forwarded-From']]
-                headers['X-Forwarded-From'].append(self.instance_name)
-            else:
-                headers['X-Forwarded-From'] = self.instance_name
-
-            try:
-                del headers['Origin']
-            except KeyError:
-                pass
+            while len(in_flight) >= self.max_in_flight:
+                error = self._wait_for_publish(*in_flight.popleft())
+                if error is not None:
+                    break
+            if error is not None:
+                break
+            topic, headers, message = self._prepare_forward(x)
             try:
-                del headers['Destination']
-            except KeyError:
-                pass
-
-            if self.gather_timing_data:
-                add_timing_data_to_header(headers,
-                                          self.core.agent_uuid or self.core.identity,
-                                          "forwarded")
-
-            if timeout_occurred:
-                _log.error(
-                    'A timeout has occurred so breaking out of publishing')
+                result = self._target_platform.vip.pubsub.publish(
+                    peer='pubsub',
+                    topic=topic,
+                    headers=headers,
+                    message=message)
+            except Exception as e:
+                error = e
                 break
-            with gevent.Timeout(30):
-                try:
-                    self._target_platform.vip.pubsub.publish(
-                        peer='pubsub',
-                        topic=topic,
-                        headers=headers,
-                        message=payload['message']).get()
-                except gevent.Timeout:
-                    _log.debug("Timeout occurred email should send!")
-                    timeout_occurred = True
-                    self._last_timeout = self.timestamp()
-                    self._num_failures += 1
-                    # Stop the current platform from attempting to
-                    # connect
-                    self.historian_teardown()
-                    self.vip.health.set_status(
-                        STATUS_BAD, "Timeout occured")
-                except Unreachable:
-                    _log.error("Target not reachable. Wait till it's ready!")
-                except ZMQError as exc:
-                    if exc.errno == ENOTSOCK:
-                        # Stop the current platform from attempting to
-                        # connect
-                        _log.error("Target disconnected. Stopping target platform agent")
-                        self.historian_teardown()
-                        self.vip.health.set_status(
-                            STATUS_BAD, "Target platform disconnected")
-                except Exception as e:
-                    err = "Unhandled error publishing to target platfom."
-                    _log.error(err)
-                    _log.error(traceback.format_exc())
-                    self.vip.health.set_status(
-                        STATUS_BAD, err)
-                    # Before returning lets mark any that weren't errors
-                    # as sent.
-                    self.report_handled(handled_records)
-                    return
-                else:
-                    handled_records.append(x)
+            in_flight.append((x, result))
+
+        while in_flight and error is None:
+            error = self._wait_for_publish(*in_flight.popleft())
+        # Records acknowledged before the failure are not sent again.
+        for x, result in in_flight:
+            if result.ready() and result.successful():
+                self.report_handled(x)
+
+        if error is None:
+            _log.debug("handled: {} number of items".format(
+                len(to_publish_list)))
+            self._num_failures = 0
+            self._next_attempt = 0
+            self.vip.health.set_status(
+                STATUS_GOOD, "published {} items".format(
+                    len(to_publish_list)))
+        else:
+            self._handle_publish_error(error)
+            self._publish_failed()
+
+    def _prepare_forward(self, record):
+        """Return the topic, headers and message to publish to the target for a cached record."""
+        payload = record['value']
+        headers = payload['headers']
+        headers['X-Forwarded'] = True
+        if 'X-Forwarded-From' in headers:
+            if not isinstance(headers['X-Forwarded-From'], list):
+                headers['X-Forwarded-From'] = [headers['X-Forwarded-From']]
+            headers['X-Forwarded-From'].append(self.instance_name)
+        else:
+            headers['X-Forwarded-From'] = self.instance_name
+
+        headers.pop('Origin', None)
+        headers.pop('Destination', None)
+
+        if self.gather_timing_data:
+            add_timing_data_to_header(headers,
+                                      self.core.agent_uuid or self.core.identity,
+                                      "forwarded")
+        return record['topic'], headers, payload['message']
 
-        _log.debug("handled: {} number of items".format(
-            len(to_publish_list)))
-        self.report_handled(handled_records)
+    def _wait_for_publish(self, record, result):
+        """Wait for a publish to be acknowledged and report its record handled.
 
-        if timeout_occurred:
+        Returns the exception the publish failed with, None on success.
+        """
+        try:
+            result.get(timeout=self.publish_timeout)
+        except (Exception, gevent.Timeout) as e:
+            return e
+        self.report_handled(record)
+        return None
+
+    def _handle_publish_error(self, error):
+        if isinstance(error, gevent.Timeout):
+            _log.debug("Timeout occurred email should send!")
+            # Stop the current platform from attempting to connect
+            self.historian_teardown()
+            self.vip.health.set_status(
+                STATUS_BAD, "Timeout occured")
             _log.debug('Sending alert from the ForwardHistorian')
             status = Status.from_json(self.vip.health.get_status_json())
             self.vip.health.send_alert(FORWARD_TIMEOUT_KEY,
                                        status)
+        elif isinstance(error, Unreachable):
+            _log.error("Target not reachable. Wait till it's ready!")
+            self.vip.health.set_status(
+                STATUS_BAD, "Target not reachable")
+        elif isinstance(error, ZMQError) and error.errno == ENOTSOCK:
+            # Stop the current platform from attempting to connect
+            _log.error("Target disconnected. Stopping target platform agent")
+            self.historian_teardown()
+            self.vip.health.set_status(
+                STATUS_BAD, "Target platform disconnected")
         else:
+            err = "Unhandled error publishing to target platfom."
+            _log.error(err)
+            _log.error("".join(traceback.format_exception(type(error), error, error.__traceback__)))
             self.vip.health.set_status(
-                STATUS_GOOD,"published {} items".format(
-                    len(to_publish_list)))
+                STATUS_BAD, err)
+
+    def _publish_failed(self):
+        """Hold off publishing with an exponential backoff."""
+        self._num_failures += 1
+        delay = min(self.max_retry_interval,
+                    self.min_retry_interval * 2 ** (self._num_failures - 1))
+        self._next_attempt = time.time() + delay
+        self._targets_checked = 0
+        _log.debug('Publish failure {}, next attempt in {} seconds'.format(
+            self._num_failures, delay))
+
+    def _required_targets_available(self):
+        """Check the required target agents are connected to the target platform.
+
+        The target platform's peer list is fetched at most every
+        required_target_check_interval seconds. In between the check uses
+        the peer list kept current by the peerlist add and drop
+        notifications the target platform sends.
+        """
+        if not self.required_target_agents:
+            return True
+        peerlist = self._target_platform.vip.peerlist
+        now = time.time()
+        if now >= self._targets_checked + self.required_target_check_interval:
+            try:
+                peerlist().get(timeout=self.publish_timeout)
+            except (Exception, gevent.Timeout):
+                err = "Unhandled error publishing to target platform."
+                _log.error(err)
+                _log.error(traceback.format_exc())
+                self.vip.health.set_status(
+                    STATUS_BAD, err)
+                return False
+            self._targets_checked = now
+
+        for vip_id in self.required_target_agents:
+            if vip_id not in peerlist.peers_list:
+                skip = "Skipping publish: Target platform not running " \
+                       "required agent {}".format(vip_id)
+                _log.warning(skip)
+                self.vip.health.set_status(
+                    STATUS_BAD, skip)
+                return False
+        return True
 
     @doc_inherit
     def historian_setup(self):
@@ -462,6 +535,7 @@ class ForwardHistorian(BaseHistorian):
         if self._target_platform is not None:
             self._target_platform.core.stop()
             self._target_platform = None
+        self._targets_checked = 0
 
 
 def main(argv=sys.argv):
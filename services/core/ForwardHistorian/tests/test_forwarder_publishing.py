@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2023 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+import errno
+
+import pytest
+from mock import MagicMock
+
+from volttron.platform.messaging.health import STATUS_BAD, STATUS_GOOD
+from volttron.platform.vip.agent import Unreachable
+from forwarder import agent as forwarder_module
+from forwarder.agent import ForwardHistorian
+
+
+class Clock(object):
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class PublishResult(object):
+    """Publish result of the target platform, acknowledged when waited on unless it fails."""
+
+    def __init__(self, target, error=None):
+        self.target = target
+        self.error = error
+        self.acked = False
+
+    def get(self, timeout=None):
+        if not self.acked:
+            self.target.outstanding -= 1
+        if self.error is not None:
+            raise self.error
+        self.acked = True
+
+    def ready(self):
+        return self.acked or self.error is not None
+
+    def successful(self):
+        return self.acked
+
+
+class TargetPlatform(object):
+    """Target platform agent recording the publishes it has not acknowledged yet."""
+
+    def __init__(self):
+        self.vip = MagicMock()
+        self.vip.pubsub.publish.side_effect = self._publish
+        self.vip.peerlist.peers_list = []
+        self.outstanding = 0
+        self.max_outstanding = 0
+        self.errors = {}
+        self.results = []
+
+    def _publish(self, peer, topic, headers, message):
+        self.outstanding += 1
+        self.max_outstanding = max(self.max_outstanding, self.outstanding)
+        result = PublishResult(self, self.errors.get(message))
+        self.results.append(result)
+        return result
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(forwarder_module.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture()
+def target():
+    return TargetPlatform()
+
+
+@pytest.fixture()
+def forwarder(clock, target):
+    # Only the attributes used by publish_to_historian, no platform connection.
+    historian = ForwardHistorian.__new__(ForwardHistorian)
+    historian.vip = MagicMock()
+    historian.core = MagicMock()
+    historian.gather_timing_data = False
+    historian.instance_name = 'source'
+    historian.cache_only = False
+    historian.destination_vip = 'tcp://127.0.0.1:22916'
+    historian.destination_address = None
+    historian.required_target_agents = []
+    historian.max_in_flight = 3
+    historian.publish_timeout = 30
+    historian.required_target_check_interval = 60
+    historian.min_retry_interval = 5
+    historian.max_retry_interval = 20
+    historian._num_failures = 0
+    historian._next_attempt = 0
+    historian._targets_checked = 0
+    historian._target_platform = target
+    historian.historian_setup = MagicMock()
+    historian.historian_teardown = MagicMock()
+    historian.report_handled = MagicMock()
+    return historian
+
+
+def _records(count):
+    return [{'_id': i, 'topic': 'devices/campus/device{}/all'.format(i),
+             'value': {'headers': {}, 'message': i}} for i in range(count)]
+
+
+def _handled(forwarder):
+    return [call[0][0]['_id'] for call in forwarder.report_handled.call_args_list]
+
+
+@pytest.mark.historian
+@pytest.mark.forwarder
+def test_in_flight_window(forwarder, target):
+    forwarder.publish_to_historian(_records(10))
+    assert target.vip.pubsub.publish.call_count == 10
+    assert target.max_outstanding == forwarder.max_in_flight
+    assert target.outstanding == 0
+    assert _handled(forwarder) == list(range(10))
+    forwarder.vip.health.set_status.assert_called_with(STATUS_GOOD, "published 10 items")
+
+
+@pytest.mark.historian
+@pytest.mark.forwarder
+def test_partial_failure_reports_acknowledged_records(forwarder, target):
+    target.errors[2] = Unreachable(errno.EHOSTUNREACH, 'Host unreachable', 'pubsub', 'pubsub')
+    original_publish = target._publish
+
+    def publish(peer, topic, headers, message):
+        result = original_publish(peer, topic, headers, message)
+        if message == 3:
+            # Acknowledged by the target before the publish of record 2 is found to have failed.
+            result.get()
+        return result
+    target.vip.pubsub.publish.side_effect = publish
+
+    forwarder.publish_to_historian(_records(6))
+    # Records 4 and 5 were never acknowledged, record 5 was not sent.
+    assert target.vip.pubsub.publish.call_count == 5
+    assert _handled(forwarder) == [0, 1, 3]
+    assert forwarder._num_failures == 1
+    forwarder.vip.health.set_status.assert_called_with(STATUS_BAD, "Target not reachable")
+
+
+@pytest.mark.historian
+@pytest.mark.forwarder
+def test_backoff_doubles_and_resets(forwarder, clock):
+    forwarder._target_platform = None
+    delays = []
+    for _ in range(4):
+        forwarder.publish_to_historian(_records(1))
+        delays.append(forwarder._next_attempt - clock.now)
+        # Publishing is not attempted again until the delay has passed.
+        forwarder.publish_to_historian(_records(1))
+        clock.now = forwarder._next_attempt
+    assert delays == [5, 10, 20, 20]
+    assert forwarder.historian_setup.call_count == 4
+
+    forwarder._target_platform = TargetPlatform()
+    forwarder.publish_to_historian(_records(1))
+    assert _handled(forwarder) == [0]
+    assert forwarder._num_failures == 0
+    assert forwarder._next_attempt == 0
+
+    forwarder._target_platform = None
+    forwarder.publish_to_historian(_records(1))
+    assert forwarder._next_attempt - clock.now == 5
+
+
+@pytest.mark.historian
+@pytest.mark.forwarder
+def test_missing_required_target_skips_publish(forwarder, target, clock):
+    forwarder.required_target_agents = ['platform.historian']
+    target.vip.peerlist.peers_list = ['platform.driver']
+
+    forwarder.publish_to_historian(_records(2))
+    target.vip.peerlist.assert_called_once()
+    target.vip.pubsub.publish.assert_not_called()
+    forwarder.report_handled.assert_not_called()
+    assert forwarder._num_failures == 1
+    forwarder.vip.health.set_status.assert_called_with(
+        STATUS_BAD, "Skipping publish: Target platform not running required agent platform.historian")
+
+    # The peer list is kept current by the target platform between checks.
+    clock.now = forwarder._next_attempt
+    target.vip.peerlist.peers_list.append('platform.historian')
+    forwarder.publish_to_historian(_records(2))
+    assert _handled(forwarder) == [0, 1]
+
+    # The failure made the peer list be fetched again, it is not fetched again within the check interval.
+    assert target.vip.peerlist.call_count == 2
+    forwarder.publish_to_historian(_records(2))
+    assert target.vip.peerlist.call_count == 2
+    clock.now += forwarder.required_target_check_interval
+    forwarder.publish_to_historian(_records(2))
+    assert target.vip.peerlist.call_count == 3
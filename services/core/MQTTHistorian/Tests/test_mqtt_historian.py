@@ -26,6 +26,7 @@ from ast import Import
 import os
 import json
 import gevent
+import mock
 import pytest
 try:
     import paho.mqtt.client as mqtt_client
@@ -206,3 +207,35 @@ def test_can_publish_all_topic(volttron_instance, helper_agent, mqtt_broker_clie
         assert json.loads(value[0]) == TEST_PUBLISH
 
     volttron_instance.stop_agent(uuid)
+
+
+@pytest.mark.historian
+def test_persistent_client_reports_handled(mqtt_broker_client):
+    """
+    Test that records are reported handled as the local broker acknowledges their publishes, over one connection
+    """
+    from mqtt_historian.agent import MQTTHistorian
+    from volttron.platform.agent.base_historian import BaseHistorian
+
+    with mock.patch.object(BaseHistorian, '__init__', lambda self, **kwargs: None):
+        historian = MQTTHistorian(connection=dict(mqtt_connection, mqtt_qos=1, mqtt_max_inflight=5))
+    handled = []
+    historian.report_handled = handled.extend
+
+    callback_messages = []
+    mqtt_broker_client.on_message = lambda client, userdata, message: callback_messages.append(message.topic)
+
+    records = [{'_id': i, 'topic': 'persistent/point{}'.format(i), 'value': i} for i in range(50)]
+    historian.historian_setup()
+    try:
+        historian.publish_to_historian(records[:25])
+        client = historian._client
+        historian.publish_to_historian(records[25:])
+        assert historian._client is client
+    finally:
+        historian.historian_teardown()
+
+    assert sorted(record['_id'] for record in handled) == list(range(50))
+    gevent.sleep(1)
+    assert set(callback_messages) >= {record['topic'] for record in records}
+
@@ -23,17 +23,16 @@
 # }}}
 
 
-import datetime
 import logging
 import sys
+import threading
 import time
 
 from volttron.platform import jsonapi
 from volttron.platform.agent.base_historian import BaseHistorian
 from volttron.platform.agent import utils
 
-from paho.mqtt.client import MQTTv311, MQTTv31
-import paho.mqtt.publish as publish
+from paho.mqtt.client import Client, MQTT_ERR_SUCCESS, MQTTv311, MQTTv31
 
 
 utils.setup_logging()
@@ -73,6 +72,9 @@ class MQTTHistorian(BaseHistorian):
         self.mqtt_will = connection.get('mqtt_will', None)
         self.mqtt_auth = connection.get('mqtt_auth', None)
         self.mqtt_tls = connection.get('mqtt_tls', None)
+        self.mqtt_max_inflight = connection.get('mqtt_max_inflight', 20)
+        self.mqtt_connect_timeout = connection.get('mqtt_connect_timeout', 10)
+        self.mqtt_publish_timeout = connection.get('mqtt_publish_timeout', 30)
 
         protocol = connection.get('mqtt_protocol', MQTTv311)
         if protocol == "MQTTv311":
@@ -85,50 +87,118 @@ class MQTTHistorian(BaseHistorian):
 
         self.mqtt_protocol = protocol
 
-        # will be available in both threads.
-        self._last_error = 0
+        # The client is used from the publishing thread and paho's network
+        # thread, which calls the on_* callbacks.
+        self._client = None
+        self._connected = threading.Event()
+        self._condition = threading.Condition()
+        # Message id -> record of publishes waiting for completion.
+        self._pending = {}
+        # Message ids completed before publish returned them.
+        self._completed_early = set()
+        self._completed = []
 
         super(MQTTHistorian, self).__init__(**kwargs)
 
-    def timestamp(self):
-        return time.mktime(datetime.datetime.now().timetuple())
+    def historian_setup(self):
+        """Create the MQTT client and start connecting in paho's network thread.
+
+        The client reconnects on its own when the connection is lost.
+        """
+        client = Client(client_id=self.mqtt_client_id, protocol=self.mqtt_protocol)
+        if self.mqtt_auth is not None:
+            client.username_pw_set(self.mqtt_auth['username'], self.mqtt_auth.get('password'))
+        if self.mqtt_tls is not None:
+            client.tls_set(self.mqtt_tls['ca_certs'],
+                           certfile=self.mqtt_tls.get('certfile'),
+                           keyfile=self.mqtt_tls.get('keyfile'),
+                           tls_version=self.mqtt_tls.get('tls_version'),
+                           ciphers=self.mqtt_tls.get('ciphers'))
+        if self.mqtt_will is not None:
+            client.will_set(self.mqtt_will['topic'],
+                            payload=self.mqtt_will.get('payload'),
+                            qos=self.mqtt_will.get('qos', 0),
+                            retain=self.mqtt_will.get('retain', False))
+        client.max_inflight_messages_set(self.mqtt_max_inflight)
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_publish = self._on_publish
+        client.connect_async(self.mqtt_hostname, port=self.mqtt_port, keepalive=self.mqtt_keepalive)
+        client.loop_start()
+        self._client = client
+
+    def historian_teardown(self):
+        if self._client is not None:
+            self._client.disconnect()
+            self._client.loop_stop()
+            self._client = None
+        self._connected.clear()
+
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            _log.debug("Connected to MQTT broker {}:{}".format(self.mqtt_hostname, self.mqtt_port))
+            self._connected.set()
+        else:
+            _log.warning("MQTT broker refused connection: {}".format(rc))
+
+    def _on_disconnect(self, client, userdata, rc):
+        self._connected.clear()
+        if rc != 0:
+            _log.warning("Disconnected from MQTT broker ({}), reconnecting".format(rc))
+
+    def _on_publish(self, client, userdata, mid):
+        with self._condition:
+            record = self._pending.pop(mid, None)
+            if record is None:
+                self._completed_early.add(mid)
+            else:
+                self._completed.append(record)
+                self._condition.notify()
 
     def publish_to_historian(self, to_publish_list):
         _log.debug("publish_to_historian number of items: {}".format(len(to_publish_list)))
-        if self._last_error:
-            # if we failed we need to wait 60 seconds before we go on.
-            if self.timestamp() < self._last_error + 60:
-                _log.debug('Not allowing send < 60 seconds from failure')
-                return
-
-        to_send = []
+        if self._client is None:
+            self.historian_setup()
+        if not self._connected.wait(self.mqtt_connect_timeout):
+            _log.warning("Not connected to MQTT broker {}:{}".format(self.mqtt_hostname, self.mqtt_port))
+            return
+
+        # Messages are queued with the client, which keeps at most
+        # mqtt_max_inflight QoS 1 and 2 messages unacknowledged. Each record
+        # is reported handled when its publish completes.
+        with self._condition:
+            self._completed_early.clear()
         for x in to_publish_list:
-            topic = x['topic']
-
             # Construct payload from data in the publish item.
             # Available fields: 'value', 'headers', and 'meta'
             payload = jsonapi.dumps(x['value'])
-            _log.debug(f'payload: {payload}, topic {topic}')
-
-            to_send.append({'topic': topic,
-                            'payload': payload,
-                            'qos': self.mqtt_qos,
-                            'retain': self.mqtt_retain})
-
-        try:
-            publish.multiple(to_send,
-                             hostname=self.mqtt_hostname,
-                             port=self.mqtt_port,
-                             client_id=self.mqtt_client_id,
-                             keepalive=self.mqtt_keepalive,
-                             will=self.mqtt_will,
-                             auth=self.mqtt_auth,
-                             tls=self.mqtt_tls,
-                             protocol=self.mqtt_protocol)
-            self.report_all_handled()
-        except Exception as e:
-            _log.warning("Exception ({}) raised by publish: {}".format(e.__class__.__name__, e))
-            self._last_error = self.timestamp()
+            info = self._client.publish(x['topic'], payload, qos=self.mqtt_qos, retain=self.mqtt_retain)
+            if info.rc != MQTT_ERR_SUCCESS:
+                _log.warning("MQTT publish failed: {}".format(info.rc))
+                break
+            with self._condition:
+                if info.mid in self._completed_early:
+                    self._completed_early.discard(info.mid)
+                    self._completed.append(x)
+                else:
+                    self._pending[info.mid] = x
+
+        with self._condition:
+            deadline = time.time() + self.mqtt_publish_timeout
+            while self._pending:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            if self._pending:
+                _log.warning("{} MQTT publishes were not completed within {} seconds".format(
+                    len(self._pending), self.mqtt_publish_timeout))
+            # Records not completed stay cached and are sent again.
+            self._pending.clear()
+            self._completed_early.clear()
+            completed, self._completed = self._completed, []
+        self.report_handled(completed)
 
 
 def main(argv=sys.argv):
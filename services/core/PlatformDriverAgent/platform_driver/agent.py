@@ -29,6 +29,7 @@ from collections import defaultdict
 from volttron.platform.vip.agent import Agent, RPC
 from volttron.platform.agent import utils
 from volttron.platform.agent import math_utils
+from volttron.platform.messaging import headers as headers_mod
 from volttron.platform.agent.known_identities import PLATFORM_DRIVER
 from .driver import DriverAgent
 import resource
@@ -36,6 +37,7 @@ from datetime import datetime, timedelta
 import bisect
 import fnmatch
 from volttron.platform import jsonapi
+from volttron.platform.scheduling import periodic
 from .interfaces import DriverInterfaceError
 from .driver_locks import configure_socket_lock, configure_publish_lock
 
@@ -43,6 +45,8 @@ utils.setup_logging()
 _log = logging.getLogger(__name__)
 __version__ = '4.0'
 
+SCRAPE_STATS_TOPIC = 'platform_driver/scrape_stats'
+
 
 class OverrideError(DriverInterfaceError):
     """Error raised when the user tries to set/revert point when global override is set."""
@@ -102,6 +106,8 @@ def platform_driver_agent(config_path, **kwargs):
 
     group_offset_interval = get_config("group_offset_interval", 0.0)
 
+    scrape_stats_interval = get_config("scrape_stats_interval", 0)
+
     return PlatformDriverAgent(driver_config_list, scalability_test,
                              scalability_test_iterations,
                              driver_scrape_interval,
@@ -113,6 +119,7 @@ def platform_driver_agent(config_path, **kwargs):
                              publish_breadth_first_all,
                              publish_depth_first,
                              publish_breadth_first,
+                             scrape_stats_interval,
                              heartbeat_autostart=True, **kwargs)
 
 
@@ -128,6 +135,7 @@ class PlatformDriverAgent(Agent):
                  publish_breadth_first_all=False,
                  publish_depth_first=False,
                  publish_breadth_first=False,
+                 scrape_stats_interval=0,
                  **kwargs):
         super(PlatformDriverAgent, self).__init__(**kwargs)
         self.instances = {}
@@ -158,6 +166,13 @@ class PlatformDriverAgent(Agent):
         self._override_patterns = None
         self._override_interval_events = {}
 
+        try:
+            self.scrape_stats_interval = float(scrape_stats_interval)
+        except (TypeError, ValueError):
+            _log.warning("Invalid scrape_stats_interval, setting to default value.")
+            self.scrape_stats_interval = 0.0
+        self._scrape_stats_event = None
+
         if scalability_test:
             self.waiting_to_finish = set()
             self.test_iterations = 0
@@ -173,8 +188,11 @@ class PlatformDriverAgent(Agent):
                                "publish_depth_first_all": self.publish_depth_first_all,
                                "publish_breadth_first_all": self.publish_breadth_first_all,
                                "publish_depth_first": self.publish_depth_first,
-                               "publish_breadth_first": self.publish_breadth_first}
+                               "publish_breadth_first": self.publish_breadth_first,
+                               "scrape_stats_interval": self.scrape_stats_interval}
 
+        # Registry files are only retrieved when a device configuration references them.
+        self.vip.config.enable_lazy_loading()
         self.vip.config.set_default("config", self.default_config)
         self.vip.config.subscribe(self.configure_main, actions=["NEW", "UPDATE"], pattern="config")
         self.vip.config.subscribe(self.update_driver, actions=["NEW", "UPDATE"], pattern="devices/*")
@@ -321,6 +339,34 @@ class PlatformDriverAgent(Agent):
                                         self.publish_depth_first,
                                         self.publish_breadth_first)
 
+        try:
+            scrape_stats_interval = float(config["scrape_stats_interval"] or 0.0)
+        except (TypeError, ValueError) as e:
+            _log.error("ERROR PROCESSING CONFIGURATION: {}".format(e))
+            _log.error("Platform driver scrape stats settings unchanged")
+            scrape_stats_interval = self.scrape_stats_interval
+
+        if action == "NEW" or scrape_stats_interval != self.scrape_stats_interval:
+            self.scrape_stats_interval = scrape_stats_interval
+            self._update_scrape_stats_schedule()
+
+    def _update_scrape_stats_schedule(self):
+        """(Re)schedule the periodic scrape statistics summary publish.
+        A scrape_stats_interval <= 0 disables the publish."""
+        if self._scrape_stats_event is not None:
+            self._scrape_stats_event.cancel()
+            self._scrape_stats_event = None
+
+        if self.scrape_stats_interval > 0:
+            _log.info("Publishing scrape statistics every {} seconds".format(self.scrape_stats_interval))
+            self._scrape_stats_event = self.core.schedule(periodic(self.scrape_stats_interval),
+                                                          self._publish_scrape_stats)
+
+    def _publish_scrape_stats(self):
+        summary = {topic: driver.scrape_stats.summary() for topic, driver in self.instances.items()}
+        headers = {headers_mod.DATE: utils.format_timestamp(utils.get_aware_utc_now())}
+        self.vip.pubsub.publish('pubsub', SCRAPE_STATS_TOPIC, headers=headers, message=summary)
+
     def derive_device_topic(self, config_name):
         _, topic = config_name.split('/', 1)
         return topic
@@ -479,6 +525,22 @@ class PlatformDriverAgent(Agent):
         else:
             return self.instances[path].set_multiple_points(point_names_values, **kwargs)
 
+    @RPC.export
+    def get_scrape_stats(self, path=None, reset=False):
+        """RPC method
+
+        Return scrape telemetry collected for each device: histograms of scrape, publish and publish lock wait times,
+        overrun and failure counters and the number of points and bytes per scrape.
+        :param path: device path. If None statistics for all devices are returned.
+        :type path: str
+        :param reset: Clear the statistics after they are returned.
+        :type reset: bool
+        :return: Dictionary of device path to statistics.
+        """
+        if path is not None:
+            return {path: self.instances[path].get_scrape_stats(reset)}
+        return {topic: driver.get_scrape_stats(reset) for topic, driver in self.instances.items()}
+
     @RPC.export
     def heart_beat(self):
         """RPC method
@@ -27,7 +27,9 @@ from volttron.platform.agent import utils
 import logging
 import random
 import gevent
+import time
 import traceback
+from volttron.platform import jsonapi
 from volttron.platform.messaging import headers as headers_mod
 from volttron.platform.messaging.topics import (DRIVER_TOPIC_BASE,
                                                 DRIVER_TOPIC_ALL,
@@ -36,6 +38,7 @@ from volttron.platform.messaging.topics import (DRIVER_TOPIC_BASE,
 
 from volttron.platform.vip.agent.errors import VIPError, Again
 from .driver_locks import publish_lock
+from .scrape_stats import ScrapeStats
 import datetime
 
 utils.setup_logging()
@@ -75,6 +78,7 @@ class DriverAgent(BasicAgent):
 
         self.interval = interval
         self.periodic_read_event = None
+        self.scrape_stats = ScrapeStats(interval)
 
         self.update_scrape_schedule(time_slot, driver_scrape_interval, group, group_offset_interval)
 
@@ -228,6 +232,7 @@ class DriverAgent(BasicAgent):
 
         self.parent.scrape_starting(self.device_name)
 
+        scrape_start = time.monotonic()
         try:
             results = self.interface.scrape_all()
             register_names = self.interface.get_register_names_view()
@@ -237,10 +242,13 @@ class DriverAgent(BasicAgent):
         except (Exception, gevent.Timeout) as ex:
             tb = traceback.format_exc()
             _log.error('Failed to scrape ' + self.device_name + ':\n' + tb)
+            self.scrape_stats.record_failure(time.monotonic() - scrape_start)
             return
+        publish_start = time.monotonic()
 
         # XXX: Does a warning need to be printed?
         if not results:
+            self.scrape_stats.record_scrape(publish_start - scrape_start, 0.0, 0, 0)
             return
 
         utcnow = utils.get_aware_utc_now()
@@ -279,12 +287,22 @@ class DriverAgent(BasicAgent):
                                   headers=headers,
                                   message=message)
 
+        publish_end = time.monotonic()
+        # Serializing the results again is as expensive as the scrape itself, so the size is only sampled.
+        size = len(jsonapi.dumpb(results)) if self.scrape_stats.size_due(len(results)) else None
+        self.scrape_stats.record_scrape(publish_start - scrape_start,
+                                        publish_end - publish_start,
+                                        len(results),
+                                        size)
+
         self.parent.scrape_ending(self.device_name)
 
     def _publish_wrapper(self, topic, headers, message):
         while True:
             try:
+                lock_start = time.monotonic()
                 with publish_lock():
+                    self.scrape_stats.record_lock_wait(time.monotonic() - lock_start)
                     _log.debug("publishing: " + topic)
                     self.vip.pubsub.publish('pubsub',
                                             topic,
@@ -325,6 +343,12 @@ class DriverAgent(BasicAgent):
 
         return depth_first, breadth_first
 
+    def get_scrape_stats(self, reset=False):
+        stats = self.scrape_stats.to_dict()
+        if reset:
+            self.scrape_stats.reset()
+        return stats
+
     def get_point(self, point_name, **kwargs):
         return self.interface.get_point(point_name, **kwargs)
 
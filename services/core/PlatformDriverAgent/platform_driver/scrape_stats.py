@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2023 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+"""Low overhead scrape telemetry for the platform driver.
+
+Every device driver owns a :class:`ScrapeStats` instance which is updated
+from ``DriverAgent.periodic_read``. Timings are accumulated into fixed
+bucket histograms so recording a sample is a single bisect and the memory
+used per device does not grow with the number of scrapes.
+"""
+
+from bisect import bisect_left
+
+# Upper bounds (in seconds) of the histogram buckets. Samples larger than
+# the last bound are counted in an overflow bucket.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# The serialized size of a scrape is measured every SIZE_SAMPLE_INTERVAL
+# scrapes, or when the number of points changes.
+SIZE_SAMPLE_INTERVAL = 10
+
+
+class Histogram(object):
+    """Fixed bucket histogram of durations in seconds."""
+
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """Estimate a percentile from the bucket counts.
+
+        The upper bound of the bucket containing the requested rank is
+        returned, clamped to the largest value seen. Returns None if no
+        samples have been recorded.
+        """
+        if not self.count:
+            return None
+        rank = self.count * percent / 100.0
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                if index < len(self.bounds):
+                    return min(self.bounds[index], self.max)
+                return self.max
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count,
+                'mean': self.total / self.count if self.count else None,
+                'min': self.min,
+                'max': self.max,
+                'p50': self.percentile(50),
+                'p90': self.percentile(90),
+                'p99': self.percentile(99),
+                'buckets': list(zip(list(self.bounds) + ['+Inf'], self.counts))}
+
+
+class ScrapeStats(object):
+    """Scrape, publish and publish lock wait statistics for a single device."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.scrape_time = Histogram()
+        self.publish_time = Histogram()
+        self.lock_wait_time = Histogram()
+        self.reset()
+
+    def reset(self):
+        self.scrape_time.reset()
+        self.publish_time.reset()
+        self.lock_wait_time.reset()
+        self.scrapes = 0
+        self.failures = 0
+        self.overruns = 0
+        self.last_points = 0
+        self.total_points = 0
+        self.last_bytes = 0
+        self.total_bytes = 0
+
+    def record_failure(self, scrape_time):
+        self.failures += 1
+        self.scrape_time.record(scrape_time)
+
+    def record_lock_wait(self, wait_time):
+        self.lock_wait_time.record(wait_time)
+
+    def size_due(self, points):
+        """Return True if the size of a scrape of ``points`` points should be measured."""
+        return points != self.last_points or self.scrapes % SIZE_SAMPLE_INTERVAL == 0
+
+    def record_scrape(self, scrape_time, publish_time, points, size=None):
+        """Record a completed scrape cycle.
+
+        :param scrape_time: Seconds spent in the interface's ``scrape_all``.
+        :param publish_time: Seconds spent publishing the results.
+        :param points: Number of points returned by the scrape.
+        :param size: Serialized size of the scrape results in bytes, None if
+            it was not measured and the last sampled size is used.
+        """
+        if size is None:
+            size = self.last_bytes
+        self.scrapes += 1
+        self.scrape_time.record(scrape_time)
+        self.publish_time.record(publish_time)
+        if scrape_time + publish_time > self.interval:
+            self.overruns += 1
+        self.last_points = points
+        self.total_points += points
+        self.last_bytes = size
+        self.total_bytes += size
+
+    def to_dict(self):
+        return {'interval': self.interval,
+                'scrapes': self.scrapes,
+                'failures': self.failures,
+                'overruns': self.overruns,
+                'last_points': self.last_points,
+                'total_points': self.total_points,
+                'last_bytes': self.last_bytes,
+                'total_bytes': self.total_bytes,
+                'scrape_time': self.scrape_time.to_dict(),
+                'publish_time': self.publish_time.to_dict(),
+                'lock_wait_time': self.lock_wait_time.to_dict()}
+
+    def summary(self):
+        """Compact form used for the periodic summary publish."""
+        return {'scrapes': self.scrapes,
+                'failures': self.failures,
+                'overruns': self.overruns,
+                'last_points': self.last_points,
+                'last_bytes': self.last_bytes,
+                'scrape_time_p99': self.scrape_time.percentile(99),
+                'publish_time_p99': self.publish_time.percentile(99),
+                'lock_wait_time_p99': self.lock_wait_time.percentile(99)}
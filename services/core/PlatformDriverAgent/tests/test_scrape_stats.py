@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2023 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+import pytest
+
+from platform_driver.scrape_stats import Histogram, ScrapeStats, SIZE_SAMPLE_INTERVAL
+
+
+@pytest.mark.driver_unit
+def test_histogram_percentiles():
+    histogram = Histogram()
+    assert histogram.percentile(50) is None
+
+    for _ in range(98):
+        histogram.record(0.002)
+    histogram.record(0.3)
+    histogram.record(0.7)
+
+    assert histogram.count == 100
+    assert histogram.min == 0.002
+    assert histogram.max == 0.7
+    assert histogram.percentile(50) == 0.0025
+    assert histogram.percentile(99) == 0.5
+    assert histogram.percentile(100) == 0.7
+
+    stats = histogram.to_dict()
+    assert stats['count'] == 100
+    assert sum(count for _, count in stats['buckets']) == 100
+
+
+@pytest.mark.driver_unit
+def test_histogram_overflow_bucket():
+    histogram = Histogram(bounds=(1.0,))
+    histogram.record(5.0)
+    assert histogram.counts == [0, 1]
+    assert histogram.percentile(50) == 5.0
+
+
+@pytest.mark.driver_unit
+def test_scrape_stats_overruns_and_reset():
+    stats = ScrapeStats(interval=1)
+    stats.record_scrape(0.2, 0.1, 10, 200)
+    stats.record_scrape(0.8, 0.5, 12, 240)
+    stats.record_lock_wait(0.01)
+    stats.record_failure(0.5)
+
+    result = stats.to_dict()
+    assert result['scrapes'] == 2
+    assert result['overruns'] == 1
+    assert result['failures'] == 1
+    assert result['last_points'] == 12
+    assert result['total_points'] == 22
+    assert result['total_bytes'] == 440
+    assert result['scrape_time']['count'] == 3
+    assert result['lock_wait_time']['count'] == 1
+
+    summary = stats.summary()
+    assert summary['overruns'] == 1
+    assert summary['publish_time_p99'] == 0.5
+
+    stats.reset()
+    assert stats.to_dict()['scrapes'] == 0
+    assert stats.scrape_time.count == 0
+
+
+@pytest.mark.driver_unit
+def test_scrape_stats_size_sampling():
+    stats = ScrapeStats(interval=1)
+    assert stats.size_due(10)
+    stats.record_scrape(0.2, 0.1, 10, 200)
+    assert not stats.size_due(10)
+    # A change in the number of points is measured immediately.
+    assert stats.size_due(11)
+
+    for _ in range(SIZE_SAMPLE_INTERVAL - 1):
+        stats.record_scrape(0.2, 0.1, 10)
+    assert stats.last_bytes == 200
+    assert stats.total_bytes == 200 * SIZE_SAMPLE_INTERVAL
+    assert stats.size_due(10)
+
+    # Empty scrapes are recorded with no points.
+    stats.record_scrape(0.2, 0.0, 0, 0)
+    assert stats.scrapes == SIZE_SAMPLE_INTERVAL + 1
+    assert stats.last_points == 0
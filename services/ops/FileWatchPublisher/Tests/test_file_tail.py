@@ -0,0 +1,70 @@
+import os
+
+from filewatchpublisher.agent import FileTail
+
+
+def _append(path, text):
+    with open(path, "a") as f:
+        f.write(text)
+
+
+def test_append_and_filter(tmp_path):
+    path = str(tmp_path / "test.log")
+    _append(path, "existing line\n")
+    tail = FileTail(path, "platform/test_topic", include="volttron", exclude="DEBUG")
+    assert tail.read_lines() == []
+
+    _append(path, "volttron INFO one\nother INFO two\nvolttron DEBUG three\nvolttron INFO four\n")
+    assert tail.read_lines() == ["volttron INFO one", "volttron INFO four"]
+    assert tail.read_lines() == []
+    tail.close()
+
+
+def test_rotation(tmp_path):
+    path = str(tmp_path / "test.log")
+    _append(path, "first\n")
+    tail = FileTail(path, "platform/test_topic")
+
+    _append(path, "second\n")
+    os.rename(path, path + ".1")
+    _append(path, "third\n")
+    assert tail.read_lines() == ["second", "third"]
+
+    _append(path, "fourth\n")
+    assert tail.read_lines() == ["fourth"]
+    tail.close()
+
+
+def test_truncation(tmp_path):
+    path = str(tmp_path / "test.log")
+    _append(path, "test_data")
+    tail = FileTail(path, "platform/test_topic")
+
+    # Rewritten past the previous read position, the unterminated line is only read once completed.
+    with open(path, "w+") as f:
+        f.write("more test_data")
+    assert tail.read_lines() == []
+    _append(path, "\n")
+    assert tail.read_lines() == ["more test_data"]
+
+    with open(path, "w") as f:
+        f.write("short\n")
+    assert tail.read_lines() == ["short"]
+    tail.close()
+
+
+def test_partial_line(tmp_path):
+    path = str(tmp_path / "test.log")
+    _append(path, "first\n")
+    tail = FileTail(path, "platform/test_topic")
+
+    _append(path, "second\nthi")
+    assert tail.read_lines() == ["second"]
+    _append(path, "rd\nfour")
+    assert tail.read_lines() == ["third"]
+
+    # The unterminated line is published when the file is rotated.
+    os.rename(path, path + ".1")
+    _append(path, "fifth\n")
+    assert tail.read_lines() == ["four", "fifth"]
+    tail.close()
@@ -28,19 +28,24 @@
 
 import gevent
 import logging
-import os.path
+import os
+import re
 import sys
 
 from datetime import datetime
-from volttron.platform.agent.utils import watch_file_with_fullpath
 from volttron.platform.vip.agent import Agent, Core
 from volttron.platform.agent import utils
+from volttron.platform.scheduling import periodic
 
 
 utils.setup_logging()
 _log = logging.getLogger(__name__)
 __version__ = '3.6'
 
+# Number of bytes before the read position remembered to detect a file
+# that has been truncated and rewritten past the read position.
+FINGERPRINT_SIZE = 64
+
 
 def file_watch_publisher(config_path, **kwargs):
     """
@@ -60,6 +65,11 @@ class FileWatchPublisher(Agent):
     Monitors files from configuration for changes and publishes added lines on corresponding topics.
     Ignores if a file does not exist and move to next file in configuration with an error message.
     Exists if all files does not exist.
+
+    Files are checked every flush_interval seconds and the lines added since
+    the last check are published together, at most max_batch_lines per
+    message. Lines can be filtered with optional include and exclude regular
+    expressions.
     :param config: Configuration dict
     :type config: dict
 
@@ -68,10 +78,14 @@ class FileWatchPublisher(Agent):
     .. code-block:: python
 
         {
-            "publish_file": [
+            "flush_interval": 1,
+            "max_batch_lines": 1000,
+            "files": [
                 {
                     "file": "/var/log/syslog",
                     "topic": "platform/syslog",
+                    "include": "volttron",
+                    "exclude": "DEBUG"
                 },
                 {
                     "file": "/home/volttron/tempfile.txt",
@@ -85,47 +99,142 @@ class FileWatchPublisher(Agent):
         self.config = config
         items = config.get("files")
         assert isinstance(items, list)
-        self.file_topic = {}
-        self.file_end_position = {}
-        for item in self.config.get("files"):
+        self.flush_interval = config.get("flush_interval", 1)
+        self.max_batch_lines = config.get("max_batch_lines", 1000)
+        self.tails = []
+        for item in items:
             file = item["file"]
-            self.file_topic[file] = item["topic"]
             if os.path.isfile(file):
-                with open(file, 'r') as f:
-                    self.file_end_position[file] = self.get_end_position(f)
+                self.tails.append(FileTail(file, item["topic"],
+                                           include=item.get("include"),
+                                           exclude=item.get("exclude")))
             else:
                 _log.error("File " + file + " does not exists. Ignoring this file.")
-                items.remove(item)
-        self.files_to_watch = items
 
     @Core.receiver('onstart')
     def starting(self, sender, **kwargs):
         _log.info("Starting "+self.__class__.__name__+" agent")
-        if len(self.files_to_watch) == 0:
+        if len(self.tails) == 0:
             _log.error("No file to watch and publish. Stopping "+self.__class__.__name__+" agent.")
             gevent.spawn_later(3, self.core.stop)
         else:
-            for item in self.files_to_watch:
-                file = item["file"]
-                self.core.spawn(watch_file_with_fullpath, file, self.read_file)
-
-    def read_file(self, file):
-        _log.debug('loading file %s', file)
-        with open(file, 'r') as f:
-            f.seek(self.file_end_position[file])
-            for line in f:
-                self.publish_file(line.strip(),self.file_topic[file])
-            self.file_end_position[file] = self.get_end_position(f)
-
-    def publish_file(self, line, topic):
+            self.core.schedule(periodic(self.flush_interval), self.publish_files)
+
+    @Core.receiver('onstop')
+    def stopping(self, sender, **kwargs):
+        for tail in self.tails:
+            tail.close()
+
+    def publish_files(self):
+        for tail in self.tails:
+            try:
+                lines = tail.read_lines()
+            except OSError as e:
+                _log.error("Unable to read file {}: {}".format(tail.path, e))
+                continue
+            for i in range(0, len(lines), self.max_batch_lines):
+                self.publish_lines(lines[i:i + self.max_batch_lines], tail.topic)
+
+    def publish_lines(self, lines, topic):
         message = {'timestamp':  datetime.utcnow().isoformat() + 'Z',
-                   'line': line}
-        _log.debug('publishing message {} on topic {}'.format(message, topic))
+                   'lines': lines}
+        _log.debug('publishing {} lines on topic {}'.format(len(lines), topic))
         self.vip.pubsub.publish(peer="pubsub", topic=topic, message=message)
 
-    def get_end_position(self, f):
-        f.seek(0, 2)
-        return f.tell()
+
+class FileTail(object):
+    """
+    Read position in a watched file.
+
+    The file is kept open and identified by its inode so a rotated file is
+    read to its end before the new file at the same path is opened. A file
+    that shrinks, or whose bytes before the read position change, is read
+    again from the start. A trailing line without a newline is left unread
+    until it is completed, or until the file is rotated or removed.
+    :param path: Path of the file to watch
+    :param topic: Topic the lines of the file are published on
+    :param include: Only lines matching this regular expression are published
+    :param exclude: Lines matching this regular expression are not published
+    """
+    def __init__(self, path, topic, include=None, exclude=None):
+        self.path = path
+        self.topic = topic
+        self.include = re.compile(include) if include else None
+        self.exclude = re.compile(exclude) if exclude else None
+        self.inode = None
+        self.offset = 0
+        self._file = None
+        self._fingerprint = b''
+        # Only lines added after the agent starts are published.
+        self._open(at_end=True)
+
+    def _open(self, at_end):
+        f = open(self.path, 'rb')
+        self.close()
+        self._file = f
+        stat = os.fstat(f.fileno())
+        self.inode = stat.st_ino
+        self.offset = stat.st_size if at_end else 0
+        f.seek(max(0, self.offset - FINGERPRINT_SIZE))
+        self._fingerprint = f.read(self.offset - f.tell())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def read_lines(self):
+        """
+        Return the lines added to the file since the last call which pass
+        the include and exclude filters.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None
+
+        if stat is None or stat.st_ino != self.inode:
+            # Rotated or removed, finish the file that is still open.
+            lines = self._read_new(final=True)
+            if stat is not None:
+                _log.info("File {} was rotated".format(self.path))
+                self._open(at_end=False)
+                lines.extend(self._read_new())
+        elif stat.st_size == self.offset:
+            return []
+        else:
+            if stat.st_size < self.offset or not self._fingerprint_matches():
+                _log.info("File {} was truncated".format(self.path))
+                self.offset = 0
+                self._fingerprint = b''
+            lines = self._read_new()
+
+        return [line for line in lines if self._wanted(line)]
+
+    def _fingerprint_matches(self):
+        if not self._fingerprint:
+            return True
+        self._file.seek(self.offset - len(self._fingerprint))
+        return self._file.read(len(self._fingerprint)) == self._fingerprint
+
+    def _read_new(self, final=False):
+        self._file.seek(self.offset)
+        data = self._file.read()
+        if not final:
+            # The writer may still be in the middle of the last line.
+            data = data[:data.rfind(b'\n') + 1]
+        if not data:
+            return []
+        self.offset += len(data)
+        self._fingerprint = (self._fingerprint + data)[-FINGERPRINT_SIZE:]
+        return [line.strip() for line in data.decode('utf-8', errors='replace').splitlines()]
+
+    def _wanted(self, line):
+        if self.include is not None and not self.include.search(line):
+            return False
+        if self.exclude is not None and self.exclude.search(line):
+            return False
+        return True
 
 
 def main(argv=sys.argv):
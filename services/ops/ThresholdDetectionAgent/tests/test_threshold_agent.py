@@ -37,7 +37,7 @@ from volttron.platform.vip.agent import Agent, Core, PubSub, RPC, compat
 from volttron.platform.agent import utils
 from volttron.platform.messaging.health import Status, STATUS_BAD
 from volttrontesting.utils.utils import AgentMock
-from thresholddetection.agent import ThresholdDetectionAgent
+from thresholddetection.agent import Threshold, ThresholdDetectionAgent
 
 utils.setup_logging()
 _log = logging.getLogger(__name__)
@@ -73,6 +73,25 @@ class TestAgent(unittest.TestCase):
             all_calls.append(call)
         assert 'below' in all_calls[4].args[1].context
 
+    def test_threshold_hysteresis(self):
+        threshold = Threshold({'threshold_max': 10, 'hysteresis': 2, 'alert_interval': 60})
+        assert threshold.check(11, 0) == 10
+        # Still out of range, or back in range but within the hysteresis band.
+        assert threshold.check(12, 1) is None
+        assert threshold.check(9, 2) is None
+        assert threshold.check(11, 3) is None
+        # Repeated once the alert interval has passed.
+        assert threshold.check(11, 60) == 10
+        # Back in range past the hysteresis band, a new excursion alerts.
+        assert threshold.check(8, 61) is None
+        assert threshold.check(11, 62) == 10
+
+    def test_threshold_direction_change(self):
+        threshold = Threshold({'threshold_max': 10, 'threshold_min': 0})
+        assert threshold.check(-1, 0) == 0
+        assert threshold.check(11, 1) == 10
+        assert threshold.check(12, 2) is None
+
 
 def main(argv=sys.argv):
     agent = ThresholdDetectionAgent()
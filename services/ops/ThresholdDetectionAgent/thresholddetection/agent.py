@@ -28,6 +28,7 @@
 
 import logging
 import sys
+import time
 import uuid
 
 from volttron.platform.vip.agent import Agent, Core, PubSub, RPC, compat
@@ -38,6 +39,10 @@ utils.setup_logging()
 _log = logging.getLogger(__name__)
 __version__ = '3.7'
 
+# Seconds between repeated alerts for a value that stays out of range.
+DEFAULT_ALERT_INTERVAL = 300
+
+
 
 def thresholddetection_agent(config_path, **kwargs):
     """Load configuration for ThresholdDetectionAgent
@@ -75,11 +80,17 @@ class ThresholdDetectionAgent(Agent):
             "devices/some/device/topic/all": {
                 "some_point": {
                     "threshold_max": 42,
-                    "threshold_min": 0
+                    "threshold_min": 0,
+                    "hysteresis": 2,
+                    "alert_interval": 600
                 }
             }
         }
 
+    An alert is sent when a value leaves the acceptable range and repeated
+    at most every ``alert_interval`` seconds while it stays out of range. A
+    value is only considered back in range once it is ``hysteresis`` inside
+    the threshold.
     """
     def __init__(self, config, **kwargs):
         super(ThresholdDetectionAgent, self).__init__(**kwargs)
@@ -111,30 +122,34 @@ class ThresholdDetectionAgent(Agent):
         Subscribe to points in a device's all publish and alert if
         values are out of range
 
+        All points of the device are checked by a single callback.
+
         :param topic: All topic from a device scrape
         :type topic: str
 
         :param device_points: Dictionary of points to thresholds
         :type device_points: dict
         """
-        for point, values in device_points.items():
-            threshold_max = values.get('threshold_max')
-            threshold_min = values.get('threshold_min')
-
-            def callback(peer, sender, bus, topic, headers, message):
-                data = message[0].get(point)
-
+        thresholds = [Threshold(values, point=point)
+                      for point, values in device_points.items()]
+
+        def callback(peer, sender, bus, topic, headers, message):
+            values = message[0]
+            now = time.monotonic()
+            for threshold in thresholds:
+                data = values.get(threshold.point)
+                if data is None:
+                    continue
                 try:
-                    float(data)
-                except ValueError:
-                    return
+                    data = float(data)
+                except (TypeError, ValueError):
+                    continue
 
-                if threshold_max is not None and data > threshold_max:
-                    self._alert(topic, threshold_max, data, point=point)
-                elif threshold_min is not None and data < threshold_min:
-                    self._alert(topic, threshold_min, data, point=point)
+                limit = threshold.check(data, now)
+                if limit is not None:
+                    self._alert(topic, limit, data, point=threshold.point)
 
-            self.vip.pubsub.subscribe('pubsub', topic, callback)
+        self.vip.pubsub.subscribe('pubsub', topic, callback)
 
     def _create_standard_subscription(self, topic, values):
         """
@@ -146,19 +161,17 @@ class ThresholdDetectionAgent(Agent):
         :param device_points: Dictionary of points to thresholds
         :type device_points: dict
         """
-        threshold_max = values.get('threshold_max')
-        threshold_min = values.get('threshold_min')
+        threshold = Threshold(values)
 
         def callback(peer, sender, bus, topic, headers, data):
             try:
-                float(data)
-            except ValueError:
+                data = float(data)
+            except (TypeError, ValueError):
                 return
 
-            if threshold_max is not None and data > threshold_max:
-                self._alert(topic, threshold_max, data)
-            elif threshold_min is not None and data < threshold_min:
-                self._alert(topic, threshold_min, data)
+            limit = threshold.check(data, time.monotonic())
+            if limit is not None:
+                self._alert(topic, limit, data)
 
         self.vip.pubsub.subscribe('pubsub', topic, callback)
 
@@ -222,6 +235,66 @@ class ThresholdDetectionAgent(Agent):
         self.vip.health.send_alert(topic, status)
 
 
+class Threshold(object):
+    """
+    Alarm state of a single topic or device point.
+
+    :param values: Threshold configuration of the topic or point
+    :type values: dict
+
+    :param point: Point name when the threshold is part of an all publish
+    :type point: str
+    """
+    __slots__ = ('point', 'threshold_max', 'threshold_min', 'hysteresis',
+                 'alert_interval', 'alarm', 'last_alert')
+
+    def __init__(self, values, point=None):
+        self.point = point
+        self.threshold_max = values.get('threshold_max')
+        self.threshold_min = values.get('threshold_min')
+        self.hysteresis = values.get('hysteresis', 0)
+        self.alert_interval = values.get('alert_interval',
+                                         DEFAULT_ALERT_INTERVAL)
+        # 'above' or 'below' while out of range, None while in range.
+        self.alarm = None
+        self.last_alert = None
+
+    def check(self, data, now):
+        """
+        Update the alarm state with a new value.
+
+        :param data: Published value
+        :type data: float
+
+        :param now: Monotonic time of the publish
+        :type now: float
+
+        :returns: The exceeded limit if an alert should be sent, else None
+        :rtype: float
+        """
+        if self.threshold_max is not None and data > self.threshold_max:
+            alarm, limit = 'above', self.threshold_max
+        elif self.threshold_min is not None and data < self.threshold_min:
+            alarm, limit = 'below', self.threshold_min
+        elif self.alarm is None:
+            return None
+        else:
+            # Stay in alarm until the value is back inside the hysteresis band.
+            if self.alarm == 'above':
+                if data <= self.threshold_max - self.hysteresis:
+                    self.alarm = None
+            elif data >= self.threshold_min + self.hysteresis:
+                self.alarm = None
+            return None
+
+        if alarm == self.alarm and \
+                now - self.last_alert < self.alert_interval:
+            return None
+        self.alarm = alarm
+        self.last_alert = now
+        return limit
+
+
 def main(argv=sys.argv):
     """Main method called by the platform."""
     utils.vip_main(thresholddetection_agent,
@@ -0,0 +1,68 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from topic_watcher.agent import AlertGroup, PrefixTrie
+
+
+@pytest.fixture
+def group():
+    pubsub = SimpleNamespace(subscribe=lambda **kwargs: None,
+                             unsubscribe=lambda **kwargs: None)
+    main_agent = SimpleNamespace(vip=SimpleNamespace(pubsub=pubsub))
+    connection = sqlite3.connect(':memory:')
+    connection.execute("CREATE TABLE topic_log(topic TEXT, "
+                       "last_seen_before_timeout TIMESTAMP, "
+                       "first_seen_after_timeout TIMESTAMP)")
+    config = {"fakedevice": 2,
+              "fakedevice2/all": {"seconds": 3, "points": ["point"]}}
+    yield AlertGroup("group1", config, connection, main_agent)
+    connection.close()
+
+
+def _tick(group, seconds):
+    alerts = []
+    for _ in range(seconds):
+        alerts.append(sorted(group.check_deadlines()[0], key=str))
+    return alerts
+
+
+@pytest.mark.alert
+def test_prefix_trie_longest_match():
+    trie = PrefixTrie()
+    trie.add("devices/campus")
+    trie.add("devices/campus/building/ahu")
+    assert trie.longest_prefix("devices/campus/building/ahu1/all") == "devices/campus/building/ahu"
+    assert trie.longest_prefix("devices/campus/building/vav/all") == "devices/campus"
+    assert trie.longest_prefix("devices/other") is None
+
+    trie.remove("devices/campus/building/ahu")
+    assert trie.longest_prefix("devices/campus/building/ahu1/all") == "devices/campus"
+
+
+@pytest.mark.alert
+def test_deadlines(group):
+    assert _tick(group, 2) == [[], ["fakedevice"]]
+    assert group.unseen_topics == {"fakedevice"}
+
+    # Data arriving resets the deadline of the topic and its points.
+    group.reset_time(None, None, None, "fakedevice2/all", {}, [{"point": 1}])
+    group.reset_time(None, None, None, "fakedevice/sub/topic", {}, None)
+    assert "fakedevice" not in group.unseen_topics
+    assert _tick(group, 3) == [[], ["fakedevice"], [("fakedevice2/all", "point"), "fakedevice2/all"]]
+
+    # Only the all topic arrives, the missing point keeps timing out.
+    group.reset_time(None, None, None, "fakedevice2/all", {}, [{"other": 1}])
+    assert _tick(group, 2) == [["fakedevice"], []]
+    group.reset_time(None, None, None, "fakedevice2/all", {}, [{"other": 1}])
+    assert _tick(group, 1) == [[("fakedevice2/all", "point"), "fakedevice"]]
+
+    group.ignore_topic("fakedevice2/all")
+    assert _tick(group, 6) == [[], ["fakedevice"], [], ["fakedevice"], [], ["fakedevice"]]
+
+
+@pytest.mark.alert
+def test_shorter_timeout(group):
+    group.watch_topic("fakedevice2/all", 1)
+    assert _tick(group, 1) == [["fakedevice2/all"]]
@@ -22,6 +22,8 @@
 # ===----------------------------------------------------------------------===
 # }}}
 
+import heapq
+import itertools
 import logging
 import os
 
@@ -254,53 +256,68 @@ class AlertAgent(Agent):
         group.ignore_topic(topic)
 
     @Core.schedule(periodic(1))
-    def decrement_ttl(self):
+    def check_deadlines(self):
         """Periodic call
 
-        Used to maintain the time since each topic's last publish.
-        Sends an alert if any topics are missing.
+        Advances each group's clock by one second and sends an alert if any
+        topics or points of the group have passed their deadline.
         """
+        for group in self.group_instances.values():
+            alert_topics, topics_timedout = group.check_deadlines()
 
-        # Loop through each alert group
-        for name in self.group_instances:
+            if alert_topics:
+                try:
+                    group.send_alert(alert_topics)
+                except ZMQError:
+                    group.main_agent.reset_remote_agent()
 
-            topics_timedout = set()
-            alert_topics = set()
+            if topics_timedout:
+                group.log_timeout(topics_timedout)
 
-            # Loop through topics in alert group
-            for topic in self.group_instances[name].wait_time.keys():
 
-                # Send an alert if a topic hasn't been
-                self.group_instances[name].topic_ttl[topic] -= 1
-                if self.group_instances[name].topic_ttl[topic] <= 0:
-                    alert_topics.add(topic)
-                    self.group_instances[name].topic_ttl[topic] = self.group_instances[name].wait_time[topic]
-                    if topic not in self.group_instances[name].unseen_topics:
-                        topics_timedout.add(topic)
-                        self.group_instances[name].unseen_topics.add(topic)
+class PrefixTrie(object):
+    """Character trie of watched topic prefixes.
 
-                # Send an alert if a point hasn't been seen
-                try:
-                    points = self.group_instances[name].point_ttl[topic].keys()
-                    for p in points:
-                        self.group_instances[name].point_ttl[topic][p] -= 1
-                        if self.group_instances[name].point_ttl[topic][p] <= 0:
-                            self.group_instances[name].point_ttl[topic][p] = self.group_instances[name].wait_time[topic]
-                            alert_topics.add((topic, p))
-                            if (topic, p) not in self.group_instances[name].unseen_topics:
-                                topics_timedout.add((topic, p))
-                                self.group_instances[name].unseen_topics.add((topic, p))
-                except KeyError:
-                    pass
+    Finds the longest watched prefix of a published topic in time
+    proportional to the length of the topic rather than the number of
+    watched topics.
+    """
 
-            if alert_topics:
-                try:
-                    self.group_instances[name].send_alert(list(alert_topics))
-                except ZMQError:
-                    self.group_instances[name].main_agent.reset_remote_agent()
+    def __init__(self):
+        self._root = {}
 
-            if topics_timedout:
-                self.group_instances[name].log_timeout(list(topics_timedout))
+    def add(self, prefix):
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        # The empty string is never a character of a topic so it is used to
+        # mark the end of a watched prefix.
+        node[''] = prefix
+
+    def remove(self, prefix):
+        path = []
+        node = self._root
+        for char in prefix:
+            if char not in node:
+                return
+            path.append((node, char))
+            node = node[char]
+        node.pop('', None)
+        # Prune the branch back to the last node still in use.
+        for parent, char in reversed(path):
+            if parent[char]:
+                break
+            del parent[char]
+
+    def longest_prefix(self, topic):
+        node = self._root
+        match = node.get('')
+        for char in topic:
+            node = node.get(char)
+            if node is None:
+                break
+            match = node.get('', match)
+        return match
 
 
 class AlertGroup():
@@ -312,12 +329,23 @@ class AlertGroup():
         self.main_agent = main_agent
 
         self.wait_time = {}
-        self.topic_ttl = {}
-        self.point_ttl = {}
+        self.points = {}
         self.unseen_topics = set()
         self.last_seen = {}
         self.publish_local = publish_local
         self.publish_remote = publish_remote
+
+        # Deadlines are counted in seconds of the group's own clock which is
+        # advanced by check_deadlines. A topic or (topic, point) key maps to
+        # the second in which it times out. Arrivals only move the deadline;
+        # the heap holds at most one live entry per key, which is pushed
+        # back to the current deadline when it is popped early.
+        self.now = 0
+        self._deadlines = {}
+        self._scheduled = {}
+        self._heap = []
+        self._sequence = itertools.count()
+        self._prefixes = PrefixTrie()
         self.parse_config()
 
     def parse_config(self):
@@ -347,9 +375,12 @@ class AlertGroup():
         :param timeout: Seconds before an alert is sent.
         :type timeout: int
         """
+        new_topic = topic not in self.wait_time
         self.wait_time[topic] = timeout
-        self.topic_ttl[topic] = timeout
-        self.main_agent.vip.pubsub.subscribe(peer='pubsub', prefix=topic, callback=self.reset_time)
+        self._reset_deadline(topic)
+        if new_topic:
+            self._prefixes.add(topic)
+            self.main_agent.vip.pubsub.subscribe(peer='pubsub', prefix=topic, callback=self.reset_time)
 
     def watch_device(self, topic, timeout, points):
         """Watch a device's ALL topic and expect points. This
@@ -363,13 +394,16 @@ class AlertGroup():
         :param points: Points to expect in the publish message.
         :type points: [str]
         """
-        self.point_ttl[topic] = {}
-
-        for p in points:
-            self.point_ttl[topic][p] = timeout
+        for p in self.points.get(topic, ()):
+            if p not in points:
+                self._remove_deadline((topic, p))
 
+        self.points[topic] = set(points)
         self.watch_topic(topic, timeout)
 
+        for p in points:
+            self._reset_deadline((topic, p))
+
     def ignore_topic(self, topic):
         """Remove a topic from the group watchlist
 
@@ -379,24 +413,75 @@ class AlertGroup():
         _log.info("Removing topic {} from watchlist".format(topic))
 
         self.main_agent.vip.pubsub.unsubscribe(peer='pubsub', prefix=topic, callback=self.reset_time)
-        points = self.point_ttl.pop(topic, None)
-        self.topic_ttl.pop(topic, None)
+        self._prefixes.remove(topic)
+        points = self.points.pop(topic, ())
         self.wait_time.pop(topic, None)
-        self.unseen_topics.remove(topic)
+        self._remove_deadline(topic)
+        self.unseen_topics.discard(topic)
         for p in points:
-            self.unseen_topics.remove((topic, p))
+            self._remove_deadline((topic, p))
+            self.unseen_topics.discard((topic, p))
 
     def restart_timer(self):
         """
         Reset timer for all topics in this alert group. Should be called
         when a new topic is added to a currently active alert group
         """
-
-        for t in self.topic_ttl:
-            self.topic_ttl[t] = self.wait_time[t]
-        for topic in self.point_ttl:
-            for point in self.point_ttl[topic]:
-                self.point_ttl[topic][point] = self.wait_time[topic]
+        for key in self._deadlines:
+            self._reset_deadline(key)
+
+    def _reset_deadline(self, key):
+        """Move the deadline of a topic or (topic, point) key to a full
+        timeout from now."""
+        topic = key if isinstance(key, str) else key[0]
+        deadline = self.now + self.wait_time[topic]
+        self._deadlines[key] = deadline
+        scheduled = self._scheduled.get(key)
+        # A later deadline is picked up when the existing entry is popped,
+        # only an earlier one (a shorter timeout) needs a new heap entry.
+        if scheduled is None or deadline < scheduled:
+            self._schedule(key, deadline)
+
+    def _remove_deadline(self, key):
+        # The heap entry is discarded when it is popped.
+        self._deadlines.pop(key, None)
+        self._scheduled.pop(key, None)
+
+    def _schedule(self, key, deadline):
+        self._scheduled[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._sequence), key))
+
+    def check_deadlines(self):
+        """Advance the group clock by one second and collect the topics and
+        points which timed out.
+
+        Timed out keys are alerted on again every timeout until they are
+        seen, but only logged the first time.
+
+        :return: Topics to alert on and topics that newly timed out.
+        :rtype: tuple(list, list)
+        """
+        self.now += 1
+        alert_topics = []
+        topics_timedout = []
+        heap = self._heap
+        while heap and heap[0][0] <= self.now:
+            scheduled, _, key = heapq.heappop(heap)
+            if self._scheduled.get(key) != scheduled:
+                # Superseded or no longer watched.
+                continue
+            del self._scheduled[key]
+            deadline = self._deadlines[key]
+            if deadline > self.now:
+                # Data arrived since this entry was pushed.
+                self._schedule(key, deadline)
+                continue
+            alert_topics.append(key)
+            if key not in self.unseen_topics:
+                topics_timedout.append(key)
+                self.unseen_topics.add(key)
+            self._reset_deadline(key)
+        return alert_topics, topics_timedout
 
     def reset_time(self, peer, sender, bus, topic, headers, message):
         """Callback for topic subscriptions
@@ -404,43 +489,35 @@ class AlertGroup():
         Resets the timeout for topics and devices when publishes are received.
         """
         up_time = get_aware_utc_now()
-        # TODO: What is the use case for this IF STMT
-        # topic should always be there?? Ask Craig
         if topic not in self.wait_time:
-            found = False
-            # if topic isn't in wait time we need to figure out the
-            # prefix topic so that we can determine the wait time
-            for x in self.wait_time:
-                # TODO: order the wait_time topics so furthest down the tree wins.
-                if topic.startswith(x):
-                    topic = x
-                    found = True
-                    break
-            if not found:
+            # The subscription was made on a prefix of this topic, find the
+            # most specific watched prefix it belongs to.
+            prefix = self._prefixes.longest_prefix(topic)
+            if prefix is None:
                 _log.debug("No configured topic prefix for topic {}".format(
                     topic))
                 return
+            topic = prefix
 
         log_topics = set()
         # Reset the standard topic timeout
-        self.topic_ttl[topic] = self.wait_time[topic]
-        self.last_seen[topic] = get_aware_utc_now()
+        self._reset_deadline(topic)
+        self.last_seen[topic] = up_time
         if topic in self.unseen_topics:
             self.unseen_topics.remove(topic)
             # log time we saw topic only if we had earlier recorded a timeout
             log_topics.add(topic)
 
         # Reset timeouts on volatile points
-        if topic in self.point_ttl:
-            received_points = message[0].keys()
-            expected_points = self.point_ttl[topic].keys()
-            for point in expected_points:
-                if point in received_points:
-                    self.point_ttl[topic][point] = self.wait_time[topic]
-                    self.last_seen[(topic, point)] = get_aware_utc_now()
-                    if (topic, point) in self.unseen_topics:
-                        self.unseen_topics.remove((topic, point))
-                        log_topics.add((topic, point))
+        expected_points = self.points.get(topic)
+        if expected_points:
+            for point in expected_points.intersection(message[0]):
+                key = (topic, point)
+                self._reset_deadline(key)
+                self.last_seen[key] = up_time
+                if key in self.unseen_topics:
+                    self.unseen_topics.remove(key)
+                    log_topics.add(key)
 
         if log_topics:
             self.log_time_up(up_time, log_topics)
@@ -201,6 +201,7 @@ the same date over again.
 
 
 from abc import abstractmethod
+import base64
 from collections import defaultdict
 from datetime import datetime, timedelta
 from functools import wraps
@@ -212,6 +213,7 @@ import sqlite3
 import threading
 from threading import Thread
 import weakref
+import zlib
 
 from dateutil.parser import parse
 import gevent
@@ -252,10 +254,48 @@ try:
 except ImportError:
     from volttron.platform.jsonapi import dumps, loads
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 from volttron.platform.agent import utils
 
 _log = logging.getLogger(__name__)
 
+# Payload encodings accepted by insert_encoded, in order of preference.
+INSERT_ENCODINGS = (['zstd'] if zstandard is not None else []) + ['zlib']
+
+
+def encode_insert_records(records, encoding):
+    """Serialize and compress a list of insert records for insert_encoded.
+
+    The compressed payload is base64 encoded so it can be carried in a
+    JSON-RPC call.
+    """
+    data = dumps(records)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if encoding == 'zstd' and zstandard is not None:
+        data = zstandard.ZstdCompressor().compress(data)
+    elif encoding == 'zlib':
+        data = zlib.compress(data)
+    else:
+        raise ValueError("Unsupported insert encoding: {}".format(encoding))
+    return base64.b64encode(data).decode('ascii')
+
+
+def decode_insert_records(encoding, payload):
+    """Return the list of insert records from an encode_insert_records payload."""
+    data = base64.b64decode(payload)
+    if encoding == 'zstd' and zstandard is not None:
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif encoding == 'zlib':
+        data = zlib.decompress(data)
+    else:
+        raise ValueError("Unsupported insert encoding: {}".format(encoding))
+    return loads(data.decode('utf-8'))
+
 
 # Build the parser
 time_parser = None
@@ -668,6 +708,9 @@ class BaseHistorianAgent(Agent):
 
         :param records: List of items to be added to the local event queue
         :type records: list of dictionaries
+        :returns: Indexes of the records that could not be added and may
+                  be sent again.
+        :rtype: list
         """
 
         # This is for Forward Historians which do not support data mover inserts.
@@ -677,10 +720,15 @@ class BaseHistorianAgent(Agent):
         rpc_peer = self.vip.rpc.context.vip_message.peer
         _log.debug("insert called by {} with {} records".format(rpc_peer, len(records)))
 
-        for r in records:
-            topic = r['topic']
-            headers = r['headers']
-            message = r['message']
+        failed = []
+        for index, r in enumerate(records):
+            try:
+                topic = r['topic']
+                headers = r['headers']
+                message = r['message']
+            except (KeyError, TypeError):
+                _log.error("Malformed record in insert call: {}".format(r))
+                continue
 
             capture_func = None
             if topic.startswith(topics.DRIVER_TOPIC_BASE):
@@ -693,12 +741,36 @@ class BaseHistorianAgent(Agent):
                 capture_func = self._capture_record_data
 
             if capture_func:
-                capture_func(peer=None, sender=None, bus=None,
-                             topic=topic, headers=headers, message=message)
+                try:
+                    capture_func(peer=None, sender=None, bus=None,
+                                 topic=topic, headers=headers, message=message)
+                except Exception as e:
+                    _log.error("Failed to insert record for {}: {}".format(topic, repr(e)))
+                    failed.append(index)
             else:
                 _log.error("Unrecognized topic in insert call: {}".format(topic))
+        return failed
+
+    @RPC.export
+    def get_insert_encodings(self):
+        """RPC method returning the payload encodings accepted by insert_encoded.
 
+        :returns: Encoding names in order of preference.
+        :rtype: list
+        """
+        return INSERT_ENCODINGS
+
+    @RPC.export
+    def insert_encoded(self, encoding, payload):
+        """RPC method to insert a compressed batch of records.
 
+        :param encoding: One of the encodings returned by get_insert_encodings.
+        :param payload: Records as created by encode_insert_records.
+        :returns: Indexes of the records that could not be added and may
+                  be sent again.
+        :rtype: list
+        """
+        return self.insert(decode_insert_records(encoding, payload))
 
     @Core.receiver("onstop")
     def stopping(self, sender, **kwargs):
@@ -62,6 +62,28 @@ class PolyLine:
             self._max_x = PolyLine.max(self._max_x, point.x)
             self._max_y = PolyLine.max(self._max_y, point.y)
 
+    def extend(self, points):
+        """Add several points, sorting once instead of after every point.
+
+        The result is the same as calling add for each point in order.
+        """
+        if self.points is None:
+            self.points = []
+        seen = set(self.points)
+        for point in points:
+            if point in seen:
+                continue
+            seen.add(point)
+            self.points.append(point)
+            if point.x is not None and point.y is not None:
+                self._min_x = PolyLine.min(self._min_x, point.x)
+                self._min_y = PolyLine.min(self._min_y, point.y)
+                self._max_x = PolyLine.max(self._max_x, point.x)
+                self._max_y = PolyLine.max(self._max_y, point.y)
+        self.points.sort(key=lambda tup: tup[1], reverse=True)
+        self.xs = None
+        self.ys = None
+
     def contains_none(self):
         result = False
         if self.points is not None and len(self.points) > 0:
@@ -213,6 +235,49 @@ class PolyLine:
             return False
         return True
 
+    @staticmethod
+    def descending_y(points):
+        for i in range(len(points) - 1):
+            if points[i][1] is None or points[i + 1][1] is None or points[i][1] < points[i + 1][1]:
+                return False
+        return True
+
+    @staticmethod
+    def scan_intersects(pl_1, pl_2):
+        """Return the first pair of segments, in the order of the points, for which segment_intersects is true.
+
+        Every segment of pl_1 is compared with every segment of pl_2.
+        """
+        for i, pl_1_1 in enumerate(pl_1[:-1]):
+            pl_1_2 = pl_1[i + 1]
+            for j, pl_2_1 in enumerate(pl_2[:-1]):
+                pl_2_2 = pl_2[j + 1]
+                if PolyLine.segment_intersects((pl_1_1, pl_1_2), (pl_2_1, pl_2_2)):
+                    return (pl_1_1, pl_1_2), (pl_2_1, pl_2_2)
+        return None
+
+    @staticmethod
+    def sweep_intersects(pl_1, pl_2):
+        """Return the same pair of segments as scan_intersects for points sorted by descending y (price).
+
+        Segments can only intersect if their y ranges overlap. With both lines sorted by y, the segments of pl_2
+        overlapping a segment of pl_1 are consecutive and move forward along pl_2 as pl_1 is walked, so only those
+        are compared. For supply and demand curves this is linear rather than quadratic in the number of points.
+        """
+        start = 0
+        last = len(pl_2) - 1
+        for i, pl_1_1 in enumerate(pl_1[:-1]):
+            pl_1_2 = pl_1[i + 1]
+            # Skip the segments of pl_2 entirely above this segment of pl_1; they are above the rest of pl_1 as well.
+            while start < last and pl_2[start + 1][1] > pl_1_1[1]:
+                start += 1
+            j = start
+            while j < last and pl_2[j][1] >= pl_1_2[1]:
+                if PolyLine.segment_intersects((pl_1_1, pl_1_2), (pl_2[j], pl_2[j + 1])):
+                    return (pl_1_1, pl_1_2), (pl_2[j], pl_2[j + 1])
+                j += 1
+        return None
+
     @staticmethod
     def intersection(pl_1, pl_2):
         pl_1 = pl_1.points
@@ -242,13 +307,13 @@ class PolyLine:
 
         # we have line segments
         elif len(pl_1) > 1 and len(pl_2) > 1:
-            for i, pl_1_1 in enumerate(pl_1[:-1]):
-                pl_1_2 = pl_1[i + 1]
-                for j, pl_2_1 in enumerate(pl_2[:-1]):
-                    pl_2_2 = pl_2[j + 1]
-                    if PolyLine.segment_intersects((pl_1_1, pl_1_2), (pl_2_1, pl_2_2)):
-                        quantity, price = PolyLine.segment_intersection((pl_1_1, pl_1_2), (pl_2_1, pl_2_2))
-                        return quantity, price
+            if PolyLine.descending_y(pl_1) and PolyLine.descending_y(pl_2):
+                segments = PolyLine.sweep_intersects(pl_1, pl_2)
+            else:
+                segments = PolyLine.scan_intersects(pl_1, pl_2)
+            if segments is not None:
+                quantity, price = PolyLine.segment_intersection(*segments)
+                return quantity, price
         p1_qmax = max([point[0] for point in pl_1])
         p1_qmin = min([point[0] for point in pl_1])
 
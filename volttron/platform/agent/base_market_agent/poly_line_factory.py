@@ -32,14 +32,6 @@ _log = logging.getLogger(__name__)
 utils.setup_logging()
 
 
-def remove(duplicate):
-    final_list = []
-    for num in duplicate:
-        if num not in final_list:
-            final_list.append(num)
-    return final_list
-
-
 class PolyLineFactory:
     @staticmethod
     def combine(lines, increment):
@@ -74,19 +66,11 @@ class PolyLineFactory:
         # create an array of ys in equal increments, with highest first
         # this is assuming that price decreases with increase in demand (buyers!)
         # but seems to work with multiple suppliers?
-        ys = sorted(np.linspace(minY, maxY, num=increment), reverse=True)
+        ys = np.linspace(minY, maxY, num=increment)[::-1]
 
         # now find the cumulative x associated with each y in the array
         # starting with the highest y
-        for y in ys:
-            xt = None
-            for line in lines:
-                x = line.x(y)
-                # print x, y
-                if x is not None:
-                    xt = x if xt is None else xt + x
-            composite.add(Point(xt, y))
-
+        composite.extend(PolyLineFactory._sum_x(lines, ys))
         return composite
 
     @staticmethod
@@ -100,23 +84,26 @@ class PolyLineFactory:
                     composite.add(Point(point[0], point[1]))
                 return composite
             return lines[0]
-        # find the range defined by the curves
-        ys=[]
-        for l in lines:
-            ys=ys+l.vectorize()[1]
-
-        ys = remove(ys)
-
-        ys.sort(reverse=True)
-        for y in ys:
-            xt = None
-            for line in lines:
-                x = line.x(y)
-                if x is not None:
-                    xt = x if xt is None else xt + x
-            composite.add(Point(xt, y))
+        # the composite is linear between the breakpoints of the curves, so it is exact at the merged breakpoints
+        ys = np.unique(np.concatenate([l.vectorize()[1] for l in lines if l.points]))[::-1]
+        composite.extend(PolyLineFactory._sum_x(lines, ys))
         return composite
 
+    @staticmethod
+    def _sum_x(lines, ys):
+        """Return the points (sum of the lines' x at y, y) for an array of ys.
+
+        Each line is evaluated at all of the ys with one numpy.interp call, the same interpolation as PolyLine.x.
+        """
+        xt = None
+        for line in lines:
+            if not line.points:
+                continue
+            line.vectorize()
+            x = np.interp(ys, line.ysSortedByY, line.xsSortedByY)
+            xt = x if xt is None else xt + x
+        return [Point(x, y) for x, y in zip(xt, ys)]
+
     @staticmethod
     def fromTupples(points):
         poly_line = PolyLine()
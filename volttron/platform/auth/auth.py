@@ -32,7 +32,7 @@ from gevent.fileobject import FileObject
 
 from volttron.platform.agent.known_identities import CONTROL_CONNECTION, PROCESS_IDENTITIES
 from volttron.platform.agent.utils import create_file_if_missing, get_messagebus, watch_file
-from volttron.platform.auth.auth_entry import AuthEntry
+from volttron.platform.auth.auth_entry import AuthEntry, AuthEntryIndex
 from volttron.platform.auth.auth_file import AuthFile
 from volttron.platform.auth.auth_utils import load_user
 from volttron.platform.jsonrpc import RemoteError
@@ -64,6 +64,7 @@ class AuthService(Agent):
         self.aip = aip
         self.zap_socket = None
         self._zap_greenlet = None
+        self.auth_entry_index = AuthEntryIndex()
         self.auth_entries = []
         self._is_connected = False
         self._protected_topics_file = protected_topics_file
@@ -78,6 +79,15 @@ class AuthService(Agent):
         self.authentication_server = None
         self.authorization_server = None
 
+    @property
+    def auth_entries(self):
+        return self._auth_entries
+
+    @auth_entries.setter
+    def auth_entries(self, entries):
+        self._auth_entries = entries
+        self.auth_entry_index.update(entries)
+
     def export_auth_file(self):
         """
         Export all relevant AuthFile methods to external agents
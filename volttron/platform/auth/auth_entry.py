@@ -23,8 +23,10 @@
 # }}}
 
 
+import heapq
 import logging
 import re
+from collections import defaultdict
 from typing import Optional, Union
 import uuid
 
@@ -266,3 +268,61 @@ class AuthEntry(object):
     def _check_validity(self):
         """Raises AuthEntryInvalid if entry is invalid."""
         AuthEntry.valid_credentials(self.credentials, self.mechanism)
+
+
+class AuthEntryIndex(object):
+    """Index of enabled auth entries used to authenticate new connections.
+
+    Entries whose credentials are exact values are looked up by mechanism and
+    credential. Entries with regex credentials, and NULL mechanism entries
+    which have no credentials, are kept in a per mechanism list that is
+    scanned after the exact lookup. Candidates from both are checked in the
+    original entry order so the first matching entry is the same one a scan
+    of the whole list would find.
+    """
+
+    def __init__(self, entries=()):
+        self._exact = {}
+        self._patterns = {}
+        self.update(entries)
+
+    def update(self, entries):
+        """Rebuild the index from the current list of entries."""
+        exact = defaultdict(list)
+        patterns = defaultdict(list)
+        for position, entry in enumerate(entries):
+            credentials = entry.credentials
+            if entry.mechanism == "NULL" or not credentials:
+                patterns[entry.mechanism].append((position, entry))
+            elif isinstance(credentials, List):
+                if any(hasattr(credential, "regex") for credential in credentials):
+                    patterns[entry.mechanism].append((position, entry))
+                else:
+                    for credential in set(credentials):
+                        exact[(entry.mechanism, str(credential))].append((position, entry))
+            elif hasattr(credentials, "regex"):
+                patterns[entry.mechanism].append((position, entry))
+            else:
+                exact[(entry.mechanism, str(credentials))].append((position, entry))
+        self._exact = dict(exact)
+        self._patterns = dict(patterns)
+
+    def match(self, domain, address, mechanism, credentials):
+        """Returns the first entry matching the connection or None."""
+        exact = ()
+        if credentials:
+            try:
+                exact = self._exact.get((mechanism, credentials[0]), ())
+            except TypeError:
+                pass
+        patterns = self._patterns.get(mechanism, ())
+        if not patterns:
+            candidates = exact
+        elif not exact:
+            candidates = patterns
+        else:
+            candidates = heapq.merge(exact, patterns, key=lambda candidate: candidate[0])
+        for _, entry in candidates:
+            if entry.match(domain, address, mechanism, credentials):
+                return entry
+        return None
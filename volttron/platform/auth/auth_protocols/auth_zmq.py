@@ -177,16 +177,11 @@ class ZMQServerAuthentication(BaseServerAuthentication):
         self.zap_socket.bind("inproc://zeromq.zap.01")
 
     def authenticate(self, domain, address, mechanism, credentials):
-        for entry in self.auth_service.auth_entries:
-            # _log.info(f"Auth entry: {entry}")
-            # _log.info(f"Incoming auth: \n"
-            #           f"domain: {domain}\n"
-            #           f"address: {address}\n"
-            #           f"mechanism: {mechanism}")
-            if entry.match(domain, address, mechanism, credentials):
-                return entry.user_id or dump_user(
-                    domain, address, mechanism, *credentials[:1]
-                )
+        entry = self.auth_service.auth_entry_index.match(domain, address, mechanism, credentials)
+        if entry is not None:
+            return entry.user_id or dump_user(
+                domain, address, mechanism, *credentials[:1]
+            )
         if mechanism == "NULL" and address.startswith("localhost:"):
             parts = address.split(":")[1:]
             if len(parts) > 2:
@@ -51,6 +51,30 @@ def add_config_to_store(opts):
     )
 
 
+def add_config_dir_to_store(opts):
+    opts.connection.peer = CONFIGURATION_STORE
+    call = opts.connection.call
+
+    configs = []
+    for dir_path, _, files in os.walk(opts.directory):
+        for file_name in sorted(files):
+            path = os.path.join(dir_path, file_name)
+            name = os.path.relpath(path, opts.directory).replace(os.sep, "/")
+            config_type = opts.config_type
+            if config_type is None:
+                config_type = "csv" if file_name.lower().endswith(".csv") else "json"
+            with open(path) as f:
+                configs.append({"config_name": name,
+                                "raw_contents": f.read(),
+                                "config_type": config_type})
+
+    if not configs:
+        _stderr.write("No configurations found in {}\n".format(opts.directory))
+        return
+
+    call("set_configs", opts.identity, configs)
+
+
 def delete_config_from_store(opts):
     opts.connection.peer = CONFIGURATION_STORE
     call = opts.connection.call
@@ -58,14 +82,17 @@ def delete_config_from_store(opts):
         call("delete_store", opts.identity)
         return
 
-    if opts.name is None:
+    if not opts.name:
         _stderr.write(
             "ERROR: must specify a configuration when not deleting entire "
             "store\n"
         )
         return
 
-    call("delete_config", opts.identity, opts.name)
+    if len(opts.name) == 1:
+        call("delete_config", opts.identity, opts.name[0])
+    else:
+        call("delete_configs", opts.identity, opts.name)
 
 
 def list_store(opts):
@@ -203,6 +230,44 @@ def add_config_store_parser(add_parser_fn):
     config_store_store.set_defaults(func=add_config_to_store,
                                     config_type="json")
 
+    config_store_store_dir = add_parser_fn(
+        "store-dir",
+        help="store every file in a directory as a single change",
+        subparser=config_store_subparsers,
+    )
+
+    config_store_store_dir.add_argument("identity",
+                                        help="VIP IDENTITY of the store")
+    config_store_store_dir.add_argument(
+        "directory",
+        help="directory of configurations. The path of each file relative to "
+             "the directory is used as its name in the store",
+    )
+    config_store_store_dir.add_argument(
+        "--raw",
+        const="raw",
+        dest="config_type",
+        action="store_const",
+        help="interpret all files as raw data",
+    )
+    config_store_store_dir.add_argument(
+        "--json",
+        const="json",
+        dest="config_type",
+        action="store_const",
+        help="interpret all files as json",
+    )
+    config_store_store_dir.add_argument(
+        "--csv",
+        const="csv",
+        dest="config_type",
+        action="store_const",
+        help="interpret all files as csv",
+    )
+
+    config_store_store_dir.set_defaults(func=add_config_dir_to_store,
+                                        config_type=None)
+
     config_store_edit = add_parser_fn(
         "edit",
         help="edit a configuration. (nano by default, respects EDITOR env "
@@ -265,8 +330,9 @@ def add_config_store_parser(add_parser_fn):
                                      help="VIP IDENTITY of the store")
     config_store_delete.add_argument(
         "name",
-        nargs="?",
-        help="name used to reference the configuration by in the store",
+        nargs="*",
+        help="names used to reference the configurations by in the store. "
+             "Multiple configurations are deleted as a single change",
     )
     config_store_delete.add_argument(
         "--all",
@@ -448,11 +448,44 @@ def do_stats(opts):
             pprint.pprint(stats, _stdout)
         else:
             _stdout.writelines([str(stats), "\n"])
+    elif opts.op == "summary":
+        _print_stats_summary(call("stats.get"), opts.top)
     else:
         call("stats." + opts.op)
         _stdout.write("%sabled\n" % ("en" if call("stats.enabled") else "dis"))
 
 
+def _print_stats_summary(stats, top):
+    """Print the busiest peers, full peer queues and traced latencies."""
+    incoming = stats["incoming"]["peer"]
+    outgoing = stats["outgoing"]["peer"]
+    peers = sorted(set(incoming) | set(outgoing),
+                   key=lambda peer: incoming.get(peer, 0) + outgoing.get(peer, 0),
+                   reverse=True)[:top]
+    _stdout.write("{:<40} {:>10} {:>10} {:>10}\n".format("PEER", "SENT", "RECEIVED", "QUEUE FULL"))
+    for peer in peers:
+        _stdout.write("{:<40} {:>10} {:>10} {:>10}\n".format(
+            str(peer), incoming.get(peer, 0), outgoing.get(peer, 0),
+            stats["queue_full"].get(peer, 0)))
+
+    latency = sorted(stats.get("latency", []), key=lambda entry: entry["delivery"]["p99"] or 0, reverse=True)
+    _stdout.write("\nTrace sample rate: {}\n".format(stats.get("sample_rate", 0)))
+    if not latency:
+        _stdout.write("No traced messages\n")
+        return
+
+    def ms(value):
+        return "-" if value is None else "{:.3f}".format(value * 1000)
+
+    _stdout.write("{:<12} {:<30} {:<30} {:>8} {:>12} {:>12} {:>12} {:>12}\n".format(
+        "SUBSYSTEM", "SENDER", "RECEIVER", "COUNT", "ROUTE P50 ms", "ROUTE P99 ms", "DELIV P50 ms", "DELIV P99 ms"))
+    for entry in latency[:top]:
+        route, delivery = entry["route"], entry["delivery"]
+        _stdout.write("{:<12} {:<30} {:<30} {:>8} {:>12} {:>12} {:>12} {:>12}\n".format(
+            str(entry["subsystem"]), str(entry["sender"]), str(entry["receiver"]), route["count"],
+            ms(route["p50"]), ms(route["p99"]), ms(delivery["p50"]), ms(delivery["p99"])))
+
+
 def priority(value):
     n = int(value)
     if not 0 <= n < 100:
@@ -790,8 +823,10 @@ def main():
                        help="manage router message statistics tracking")
     op = stats.add_argument(
         "op",
-        choices=["status", "enable", "disable", "dump", "pprint"],
+        choices=["status", "enable", "disable", "dump", "pprint", "summary"],
         nargs="?")
+    stats.add_argument("--top", type=int, default=10,
+                       help="number of peers and latency entries shown by summary")
     stats.set_defaults(func=do_stats, op="status")
 
     # ==============================================================================
@@ -51,6 +51,7 @@ from volttron.utils.prompt import prompt_response, y, n, y_or_n
 from . import get_home, get_services_core, set_home
 from volttron.platform.agent.utils import load_config as load_yml_or_json
 from volttron.platform.store import process_raw_config
+from volttron.utils.persistance import JournaledDict
 
 if is_rabbitmq_available():
     from bootstrap import install_rabbit, default_rmq_dir
@@ -971,6 +972,9 @@ def read_agent_configs_from_store(store_source, path=True):
     if path:
         with open(store_source) as f:
             store = parse_json_config(f.read())
+        # Apply any changes recorded in the store's journal since the last compaction.
+        if os.path.isfile(store_source + '.journal'):
+            store = dict(JournaledDict(store_source))
     else:
         store = store_source
     return store
@@ -1077,6 +1081,9 @@ def update_configs_in_store(args_dict):
                 os.makedirs(os.path.dirname(agent_store_path), exist_ok=True)
                 with open(agent_store_path, 'w+') as f:
                     json.dump(store_configs, f)
+                # The journal was applied when the store was read and is now part of the snapshot.
+                if os.path.isfile(agent_store_path + '.journal'):
+                    os.remove(agent_store_path + '.journal')
 
 
 def _exit_with_metadata_error():
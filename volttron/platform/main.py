@@ -74,7 +74,7 @@ from volttron.platform.auth.auth_file import AuthFile
 from volttron.platform.control.control import ControlService
 from volttron.platform.vip.router import BaseRouter, ERROR, INCOMING, UNROUTABLE
 from volttron.platform.vip.socket import Address, decode_key, encode_key
-from volttron.platform.vip.tracking import Tracker
+from volttron.platform.vip.tracking import TRACE_SAMPLE_RATE_ENV, Tracker
 
 try:
     from .web import PlatformWebService
@@ -733,6 +733,15 @@ def start_volttron_process(opts):
     os.environ['MESSAGEBUS'] = opts.message_bus
     os.environ['AGENT_ISOLATION_MODE'] = opts.agent_isolation_mode
     os.environ['AUTH_ENABLED'] = opts.allow_auth
+    try:
+        trace_sample_rate = float(opts.trace_sample_rate)
+    except (TypeError, ValueError):
+        trace_sample_rate = -1
+    if not 0 <= trace_sample_rate <= 1:
+        raise ValueError("trace-sample-rate should be a number between 0 and 1, "
+                         "found {}".format(opts.trace_sample_rate))
+    # Agents started by the platform inherit the environment.
+    os.environ[TRACE_SAMPLE_RATE_ENV] = str(trace_sample_rate)
     opts.allow_auth = False if opts.allow_auth == 'False' else True
     if opts.instance_name is None:
         if len(opts.vip_address) > 0:
@@ -876,7 +885,9 @@ def start_volttron_process(opts):
     zmq.Context.instance()  # DO NOT REMOVE LINE!!
     # zmq.Context.instance().set(zmq.MAX_SOCKETS, 2046)
 
-    tracker = Tracker()
+    tracker = Tracker(sample_rate=float(opts.trace_sample_rate))
+    if tracker.sample_rate:
+        tracker.enable()
     protected_topics_file = os.path.join(opts.volttron_home,
                                          'protected_topics.json')
     _log.debug('protected topics file %s', protected_topics_file)
@@ -1459,6 +1470,12 @@ def main(argv=sys.argv):
         default=600,
         help='How often should the platform check for crashed agents and '
         'attempt to restart. Units=seconds. Default=600')
+    agents.add_argument(
+        '--trace-sample-rate',
+        default=0,
+        help='Fraction of VIP messages, between 0 and 1, agents mark for '
+        'router latency tracing. Tracing also enables router statistics. '
+        'Default=0')
     agents.add_argument(
         '--agent-isolation-mode',
         default=False,
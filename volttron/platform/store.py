@@ -25,6 +25,7 @@
 
 import logging
 import glob
+import hashlib
 import os
 import os.path
 import errno
@@ -36,11 +37,12 @@ from deprecated import deprecated
 from volttron.platform import jsonapi
 from gevent.lock import Semaphore
 
-from volttron.utils.persistance import PersistentDict
+from volttron.utils.persistance import JournaledDict
 from volttron.platform.agent.utils import parse_json_config
 from volttron.platform.vip.agent import errors
 from volttron.platform.jsonrpc import RemoteError, MethodNotFound
 from volttron.platform.agent.utils import format_timestamp, get_aware_utc_now
+from volttron.platform.messaging import topics
 from volttron.platform.storeutils import check_for_recursion, strip_config_name, store_ext
 from .vip.agent import Agent, Core, RPC
 
@@ -99,6 +101,14 @@ def process_raw_config(config_string, config_type="raw"):
     raise ValueError("Unsupported configuration type.")
 
 
+def config_hash(config_type, config_string):
+    """Returns a content hash of a stored configuration.
+
+    Agents that load their configurations lazily use the hash to avoid
+    fetching the same contents more than once."""
+    return hashlib.sha256("{}\n{}".format(config_type, config_string).encode("utf-8")).hexdigest()
+
+
 class ConfigStoreService(Agent):
     def __init__(self, *args, **kwargs):
         super(ConfigStoreService, self).__init__(*args, **kwargs)
@@ -132,11 +142,12 @@ class ConfigStoreService(Agent):
             root, ext = os.path.splitext(store_path)
             agent_identity = os.path.basename(root)
             _log.debug("Processing store for agent {}".format(agent_identity))
-            store = PersistentDict(filename=store_path, flag='c', format='json')
+            store = JournaledDict(store_path)
             parsed_configs, name_map = process_store(agent_identity, store)
             self.store[agent_identity] = {"configs": parsed_configs,
                                           "store": store,
                                           "name_map": name_map,
+                                          "hashes": {},
                                           "lock": Semaphore()}
 
     @Core.receiver('onstart')
@@ -146,6 +157,16 @@ class ConfigStoreService(Agent):
         except Exception as e:
             _log.error(f"Exception getting peerlist on startup of config store: {e}")
 
+    @Core.receiver('onstop')
+    def _onstop(self, sender, **kwargs):
+        # Fold outstanding journal records into the snapshots so tools that
+        # read the store files while the platform is down see every change.
+        for identity, agent_store in self.store.items():
+            try:
+                agent_store["store"].compact()
+            except Exception as e:
+                _log.error("Failed to compact configuration store for {}: {}".format(identity, e))
+
     @RPC.export
     @RPC.allow('edit_config_store')
     @deprecated(reason="Use set_config")
@@ -180,6 +201,46 @@ class ConfigStoreService(Agent):
     def delete_config(self, identity, config_name, trigger_callback=True, send_update=True):
         self.delete(identity, config_name, trigger_callback=trigger_callback, send_update=send_update)
 
+    @RPC.export
+    @RPC.allow('edit_config_store')
+    def set_configs(self, identity, configs, trigger_callback=True, send_update=True):
+        """Store several configurations for an agent as a single change.
+
+        The store is written once and the agent receives one update listing
+        every changed configuration, so its callbacks run once for the batch.
+        Nothing is stored if any configuration fails to parse.
+
+        :param identity: VIP IDENTITY of the store.
+        :param configs: list of dictionaries with "config_name", "raw_contents"
+            and optionally "config_type" (defaults to "raw") keys.
+        """
+        if not configs:
+            return
+
+        processed = []
+        for config in configs:
+            config_type = config.get("config_type", "raw")
+            raw_contents = config["raw_contents"]
+            contents = process_raw_config(raw_contents, config_type)
+            processed.append((config["config_name"], raw_contents, contents, config_type))
+
+        self._add_configs_to_store(identity, processed, trigger_callback=trigger_callback, send_update=send_update)
+
+    @RPC.export
+    @RPC.allow('edit_config_store')
+    def delete_configs(self, identity, config_names, trigger_callback=True, send_update=True):
+        """Delete several configurations from an agent's store as a single change.
+
+        Nothing is deleted if any of the configurations does not exist.
+
+        :param identity: VIP IDENTITY of the store.
+        :param config_names: list of configuration names to delete.
+        """
+        if not config_names:
+            return
+
+        self._delete_configs(identity, config_names, trigger_callback=trigger_callback, send_update=send_update)
+
     @RPC.export
     @RPC.allow('edit_config_store')
     @deprecated(reason="Use delete_store")
@@ -204,9 +265,11 @@ class ConfigStoreService(Agent):
         agent_configs.clear()
         agent_disk_store.clear()
         agent_name_map.clear()
+        agent_store["hashes"].clear()
 
         # Sync will delete the file if the store is empty.
         agent_disk_store.async_sync()
+        self._publish_changes(identity, [("DELETE_ALL", None, None)])
 
         if identity in self.vip.peerlist.peers_list:
             with agent_store_lock:
@@ -286,6 +349,33 @@ class ConfigStoreService(Agent):
 
         return agent_configs[real_config_name]
 
+    @RPC.export
+    def get_configs(self, identity, config_names):
+        """Returns the parsed contents of several configurations.
+
+        Used by agents that load their configurations lazily. References to
+        other configurations are not resolved.
+
+        :param identity: VIP IDENTITY of the store.
+        :param config_names: list of configuration names.
+        :returns: dictionary of the requested names to their contents.
+        """
+        agent_store = self.store.get(identity)
+        if agent_store is None:
+            raise KeyError('No configuration store for VIP IDENTIY {}'.format(identity))
+
+        agent_configs = agent_store["configs"]
+        agent_name_map = agent_store["name_map"]
+
+        results = {}
+        for config_name in config_names:
+            config_name_lower = strip_config_name(config_name).lower()
+            if config_name_lower not in agent_name_map:
+                raise KeyError('No configuration file "{}" for VIP IDENTIY {}'.format(config_name, identity))
+            results[config_name] = agent_configs[agent_name_map[config_name_lower]]
+
+        return results
+
     @RPC.export
     @deprecated(reason="Use get_metadata")
     def manage_get_metadata(self, identity, config_name):
@@ -321,10 +411,14 @@ class ConfigStoreService(Agent):
 
     @RPC.allow('edit_config_store')
     @RPC.export
-    def initialize_configs(self, identity):
+    def initialize_configs(self, identity, lazy=False):
         """
         Called by an Agent at startup to trigger initial configuration state
         push.
+
+        If lazy is True only the names and content hashes of the
+        configurations are pushed. The agent retrieves the contents it needs
+        later with get_configs.
         """
 
         # We need to create store and lock if it doesn't exist in case someone
@@ -334,9 +428,9 @@ class ConfigStoreService(Agent):
         if agent_store is None:
             # Initialize a new store.
             store_path = os.path.join(self.store_path, identity + store_ext)
-            store = PersistentDict(filename=store_path, flag='c', format='json')
+            store = JournaledDict(store_path)
             agent_store = {
-                "configs": {}, "store": store, "name_map": {},
+                "configs": {}, "store": store, "name_map": {}, "hashes": {},
                 "lock": Semaphore()
             }
             self.store[identity] = agent_store
@@ -347,8 +441,12 @@ class ConfigStoreService(Agent):
         if identity in self.vip.peerlist.peers_list:
             with agent_store_lock:
                 try:
-                    self.vip.rpc.call(identity, "config.initial_update",
-                                      agent_configs).get(timeout=UPDATE_TIMEOUT)
+                    if lazy:
+                        self.vip.rpc.call(identity, "config.initial_update", {},
+                                          hashes=self._get_config_hashes(agent_store)).get(timeout=UPDATE_TIMEOUT)
+                    else:
+                        self.vip.rpc.call(identity, "config.initial_update",
+                                          agent_configs).get(timeout=UPDATE_TIMEOUT)
                 except errors.Unreachable:
                     _log.debug("Agent {} not currently running. Configuration update not sent.".format(identity))
                 except RemoteError as e:
@@ -364,44 +462,60 @@ class ConfigStoreService(Agent):
         if not agent_disk_store:
             self.store.pop(identity, None)
 
+    @staticmethod
+    def _get_config_hashes(agent_store):
+        """Returns the content hashes of every configuration in an agent store.
+
+        Hashes are computed on first use and dropped when a configuration changes.
+        """
+        hashes = agent_store["hashes"]
+        for config_name, config_data in agent_store["store"].items():
+            if config_name not in hashes:
+                hashes[config_name] = config_hash(config_data["type"], config_data["data"])
+        return dict(hashes)
+
     # Helper method to allow the local services to delete configs before message
     # bus in online.
     def delete(self, identity, config_name, trigger_callback=False, send_update=True):
+        self._delete_configs(identity, [config_name], trigger_callback=trigger_callback, send_update=send_update)
+
+    def _delete_configs(self, identity, config_names, trigger_callback=False, send_update=True):
         agent_store = self.store.get(identity)
         if agent_store is None:
-            raise KeyError('No configuration file "{}" for VIP IDENTIY {}'.format(config_name, identity))
+            raise KeyError('No configuration file "{}" for VIP IDENTIY {}'.format(config_names[0], identity))
 
         agent_configs = agent_store["configs"]
         agent_disk_store = agent_store["store"]
         agent_store_lock = agent_store["lock"]
         agent_name_map = agent_store["name_map"]
 
-        config_name = strip_config_name(config_name)
-        config_name_lower = config_name.lower()
+        config_names = [strip_config_name(config_name) for config_name in config_names]
 
-        if config_name_lower not in agent_name_map:
-            raise KeyError('No configuration file "{}" for VIP IDENTIY {}'.format(config_name, identity))
+        for config_name in config_names:
+            if config_name.lower() not in agent_name_map:
+                raise KeyError('No configuration file "{}" for VIP IDENTIY {}'.format(config_name, identity))
 
-        real_config_name = agent_name_map[config_name_lower]
+        updates = []
+        for config_name in config_names:
+            config_name_lower = config_name.lower()
+            if config_name_lower not in agent_name_map:
+                # Listed more than once.
+                continue
 
-        agent_configs.pop(real_config_name)
-        agent_disk_store.pop(real_config_name)
-        agent_name_map.pop(config_name_lower)
+            real_config_name = agent_name_map.pop(config_name_lower)
+
+            agent_configs.pop(real_config_name)
+            agent_disk_store.pop(real_config_name)
+            agent_store["hashes"].pop(real_config_name, None)
+            updates.append(("DELETE", config_name, None))
 
         # Sync will delete the file if the store is empty.
         agent_disk_store.async_sync()
+        self._publish_changes(identity, updates)
 
         if send_update and identity in self.vip.peerlist.peers_list:
             with agent_store_lock:
-                try:
-                    self.vip.rpc.call(identity, "config.update", "DELETE", config_name, trigger_callback=trigger_callback).get(timeout=UPDATE_TIMEOUT)
-                except errors.Unreachable:
-                    _log.debug("Agent {} not currently running. Configuration update not sent.".format(identity))
-                except RemoteError as e:
-                    _log.error("Agent {} failure when deleting configuration {}: {}".format(identity, config_name, e))
-                except MethodNotFound as e:
-                    _log.error(
-                        "Agent {} failure when adding/updating configuration {}: {}".format(identity, config_name, e))
+                self._send_updates(identity, updates, trigger_callback)
 
         # If the store is empty (and nothing jumped in and added to it while we
         # were informing the agent) then remove it from the global store.
@@ -432,58 +546,127 @@ class ConfigStoreService(Agent):
                              config_type, trigger_callback=False,
                              send_update=True):
         """Adds a processed configuration to the store."""
-        agent_store = self.store.get(identity)
+        self._add_configs_to_store(identity, [(config_name, raw, parsed, config_type)],
+                                   trigger_callback=trigger_callback, send_update=send_update)
 
-        action = "UPDATE"
+    def _get_or_create_agent_store(self, identity):
+        agent_store = self.store.get(identity)
 
         if agent_store is None:
             #Initialize a new store.
             store_path = os.path.join(self.store_path, identity+ store_ext)
-            store = PersistentDict(filename=store_path, flag='c', format='json')
-            agent_store = {"configs": {}, "store": store, "name_map": {}, "lock": Semaphore()}
+            store = JournaledDict(store_path)
+            agent_store = {"configs": {}, "store": store, "name_map": {}, "hashes": {}, "lock": Semaphore()}
             self.store[identity] = agent_store
 
+        return agent_store
+
+    def _add_configs_to_store(self, identity, configs, trigger_callback=False, send_update=True):
+        """Adds processed configurations to the store as a single change.
+
+        :param configs: list of (config_name, raw, parsed, config_type) tuples.
+
+        Every configuration is checked for recursive references before any of
+        them are stored. The store is synced once and the agent receives a
+        single update for the whole set.
+        """
+        agent_store = self._get_or_create_agent_store(identity)
+
         agent_configs = agent_store["configs"]
         agent_disk_store = agent_store["store"]
         agent_store_lock = agent_store["lock"]
         agent_name_map = agent_store["name_map"]
 
-        config_name = strip_config_name(config_name)
-        config_name_lower = config_name.lower()
-
-        if config_name_lower not in agent_name_map:
-            action = "NEW"
-
-        if check_for_recursion(config_name, parsed, agent_configs):
-            raise ValueError("Recursive configuration references detected.")
+        staged_configs = dict(agent_configs)
+        staged_name_map = dict(agent_name_map)
+        for config_name, raw, parsed, config_type in configs:
+            config_name = strip_config_name(config_name)
+            config_name_lower = config_name.lower()
+
+            if check_for_recursion(config_name, parsed, staged_configs):
+                raise ValueError("Recursive configuration references detected.")
+
+            if config_name_lower in staged_name_map:
+                del staged_configs[staged_name_map[config_name_lower]]
+            staged_configs[config_name] = parsed
+            staged_name_map[config_name_lower] = config_name
+
+        modified = format_timestamp(get_aware_utc_now())
+        updates = []
+        for config_name, raw, parsed, config_type in configs:
+            config_name = strip_config_name(config_name)
+            config_name_lower = config_name.lower()
+
+            action = "UPDATE"
+            if config_name_lower not in agent_name_map:
+                action = "NEW"
+            else:
+                old_config_name = agent_name_map[config_name_lower]
+                del agent_configs[old_config_name]
+                agent_store["hashes"].pop(old_config_name, None)
 
-        if config_name_lower in agent_name_map:
-            old_config_name = agent_name_map[config_name_lower]
-            del agent_configs[old_config_name]
+            agent_configs[config_name] = parsed
+            agent_name_map[config_name_lower] = config_name
 
-        agent_configs[config_name] = parsed
-        agent_name_map[config_name_lower] = config_name
+            agent_disk_store[config_name] = {"type": config_type,
+                                             "modified": modified,
+                                             "data": raw}
 
-        agent_disk_store[config_name] = {"type": config_type,
-                                         "modified": format_timestamp(get_aware_utc_now()),
-                                         "data": raw}
+            _log.debug("Agent {} config {} stored.".format(identity, config_name))
+            updates.append((action, config_name, parsed))
 
         agent_disk_store.async_sync()
-
-        _log.debug("Agent {} config {} stored.".format(identity, config_name))
+        self._publish_changes(identity, updates)
 
         if send_update and identity in self.vip.peerlist.peers_list:
             with agent_store_lock:
-                try:
-                    self.vip.rpc.call(identity, "config.update", action, config_name, contents=parsed, trigger_callback=trigger_callback).get(timeout=UPDATE_TIMEOUT)
-                except errors.Unreachable:
-                    _log.debug("Agent {} not currently running. Configuration update not sent.".format(identity))
-                except RemoteError as e:
-                    _log.error("Agent {} failure when adding/updating configuration {}: {}".format(identity, config_name, e))
-                except MethodNotFound as e:
-                    _log.error(
-                        "Agent {} failure when adding/updating configuration {}: {}".format(identity, config_name, e))
-                except gevent.timeout.Timeout:
-                    _log.error("Config update to agent {} timed out after {} seconds".format(identity, UPDATE_TIMEOUT))
-                except Exception as e:
-                    _log.error("Unknown error sending update to agent identity {}.: {}".format(identity, e))
+                self._send_updates(identity, updates, trigger_callback)
+
+    def _publish_changes(self, identity, updates):
+        """Announce changes to a store on the message bus.
+
+        Lets agents which cache the configurations of other agents, like the
+        web service's device tree, know when to reload them.
+        """
+        # Local services may store configurations before the bus is online.
+        if not getattr(self.core, "connected", False):
+            return
+        changes = [[action, config_name] for action, config_name, _ in updates]
+        try:
+            self.vip.pubsub.publish("pubsub", topics.PLATFORM_CONFIG_STORE(identity=identity),
+                                    message={"changes": changes})
+        except Exception as e:
+            _log.debug("Unable to publish configuration store changes for {}: {}".format(identity, e))
+
+    def _send_updates(self, identity, updates, trigger_callback):
+        """Push configuration changes to an agent.
+
+        A single change uses config.update. Multiple changes are sent as one
+        config.update_batch call, falling back to one config.update per change
+        for agents that predate batched updates.
+        """
+        config_names = ", ".join(config_name for _, config_name, _ in updates)
+        try:
+            if len(updates) == 1:
+                action, config_name, contents = updates[0]
+                self.vip.rpc.call(identity, "config.update", action, config_name, contents=contents,
+                                  trigger_callback=trigger_callback).get(timeout=UPDATE_TIMEOUT)
+                return
+            try:
+                self.vip.rpc.call(identity, "config.update_batch", updates,
+                                  trigger_callback=trigger_callback).get(timeout=UPDATE_TIMEOUT)
+            except MethodNotFound:
+                for action, config_name, contents in updates:
+                    self.vip.rpc.call(identity, "config.update", action, config_name, contents=contents,
+                                      trigger_callback=trigger_callback).get(timeout=UPDATE_TIMEOUT)
+        except errors.Unreachable:
+            _log.debug("Agent {} not currently running. Configuration update not sent.".format(identity))
+        except RemoteError as e:
+            _log.error("Agent {} failure when adding/updating configuration {}: {}".format(identity, config_names, e))
+        except MethodNotFound as e:
+            _log.error(
+                "Agent {} failure when adding/updating configuration {}: {}".format(identity, config_names, e))
+        except gevent.timeout.Timeout:
+            _log.error("Config update to agent {} timed out after {} seconds".format(identity, UPDATE_TIMEOUT))
+        except Exception as e:
+            _log.error("Unknown error sending update to agent identity {}.: {}".format(identity, e))
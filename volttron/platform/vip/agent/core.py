@@ -25,6 +25,7 @@
 import heapq
 import inspect
 import logging
+import math
 import os
 import platform as python_platform
 import signal
@@ -121,6 +122,157 @@ class Periodic:  # pylint: disable=invalid-name
         return gevent.Greenlet(self._loop, method)
 
 
+class _TimerEntry:
+    '''A callback waiting in a TimerWheel bucket.'''
+
+    __slots__ = ('deadline', 'order', 'tick', 'callback', 'bucket', 'wheel')
+
+    def __init__(self, deadline, order, tick, callback, wheel):
+        self.deadline = deadline
+        self.order = order
+        self.tick = tick
+        self.callback = callback
+        self.bucket = None
+        self.wheel = wheel
+
+    def cancel(self):
+        '''Remove the entry from its wheel if it has not fired yet.'''
+        if self.bucket is not None:
+            del self.bucket[self]
+            self.bucket = None
+            self.wheel._count -= 1
+
+
+class TimerWheel:
+    '''Hierarchical timer wheel holding the callbacks of Core.schedule.
+
+    Time is divided into ticks of `resolution` seconds. Level 0 has one
+    bucket per tick for the next `slots` ticks and every further level
+    has buckets spanning `slots` times as many ticks as the level below.
+    Adding and canceling an entry are constant time. When time reaches
+    the start of a bucket on a higher level its entries are moved down
+    so they expire from level 0. Deadlines beyond the top level wait in
+    an overflow bucket which is redistributed every top level bucket.
+
+    Every level keeps a heap of the absolute indexes of its buckets which
+    have been filled, so the next bucket to process is found without
+    scanning the empty ones. Indexes of buckets emptied by cancel or
+    processing are discarded lazily.
+    '''
+
+    def __init__(self, resolution=0.01, slots=256, levels=4, now=None):
+        self.resolution = resolution
+        self.slots = slots
+        self._spans = [slots ** level for level in range(levels)]
+        self._levels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._occupied = [[] for _ in range(levels)]
+        self._overflow = {}
+        self._count = 0
+        self._order = 0
+        # Last tick processed. Buckets up to and including it are empty.
+        self._current = int((time.time() if now is None else now) // resolution)
+
+    def __len__(self):
+        return self._count
+
+    def add(self, deadline, callback):
+        '''Schedule callback for deadline (seconds since the epoch).
+
+        Returns an entry whose cancel method removes the callback.
+        '''
+        self._order += 1
+        tick = max(math.ceil(deadline / self.resolution), self._current + 1)
+        entry = _TimerEntry(deadline, self._order, tick, callback, self)
+        self._place(entry)
+        self._count += 1
+        return entry
+
+    def _place(self, entry):
+        for level, span in enumerate(self._spans):
+            index = entry.tick // span
+            if index - self._current // span < self.slots:
+                bucket = self._levels[level][index % self.slots]
+                if not bucket:
+                    heapq.heappush(self._occupied[level], index)
+                break
+        else:
+            bucket = self._overflow
+        bucket[entry] = None
+        entry.bucket = bucket
+
+    def _next_tick(self):
+        '''Return the next tick at which an entry expires or moves down.'''
+        if not self._count:
+            return None
+        best = None
+        for level, span in enumerate(self._spans):
+            buckets = self._levels[level]
+            occupied = self._occupied[level]
+            start = self._current // span
+            # Buckets ahead of the current one hold a single index at a time,
+            # so a non-empty bucket always holds the entries of its index.
+            while occupied and (occupied[0] <= start or not buckets[occupied[0] % self.slots]):
+                heapq.heappop(occupied)
+            if occupied:
+                tick = occupied[0] * span
+                if best is None or tick < best:
+                    best = tick
+        if self._overflow:
+            top = self._spans[-1]
+            tick = (self._current // top + 1) * top
+            if best is None or tick < best:
+                best = tick
+        return best
+
+    def timeout(self, now):
+        '''Seconds until the next tick that needs processing, or None if empty.'''
+        tick = self._next_tick()
+        if tick is None:
+            return None
+        return max(0.0, tick * self.resolution - now)
+
+    def expire(self, now):
+        '''Advance the wheel to now and return the callbacks that are due.
+
+        Callbacks are returned in deadline order.
+        '''
+        now_tick = int(now // self.resolution)
+        due = []
+        while self._current < now_tick:
+            tick = self._next_tick()
+            if tick is None or tick > now_tick:
+                self._current = now_tick
+                break
+            self._current = tick
+            self._cascade(tick)
+            bucket = self._levels[0][tick % self.slots]
+            if bucket:
+                entries = sorted(bucket, key=lambda e: (e.deadline, e.order))
+                bucket.clear()
+                self._count -= len(entries)
+                for entry in entries:
+                    entry.bucket = None
+                    due.append(entry.callback)
+        return due
+
+    def _cascade(self, tick):
+        top = len(self._spans) - 1
+        if self._overflow and tick % self._spans[top] == 0:
+            self._redistribute(self._overflow)
+        for level in range(top, 0, -1):
+            span = self._spans[level]
+            if tick % span == 0:
+                bucket = self._levels[level][(tick // span) % self.slots]
+                if bucket:
+                    self._redistribute(bucket)
+
+    def _redistribute(self, bucket):
+        entries = list(bucket)
+        bucket.clear()
+        for entry in entries:
+            self._place(entry)
+
+
 class ScheduledEvent:
     '''Class returned from Core.schedule.'''
 
@@ -130,12 +282,18 @@ class ScheduledEvent:
         self.kwargs = kwargs or {}
         self.canceled = False
         self.finished = False
+        # Pending TimerWheel entry, removed from the wheel on cancel.
+        self._timer = None
 
     def cancel(self):
-        '''Mark the timer as canceled to avoid a callback.'''
+        '''Cancel the timer and remove it from the scheduler.'''
         self.canceled = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
 
     def __call__(self):
+        self._timer = None
         if not self.canceled:
             self.function(*self.args, **self.kwargs)
         self.finished = True
@@ -164,13 +322,12 @@ class BasicCore:
         self._async_calls = []
         self._stop_event = None
         self._schedule_event = None
-        self._schedule = []
+        self._schedule = TimerWheel()
         self.onsetup = Signal()
         self.onstart = Signal()
         self.onstop = Signal()
         self.onfinish = Signal()
         self.oninterrupt = None
-        self.tie_breaker = 0
 
         # SIGINT does not work in Windows.
         # If using the standalone agent on a windows machine,
@@ -250,23 +407,21 @@ class BasicCore:
                 self.spawned_greenlets.add(greenlet)
 
         def schedule_loop():
-            heap = self._schedule
+            wheel = self._schedule
             event = self._schedule_event
-            cur = gevent.getcurrent()
-            now = time.time()
-            while True:
-                if heap:
-                    deadline = heap[0][0]
-                    timeout = min(5.0, max(0.0, deadline - now))
-                else:
-                    timeout = None
-                if event.wait(timeout):
-                    event.clear()
-                now = time.time()
-                while heap and now >= heap[0][0]:
-                    _, _, callback = heapq.heappop(heap)
-                    greenlet = gevent.spawn(callback)
-                    cur.link(lambda glt: greenlet.kill())
+            # Callbacks still running are killed with the scheduler.
+            running = weakref.WeakSet()
+            try:
+                while True:
+                    timeout = wheel.timeout(time.time())
+                    if timeout is not None:
+                        timeout = min(5.0, timeout)
+                    if event.wait(timeout):
+                        event.clear()
+                    for callback in wheel.expire(time.time()):
+                        running.add(gevent.spawn(callback))
+            finally:
+                gevent.killall(list(running), block=False)
 
         self._stop_event = stop = gevent.event.Event()
         self._async = gevent.get_hub().loop.async_()
@@ -417,21 +572,17 @@ class BasicCore:
         try:
             it = iter(deadline)
         except TypeError:
-            self._schedule_callback(deadline, event)
+            event._timer = self._schedule_callback(deadline, event)
         else:
             self._schedule_iter(it, event)
         return event
 
-    def get_tie_breaker(self):
-        self.tie_breaker += 1
-        return self.tie_breaker
-
     def _schedule_callback(self, deadline, callback):
         deadline = utils.get_utc_seconds_from_epoch(deadline)
-        heapq.heappush(self._schedule,
-                       (deadline, self.get_tie_breaker(), callback))
+        entry = self._schedule.add(deadline, callback)
         if self._schedule_event:
             self._schedule_event.set()
+        return entry
 
     def _schedule_iter(self, it, event):
 
@@ -442,10 +593,11 @@ class BasicCore:
             try:
                 deadline = next(it)
             except StopIteration:
+                event._timer = None
                 event.function(*event.args, **event.kwargs)
                 event.finished = True
             else:
-                self._schedule_callback(deadline, wrapper)
+                event._timer = self._schedule_callback(deadline, wrapper)
                 event.function(*event.args, **event.kwargs)
 
         try:
@@ -453,7 +605,7 @@ class BasicCore:
         except StopIteration:
             event.finished = True
         else:
-            self._schedule_callback(deadline, wrapper)
+            event._timer = self._schedule_callback(deadline, wrapper)
 
     @schedule.classmethod
     def schedule(cls, deadline, *args, **kwargs):  # pylint: disable=no-self-argument
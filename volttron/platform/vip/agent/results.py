@@ -24,18 +24,24 @@
 
 
 
+import math
 import random
+import time
+import weakref
 from weakref import WeakValueDictionary
 
+import gevent
 from gevent.event import AsyncResult
 import sys
 from datetime import datetime
 
-__all__ = ['counter', 'ResultsDictionary']
+__all__ = ['counter', 'ResultsDictionary', 'DeadlineWheel']
 
 
 class AsyncResult(AsyncResult):
-    __slots__ = AsyncResult.__slots__ + ('ident',)
+    # _weak_set keeps the set of results sent in one batch message alive
+    # while any of the results is outstanding.
+    __slots__ = AsyncResult.__slots__ + ('ident', '_weak_set')
 
 
 def counter(start=None, minimum=0, maximum=sys.maxsize-1):
@@ -78,3 +84,54 @@ class ResultsDictionary(WeakValueDictionary):
         result.ident = ident = '%f.%f' % (next(self._counter), hash(result))
         self[ident] = result
         return result
+
+
+class DeadlineWheel(object):
+    """Expires outstanding results when their deadline passes.
+
+    Deadlines are rounded up to the next tick of `resolution` seconds and
+    kept in one bucket per tick, so adding a deadline and expiring a tick are
+    constant time regardless of the number of outstanding results. A
+    greenlet runs only while there are deadlines to watch. Results are held
+    by weak reference and ones that completed are skipped.
+
+    :param on_expire: called with each result whose deadline passed while
+        it was still outstanding.
+    :param resolution: length of a tick in seconds.
+    """
+
+    def __init__(self, on_expire, resolution=0.1):
+        self._on_expire = on_expire
+        self._resolution = resolution
+        self._buckets = {}
+        self._greenlet = None
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    def add(self, result, deadline):
+        """Watch result until deadline, a time.time() timestamp."""
+        tick = math.ceil(deadline / self._resolution)
+        self._buckets.setdefault(tick, []).append(weakref.ref(result))
+        if self._greenlet is None:
+            self._greenlet = gevent.spawn(self._run)
+
+    def _expire_until(self, now_tick):
+        if len(self._buckets) < now_tick - min(self._buckets):
+            ticks = sorted(tick for tick in self._buckets if tick <= now_tick)
+        else:
+            ticks = range(min(self._buckets), now_tick + 1)
+        for tick in ticks:
+            for ref in self._buckets.pop(tick, ()):
+                result = ref()
+                if result is not None and not result.ready():
+                    self._on_expire(result)
+
+    def _run(self):
+        try:
+            while self._buckets:
+                self._expire_until(math.floor(time.time() / self._resolution))
+                if self._buckets:
+                    gevent.sleep(self._resolution)
+        finally:
+            self._greenlet = None
@@ -34,6 +34,7 @@ from volttron.platform.vip.agent import errors
 from volttron.platform.agent.known_identities import CONFIGURATION_STORE
 from volttron.platform import jsonapi
 from volttron.platform.agent.utils import is_auth_enabled
+from volttron.platform.jsonrpc import RemoteError
 
 
 from collections import defaultdict
@@ -51,6 +52,19 @@ _log = logging.getLogger(__name__)
 
 VALID_ACTIONS = ("NEW", "UPDATE", "DELETE")
 
+# Maximum number of configurations requested in a single get_configs call
+# when loading lazily.
+LAZY_FETCH_BATCH_SIZE = 100
+
+
+class _LazyConfig(object):
+    """Placeholder for a configuration whose contents have not been retrieved yet."""
+
+    __slots__ = ('hash',)
+
+    def __init__(self, config_hash):
+        self.hash = config_hash
+
 
 class ConfigStore(SubsystemBase):
     def __init__(self, owner, core, rpc):
@@ -68,6 +82,10 @@ class ConfigStore(SubsystemBase):
         self._initialized = False
         self._initial_callbacks_called = False
 
+        self._lazy = False
+        self._config_hashes = {}  # Config name to content hash of lazily loaded configs.
+        self._content_cache = {}  # Content hash to parsed contents, shared between configs.
+
         self._process_callbacks_code_object = self._process_callbacks.__code__
         self.vip_identity = self._core().identity
 
@@ -78,18 +96,31 @@ class ConfigStore(SubsystemBase):
 
         def onsetup(sender, **kwargs):
             rpc.export(self._update_config, 'config.update')
+            rpc.export(self._update_config_batch, 'config.update_batch')
             rpc.export(self._initial_update, 'config.initial_update')
             if is_auth_enabled():
                 rpc.allow('config.update', 'sync_agent_config')
+                rpc.allow('config.update_batch', 'sync_agent_config')
                 rpc.allow('config.initial_update', 'sync_agent_config')
 
         core.onsetup.connect(onsetup, self)
         core.configuration.connect(self._onconfig, self)
 
+    def _request_initial_update(self):
+        if self._lazy:
+            try:
+                self._rpc().call(CONFIGURATION_STORE, "initialize_configs", self.vip_identity, lazy=True).get()
+                return
+            except RemoteError as e:
+                _log.warning("Platform does not support lazy configuration loading, "
+                             "retrieving all configurations: {}".format(e))
+                self._lazy = False
+        self._rpc().call(CONFIGURATION_STORE, "initialize_configs", self.vip_identity).get()
+
     def _onconfig(self, sender, **kwargs):
         if not self._initialized:
             try:
-                self._rpc().call(CONFIGURATION_STORE, "initialize_configs", self.vip_identity).get()
+                self._request_initial_update()
             except errors.Unreachable as e:
                 _log.error("Connected platform does not support the Configuration Store feature.")
                 return
@@ -128,19 +159,70 @@ class ConfigStore(SubsystemBase):
             if not reverse_ref_set:
                 del self._reverse_ref_map[ref]
 
-    def _initial_update(self, configs, reset_name_map=True):
+    def _initial_update(self, configs, reset_name_map=True, hashes=None):
+        """Called by the platform with the initial state of the store.
+
+        When loading lazily configs is empty and hashes maps every
+        configuration name to a content hash. The contents are retrieved
+        later by _load_configs.
+        """
         self._initialized = True
         self._store = {key.lower(): value for (key, value) in configs.items()}
+        self._config_hashes = {}
+        self._content_cache = {}
+        if hashes:
+            for key, config_hash in hashes.items():
+                self._store[key.lower()] = _LazyConfig(config_hash)
+                self._config_hashes[key.lower()] = config_hash
         if reset_name_map:
             self._name_map = {key.lower(): key for key in configs}
+            if hashes:
+                self._name_map.update((key.lower(), key) for key in hashes)
 
         for config_name, config_contents in self._store.items():
-            self._add_refs(config_name, config_contents)
+            if not isinstance(config_contents, _LazyConfig):
+                self._add_refs(config_name, config_contents)
 
         for config_name, config_contents in self._default_store.items():
             if config_name not in self._store:
                 self._add_refs(config_name, config_contents)
 
+    def _load_configs(self, config_names):
+        """Retrieves the contents of lazily loaded configurations.
+
+        Configurations referenced by the loaded contents are loaded as well.
+        Contents are requested once per distinct hash so configurations with
+        identical contents share a single parsed copy.
+        """
+        pending = [name for name in config_names if isinstance(self._store.get(name), _LazyConfig)]
+        while pending:
+            to_fetch = {}
+            for config_name in pending:
+                config_hash = self._store[config_name].hash
+                if config_hash not in self._content_cache:
+                    to_fetch.setdefault(config_hash, config_name)
+
+            fetch_items = list(to_fetch.items())
+            for i in range(0, len(fetch_items), LAZY_FETCH_BATCH_SIZE):
+                batch = fetch_items[i:i + LAZY_FETCH_BATCH_SIZE]
+                results = self._rpc().call(CONFIGURATION_STORE, "get_configs", self.vip_identity,
+                                           [config_name for _, config_name in batch]).get(timeout=10.0)
+                for config_hash, config_name in batch:
+                    self._content_cache[config_hash] = results[config_name]
+
+            referenced = set()
+            for config_name in pending:
+                placeholder = self._store.get(config_name)
+                if not isinstance(placeholder, _LazyConfig):
+                    # Duplicate entry in pending.
+                    continue
+                contents = self._content_cache[placeholder.hash]
+                self._store[config_name] = contents
+                self._update_refs(config_name, contents)
+                referenced.update(self._ref_map[config_name])
+
+            pending = [name for name in referenced if isinstance(self._store.get(name), _LazyConfig)]
+
     def _process_links(self, config_contents, already_gathered):
         if isinstance(config_contents, dict):
             for key, value in config_contents.items():
@@ -163,6 +245,8 @@ class ConfigStore(SubsystemBase):
         if config_name in already_gathered:
             return already_gathered[config_name]
 
+        self._load_configs([config_name])
+
         config_contents = self._store.get(config_name)
         if config_contents is None:
             config_contents = self._default_store.get(config_name)
@@ -175,6 +259,7 @@ class ConfigStore(SubsystemBase):
         return config_contents
 
     def _gather_config(self, config_name):
+        self._load_configs([config_name])
         config_contents = self._store.get(config_name)
         if config_contents is None:
             config_contents = self._default_store.get(config_name)
@@ -195,15 +280,57 @@ class ConfigStore(SubsystemBase):
 
     def _update_config(self, action, config_name, contents=None, trigger_callback=False):
         """Called by the platform to push out configuration changes."""
+        self._update_config_batch([(action, config_name, contents)], trigger_callback=trigger_callback)
+
+    def _update_config_batch(self, updates, trigger_callback=False):
+        """Called by the platform to push out several configuration changes at once.
+
+        The changes are applied in order and callbacks are triggered once for
+        every affected configuration after the whole batch is applied.
+
+        :param updates: list of (action, config_name, contents) entries.
+        """
         # If we haven't yet grabbed the initial callback state we just bail.
         if not self._initialized:
             return
 
         affected_configs = {}
+        deleted_names = set()
+        delete_all = False
+
+        for action, config_name, contents in updates:
+            self._apply_update(action, config_name, contents, affected_configs)
+            if action == "DELETE":
+                deleted_names.add(config_name.lower())
+            elif action == "DELETE_ALL":
+                delete_all = True
+                deleted_names.clear()
+            elif action in ("NEW", "UPDATE"):
+                deleted_names.discard(config_name.lower())
+
+        if trigger_callback and self._initial_callbacks_called:
+            self._process_callbacks(affected_configs)
+
+        # Names are needed by the DELETE callbacks so they are removed last.
+        if delete_all:
+            self._name_map = {name: self._name_map[name] for name in self._store}
+
+        for config_name_lower in deleted_names:
+            if config_name_lower not in self._store:
+                self._name_map.pop(config_name_lower, None)
 
+        if self._content_cache:
+            live_hashes = set(self._config_hashes.values())
+            for config_hash in list(self._content_cache):
+                if config_hash not in live_hashes:
+                    del self._content_cache[config_hash]
+
+    def _apply_update(self, action, config_name, contents, affected_configs):
+        """Applies a single change to the local store, recording the affected configurations."""
         # Update local store.
         if action == "DELETE":
             config_name_lower = config_name.lower()
+            self._config_hashes.pop(config_name_lower, None)
             if config_name_lower in self._store:
                 del self._store[config_name_lower]
 
@@ -228,27 +355,34 @@ class ConfigStore(SubsystemBase):
 
         if action in ("NEW", "UPDATE"):
             config_name_lower = config_name.lower()
+            self._config_hashes.pop(config_name_lower, None)
             self._store[config_name_lower] = contents
             self._name_map[config_name_lower] = config_name
             if config_name_lower in self._default_store:
                 action = "UPDATE"
+            elif affected_configs.get(config_name_lower) == "DELETE":
+                # Deleted and recreated within the same batch.
+                action = "UPDATE"
             affected_configs[config_name_lower] = action
             self._update_refs(config_name_lower, self._store[config_name_lower])
             self._gather_affected(config_name_lower, affected_configs)
 
-        if trigger_callback and self._initial_callbacks_called:
-            self._process_callbacks(affected_configs)
-
-        if action == "DELETE":
-            del self._name_map[config_name_lower]
-
-        if action == "DELETE_ALL":
-            self._name_map.clear()
-
     def _process_callbacks(self, affected_configs):
         _log.debug("Processing callbacks for affected files: {}".format(affected_configs))
         all_map = self._default_name_map.copy()
         all_map.update(self._name_map)
+
+        if self._config_hashes:
+            # Retrieve everything the callbacks will need in as few requests as possible.
+            needed = [config_name for config_name, action in affected_configs.items()
+                      if action != "DELETE" and self._get_callbacks(config_name, action)]
+            try:
+                self._load_configs(needed)
+            except Exception:
+                tb_str = traceback.format_exc()
+                _log.error("Problem loading configurations:")
+                _log.error(tb_str)
+
         # Always process "config" first.
         if "config" in affected_configs:
             self._process_callbacks_one_config("config", affected_configs["config"], all_map)
@@ -258,11 +392,15 @@ class ConfigStore(SubsystemBase):
                 continue
             self._process_callbacks_one_config(config_name, action, all_map)
 
-    def _process_callbacks_one_config(self, config_name, action, name_map):
+    def _get_callbacks(self, config_name, action):
         callbacks = set()
         for pattern, actions in self._subscriptions.items():
             if fnmatch.fnmatchcase(config_name, pattern) and action in actions:
                 callbacks.update(actions[action])
+        return callbacks
+
+    def _process_callbacks_one_config(self, config_name, action, name_map):
+        callbacks = self._get_callbacks(config_name, action)
 
         for callback in callbacks:
             try:
@@ -288,7 +426,7 @@ class ConfigStore(SubsystemBase):
         # Handle case were we are called during "onstart".
         if not self._initialized:
             try:
-                self._rpc().call(CONFIGURATION_STORE, "initialize_configs", self.vip_identity).get()
+                self._request_initial_update()
             except errors.Unreachable as e:
                 _log.error("Connected platform does not support the Configuration Store feature.")
             except errors.VIPError as e:
@@ -320,7 +458,7 @@ class ConfigStore(SubsystemBase):
         # may be a default configuration to grab.
         if not self._initialized:
             try:
-                self._rpc().call(CONFIGURATION_STORE, "initialize_configs", self.vip_identity).get()
+                self._request_initial_update()
             except errors.Unreachable as e:
                 _log.error("Connected platform does not support the Configuration Store feature.")
             except errors.VIPError as e:
@@ -417,6 +555,24 @@ class ConfigStore(SubsystemBase):
 
         self._update_refs(config_name_lower, self._store[config_name_lower])
 
+    def enable_lazy_loading(self):
+        """Only retrieve configuration contents when they are needed.
+
+        At startup the agent receives only the names and content hashes of
+        its configurations. Contents are retrieved from the platform the first
+        time a configuration is requested with get, passed to a callback or
+        referenced by another configuration being retrieved. Configurations
+        with identical contents share a single parsed copy.
+
+        Useful for agents with many large configurations, like the platform
+        driver. May not be called after the onsetup phase of an agents
+        lifetime. Will produce a runtime error if done so.
+        """
+        if self._initialized:
+            raise RuntimeError("Cannot enable lazy configuration loading after onsetup.")
+
+        self._lazy = True
+
     def delete(self, config_name, trigger_callback=False, send_update=True):
         """Delete a configuration by name. May not be called from a callback as this will cause
             deadlock with the platform. Will produce a runtime error if done so.
@@ -23,20 +23,24 @@
 # }}}
 
 
+import errno
 import inspect
 import logging
 import os
 import sys
+import time
 import traceback
 import weakref
 import re
+from collections import deque
 
 import gevent.local
 from gevent.event import AsyncResult
 from volttron.platform import jsonapi
 
 from .base import SubsystemBase
-from ..results import counter, ResultsDictionary
+from ..errors import Again, Unreachable
+from ..results import counter, DeadlineWheel, ResultsDictionary
 from ..decorators import annotate, annotations, dualmethod, spawn
 from .... import jsonrpc
 
@@ -65,6 +69,98 @@ def _isregex(obj):
     )
 
 
+_NO_VALUE = object()
+
+
+def _bind_parameter(method, signature, name):
+    """Returns a function returning the value passed for parameter name.
+
+    Returns None if the method has no parameter with that name. Values of
+    positional or keyword parameters are read directly from the call
+    arguments so the full argument binding is only done for variable
+    argument parameters or methods without an inspectable signature.
+    """
+    if signature is None:
+        def get_value(args, kwargs):
+            return inspect.getcallargs(method, *args, **kwargs).get(name, _NO_VALUE)
+        return get_value
+
+    parameter = signature.parameters.get(name)
+    if parameter is None:
+        return None
+
+    if parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+        def get_value(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return bound.arguments[name]
+        return get_value
+
+    index = None
+    if parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD):
+        index = list(signature.parameters).index(name)
+    default = parameter.default
+
+    def get_value(args, kwargs):
+        if index is not None and index < len(args):
+            return args[index]
+        if name in kwargs:
+            return kwargs[name]
+        if default is not parameter.empty:
+            return default
+        # Missing required argument, let binding raise the TypeError.
+        signature.bind(*args, **kwargs)
+    return get_value
+
+
+def _compile_parameter_check(method, signature, user, name, value):
+    """Returns a function raising UNAUTHORIZED unless the call passes an
+    allowed value for parameter name."""
+    get_value = _bind_parameter(method, signature, name)
+
+    def unauthorized(msg):
+        raise jsonrpc.exception_from_json(jsonrpc.UNAUTHORIZED, msg)
+
+    def undefined_msg():
+        return "User {} capability is not defined properly. method {} does not have a parameter {}".format(
+            user, method.__name__, name)
+
+    if get_value is None:
+        def check(args, kwargs):
+            unauthorized(undefined_msg())
+        return check
+
+    if _isregex(value):
+        regex = re.compile("^" + value[1:-1] + "$")
+
+        def check(args, kwargs):
+            arg = get_value(args, kwargs)
+            if arg is _NO_VALUE:
+                unauthorized(undefined_msg())
+            if not regex.match(arg):
+                unauthorized("User {} can call method {} only with {} matching pattern {} but called with "
+                             "{}={}".format(user, method.__name__, name, value, name, arg))
+        return check
+
+    def check(args, kwargs):
+        arg = get_value(args, kwargs)
+        if arg is _NO_VALUE:
+            unauthorized(undefined_msg())
+        if arg != value:
+            unauthorized("User {} can call method {} only with {}={} but called with {}={}".format(
+                user, method.__name__, name, value, name, arg))
+    return check
+
+
+def _expired(request, now):
+    """Returns True for a request carrying a deadline that has passed."""
+    try:
+        deadline = request.get("deadline")
+    except AttributeError:
+        return False
+    return deadline is not None and "method" in request and deadline < now
+
+
 class Dispatcher(jsonrpc.Dispatcher):
     def __init__(self, methods, local):
         super(Dispatcher, self).__init__()
@@ -92,13 +188,17 @@ class Dispatcher(jsonrpc.Dispatcher):
             methods.append((ident, method, args, kwargs))
         return super(Dispatcher, self).batch_call(methods), results
 
-    def call(self, method, args=None, kwargs=None):
+    def call(self, method, args=None, kwargs=None, deadline=None):
         # pylint: disable=arguments-differ
         result = next(self._results)
-        return (
-            super(Dispatcher, self).call(result.ident, method, args, kwargs),
-            result,
-        )
+        if deadline is None:
+            request = super(Dispatcher, self).call(result.ident, method, args, kwargs)
+        else:
+            # The deadline lets the peer skip the call if it arrives too late.
+            request = jsonrpc.json_method(result.ident, method, args or (), kwargs or {})
+            request["deadline"] = deadline
+            request = self.serialize(request)
+        return request, result
 
     def result(self, response, ident, value, context=None):
         try:
@@ -218,6 +318,9 @@ class RPC(SubsystemBase):
         self._dispatcher = None
         self._counter = counter()
         self._outstanding = weakref.WeakValueDictionary()
+        self._deadlines = DeadlineWheel(self._expire_result)
+        self._max_outstanding_per_peer = None
+        self._peer_outstanding = {}
         core.register("RPC", self._handle_subsystem, self._handle_error)
         core.register(
             "external_rpc",
@@ -285,95 +388,65 @@ class RPC(SubsystemBase):
         """
         Adds an authorization check to verify the calling agent has the
         required capabilities.
-        """
 
-        def checked_method(*args, **kwargs):
-            user = str(self.context.vip_message.user)
-            if self._message_bus == "rmq":
-                # remove platform instance name. rmq user names are of the format <instance name>.<user>
-                user = user[user.index(".")+1:]
+        The method signature is inspected once here. The checks for a user are
+        compiled the first time the user calls the method and reused until the
+        user's capabilities are replaced by an auth.update from the platform.
+        """
+        method_name = method.__name__
+        try:
+            signature = inspect.signature(method)
+        except (TypeError, ValueError):
+            signature = None
+        # user -> (capabilities the checks were compiled from, error, parameter checks)
+        compiled_users = {}
 
-            user_capabilites = self._owner.vip.auth.get_capabilities(user)
-            _log.debug("**user caps is: {}".format(user_capabilites))
+        def compile_user(user, user_capabilites):
             if user_capabilites:
                 user_capabilities_names = set(user_capabilites.keys())
             else:
                 user_capabilities_names = set()
             if required_caps == {""}:
-                pass
-            elif not required_caps.issubset(user_capabilities_names):
+                return None, ()
+            if not required_caps.issubset(user_capabilities_names):
                 msg = (
                     "method '{}' requires capabilities {}, but capability {} "
                     "was provided for user {}"
                 ).format(
-                    method.__name__,
+                    method_name,
                     required_caps,
                     user_capabilites,
                     user
                 )
-                raise jsonrpc.exception_from_json(jsonrpc.UNAUTHORIZED, msg)
-            else:
-                # Now check if args passed to method are the ones allowed.
-
-                for cap_name, param_dict in user_capabilites.items():
-                    if (
-                            param_dict
-                            and required_caps
-                            and cap_name in required_caps
-                    ):
-                        # if the method has required capabilities and
-                        # if the user capability has argument restrictions,
-                        # check if the args passed to method match the
-                        # requirement
-                        _log.debug("args = {} kwargs= {}".format(args, kwargs))
-                        args_dict = inspect.getcallargs(method, *args, **kwargs)
-                        _log.debug("dict = {}".format(args_dict))
-                        _log.debug(
-                            "name= %r parameters allowed=%r",
-                            cap_name,
-                            param_dict
-                        )
-                        for name, value in param_dict.items():
-                            _log.debug("name= {} value={}".format(name, value))
-                            if name not in args_dict:
-                                raise jsonrpc.exception_from_json(
-                                    jsonrpc.UNAUTHORIZED,
-                                    "User {} capability is not defined "
-                                    "properly. method {} does not have "
-                                    "a parameter {}".format(
-                                        user, method.__name__, name
-                                    ),
-                                )
-                            if _isregex(value):
-                                regex = re.compile("^" + value[1:-1] + "$")
-                                if not regex.match(args_dict[name]):
-                                    raise jsonrpc.exception_from_json(
-                                        jsonrpc.UNAUTHORIZED,
-                                        "User {} can call method {} only "
-                                        "with {} matching pattern {} but "
-                                        "called with {}={}".format(
-                                            user,
-                                            method.__name__,
-                                            name,
-                                            value,
-                                            name,
-                                            args_dict[name],
-                                        ),
-                                    )
-                            elif args_dict[name] != value:
-                                raise jsonrpc.exception_from_json(
-                                    jsonrpc.UNAUTHORIZED,
-                                    "User {} can call method {} only "
-                                    "with {}={} but called with "
-                                    "{}={}".format(
-                                        user,
-                                        method.__name__,
-                                        name,
-                                        value,
-                                        name,
-                                        args_dict[name],
-                                    ),
-                                )
+                return msg, ()
+
+            # Checks of the args passed to the method for capabilities
+            # with argument restrictions.
+            checks = []
+            for cap_name, param_dict in user_capabilites.items():
+                if param_dict and cap_name in required_caps:
+                    for name, value in param_dict.items():
+                        checks.append(_compile_parameter_check(method, signature, user, name, value))
+            return None, tuple(checks)
+
+        def checked_method(*args, **kwargs):
+            user = str(self.context.vip_message.user)
+            if self._message_bus == "rmq":
+                # remove platform instance name. rmq user names are of the format <instance name>.<user>
+                user = user[user.index(".")+1:]
+
+            user_capabilites = self._owner.vip.auth.get_capabilities(user)
+            compiled = compiled_users.get(user)
+            if compiled is None or compiled[0] is not user_capabilites:
+                _log.debug("user %s caps is: %s", user, user_capabilites)
+                compiled = (user_capabilites,) + compile_user(user, user_capabilites)
+                compiled_users[user] = compiled
+
+            _, error, checks = compiled
+            if error is not None:
+                raise jsonrpc.exception_from_json(jsonrpc.UNAUTHORIZED, error)
+            for check in checks:
+                check(args, kwargs)
 
             return method(*args, **kwargs)
 
@@ -449,17 +522,13 @@ class RPC(SubsystemBase):
                 if not isinstance(msg, dict):
                     message.args[idx] = jsonapi.loads(msg)
 
-            responses = [
-                response
-                for response in (dispatch(msg, message) for msg in message.args)
-                if response
-            ]
-        else:
-            responses = [
-                response
-                for response in (dispatch(msg, message) for msg in message.args)
-                if response
-            ]
+        self._drop_expired_requests(message)
+
+        responses = [
+            response
+            for response in (dispatch(msg, message) for msg in message.args)
+            if response
+        ]
         if responses:
             message.user = ""
             message.args = responses
@@ -496,6 +565,61 @@ class RPC(SubsystemBase):
                         self.core().identity
                     )
 
+    @staticmethod
+    def _drop_expired_requests(message):
+        """Removes requests whose caller has already given up on them."""
+        now = time.time()
+        args = []
+        for msg in message.args:
+            if isinstance(msg, list):
+                msg = [request for request in msg if not _expired(request, now)]
+                if msg:
+                    args.append(msg)
+            elif not _expired(msg, now):
+                args.append(msg)
+        if len(args) != len(message.args):
+            _log.debug("Skipping %d expired RPC request(s) from %s", len(message.args) - len(args), message.peer)
+            message.args = args
+
+    def _expire_result(self, result):
+        self._dispatcher._results.pop(result.ident, None)  # pylint: disable=protected-access
+        result.set_exception(gevent.Timeout(exception="RPC call deadline exceeded"))
+
+    def set_max_outstanding_per_peer(self, limit):
+        """Limits the number of calls waiting for a reply from a single peer.
+
+        Calls beyond the limit fail immediately with
+        :py:class:`volttron.platform.vip.agent.errors.Again` instead of
+        queueing behind a slow peer.
+
+        :param limit: maximum outstanding calls per peer, None for no limit.
+        """
+        self._max_outstanding_per_peer = limit
+        if limit is None:
+            self._peer_outstanding.clear()
+
+    def _over_limit(self, peer, count):
+        """Returns failed results if sending count more calls to peer would exceed the limit."""
+        if self._max_outstanding_per_peer is None:
+            return None
+        outstanding = self._peer_outstanding.get(peer, ())
+        if len(outstanding) + count <= self._max_outstanding_per_peer:
+            return None
+        results = []
+        for _ in range(count):
+            result = AsyncResult()
+            result.set_exception(Again(errno.EAGAIN, "too many outstanding calls", peer, "RPC"))
+            results.append(result)
+        return results
+
+    def _track_result(self, peer, result, deadline):
+        if self._max_outstanding_per_peer is not None:
+            outstanding = self._peer_outstanding.setdefault(peer, weakref.WeakSet())
+            outstanding.add(result)
+            result.rawlink(outstanding.discard)
+        if deadline is not None:
+            self._deadlines.add(result, deadline)
+
     def _handle_error(self, sender, message, error, **kwargs):
         result = self._outstanding.pop(message.id, None)
         if isinstance(result, AsyncResult):
@@ -550,9 +674,147 @@ class RPC(SubsystemBase):
                         )
         return results or None
 
+    def _call_batch(self, peer, calls, deadline=None):
+        """Sends several calls to one peer in a single multipart message.
+
+        Each frame of the message is a separate request. The peer dispatches
+        every frame and returns all of the responses in one message.
+
+        :param calls: list of (method, args, kwargs) tuples.
+        :param deadline: optional time.time() timestamp after which the calls
+            are abandoned.
+        :returns: list of AsyncResults in the order of calls.
+        """
+        failed = self._over_limit(peer, len(calls))
+        if failed is not None:
+            return failed
+
+        frames = []
+        results = []
+        for method, args, kwargs in calls:
+            request, result = self._dispatcher.call(method, args, kwargs, deadline=deadline)
+            frames.append(request)
+            results.append(result)
+
+        if not self._isconnected:
+            for result in results:
+                result.set_exception(Unreachable(errno.EHOSTUNREACH, "agent is not connected", peer, "RPC"))
+            return results
+
+        items = weakref.WeakSet(results)
+        ident = "%s.%s" % (next(self._counter), id(items))
+        for result in results:
+            result._weak_set = items  # pylint: disable=protected-access
+            self._track_result(peer, result, deadline)
+        self._outstanding[ident] = items
+        try:
+            self.core().connection.send_vip(peer, "RPC", args=frames, msg_id=ident)
+        except ZMQError as exc:
+            if exc.errno == ENOTSOCK:
+                _log.debug(
+                    "Socket send on non-socket %r",
+                    self.core().identity
+                )
+        return results
+
+    def call_many(self, calls, concurrency=10, timeout=None):
+        """Makes several RPC calls concurrently and waits for their results.
+
+        At most `concurrency` calls are outstanding at a time. Calls to the
+        same peer sent at the same time are packed into a single multipart
+        message. Like waiting on the result of :py:meth:`call`, this must not
+        be called from the agent's core loop.
+
+        .. code-block:: python
+
+            results = self.vip.rpc.call_many(
+                [("platform.driver", "get_point", ("campus/building/device", "point1")),
+                 ("platform.historian", "query", (), {"topic": "campus/building/device/point1"})],
+                concurrency=5, timeout=30)
+
+        :param calls: iterable of (peer, method, args, kwargs) tuples. args
+            and kwargs may be omitted.
+        :param concurrency: maximum number of outstanding calls.
+        :param timeout: deadline in seconds for all of the calls to complete.
+            None waits indefinitely.
+        :returns: list of results in the order of calls. A call that failed
+            has the exception in place of its result. Calls that did not
+            complete before the deadline have a gevent.Timeout.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        requests = []
+        for call in calls:
+            peer, method = call[0], call[1]
+            args = call[2] if len(call) > 2 and call[2] is not None else ()
+            kwargs = call[3] if len(call) > 3 and call[3] is not None else {}
+            requests.append((peer, method, tuple(args), dict(kwargs)))
+
+        results = [None] * len(requests)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pending = deque(range(len(requests)))
+        in_flight = {}
+
+        while pending or in_flight:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+
+            # Fill the window, packing calls to the same peer into one message.
+            by_peer = {}
+            while pending and len(in_flight) + sum(len(i) for i in by_peer.values()) < concurrency:
+                index = pending.popleft()
+                by_peer.setdefault(requests[index][0], []).append(index)
+
+            for peer, indices in by_peer.items():
+                single = (len(indices) == 1 or self._message_bus != "zmq"
+                          or any("external_platform" in requests[index][3] for index in indices))
+                if single:
+                    for index in indices:
+                        _, method, args, kwargs = requests[index]
+                        if deadline is not None:
+                            kwargs = dict(kwargs, rpc_timeout=max(0.0, deadline - time.monotonic()))
+                        result = self.call(peer, method, *args, **kwargs)
+                        if result is None:
+                            result = AsyncResult()
+                            result.set_exception(Unreachable(errno.EHOSTUNREACH, "agent is not connected",
+                                                             peer, "RPC"))
+                        in_flight[result] = index
+                else:
+                    batch_deadline = None
+                    if deadline is not None:
+                        batch_deadline = time.time() + max(0.0, deadline - time.monotonic())
+                    batch = self._call_batch(peer, [requests[index][1:] for index in indices], batch_deadline)
+                    for result, index in zip(batch, indices):
+                        in_flight[result] = index
+
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not gevent.wait(list(in_flight), timeout=remaining, count=1):
+                break
+            for result in [result for result in in_flight if result.ready()]:
+                index = in_flight.pop(result)
+                results[index] = result.value if result.successful() else result.exception
+
+        if pending or in_flight:
+            expired = gevent.Timeout(timeout)
+            for result, index in in_flight.items():
+                if result.ready():
+                    results[index] = result.value if result.successful() else result.exception
+                else:
+                    results[index] = expired
+            for index in pending:
+                results[index] = expired
+
+        return results
+
     def call(self, peer, method, *args, **kwargs):
         platform = kwargs.pop("external_platform", "")
-        request, result = self._dispatcher.call(method, args, kwargs)
+        rpc_timeout = kwargs.pop("rpc_timeout", None)
+        failed = self._over_limit(peer, 1)
+        if failed is not None:
+            return failed[0]
+        deadline = None if rpc_timeout is None else time.time() + rpc_timeout
+        request, result = self._dispatcher.call(method, args, kwargs, deadline=deadline)
         ident = f"{next(self._counter)}.{hash(result)}"
         self._outstanding[ident] = result
         subsystem = None
@@ -561,6 +823,8 @@ class RPC(SubsystemBase):
         if not self._isconnected:
             return
 
+        self._track_result(peer, result, deadline)
+
         if self._message_bus == "zmq":
             if platform == "":  # local platform
                 subsystem = "RPC"
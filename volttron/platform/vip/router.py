@@ -35,13 +35,16 @@ from zmq import Frame, NOBLOCK, ZMQError, EINVAL, EHOSTUNREACH
 from volttron.platform.vip.servicepeer import ServicePeerNotifier
 from volttron.utils.frame_serialization import serialize_frames
 
-__all__ = ['BaseRouter', 'OUTGOING', 'INCOMING', 'UNROUTABLE', 'ERROR']
+__all__ = ['BaseRouter', 'OUTGOING', 'INCOMING', 'UNROUTABLE', 'ERROR', 'TRACE_PREFIX']
 
 OUTGOING = 0
 INCOMING = 1
 UNROUTABLE = 2
 ERROR = 3
 
+# Prefix of the latency trace header agents may send in the user frame.
+TRACE_PREFIX = 'trace:'
+
 _log = logging.getLogger(__name__)
 
 # Optimizing by pre-creating frames
@@ -261,6 +264,9 @@ class BaseRouter:
             # Peer is not talking a protocol we understand
             issue(UNROUTABLE, frames, 'bad VIP signature')
             return
+        if auth_token and auth_token.startswith(TRACE_PREFIX):
+            # Trace headers were recorded by issue() and stop here.
+            frames[3] = auth_token = ''
         user_id = self.lookup_user_id(sender, recipient, auth_token)
         if user_id is None:
             user_id = ''
@@ -26,22 +26,53 @@
 # }}}
 #}}}
 
-'''Utilities for tracking VIP message statistics at the router.'''
-
+'''Utilities for tracking VIP message statistics at the router.
 
+Besides counting messages, the tracker aggregates the latency of traced
+messages. Agents started with a non-zero trace sample rate (the
+VOLTTRON_TRACE_SAMPLE_RATE environment variable, set by the platform
+from its trace-sample-rate option) put a trace header holding the
+monotonic send time into the user frame of a sample of their messages.
+The router records the time from send until it routed the message and
+until it was handed to the receiving peer's socket, in histograms per
+subsystem, sender and receiver. The header is removed before the
+message is forwarded.
+'''
 
+import os
+import random
+import time
+from bisect import bisect_left
 
 import gevent
+from zmq import EAGAIN
+
+from .router import UNROUTABLE, ERROR, INCOMING, OUTGOING, TRACE_PREFIX
+
+__all__ = ['LatencyHistogram', 'Tracker', 'get_trace_sample_rate',
+           'parse_trace_header', 'trace_header']
+
+TRACE_SAMPLE_RATE_ENV = 'VOLTTRON_TRACE_SAMPLE_RATE'
 
-from .router import UNROUTABLE, ERROR, INCOMING
+# Upper bounds (in seconds) of the latency histogram buckets. Samples
+# larger than the last bound are counted in an overflow bucket.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
 
-__all__ = ['Tracker']
+_EAGAIN = str(EAGAIN)
+
+
+def text(frame):
+    '''Return a frame, bytes or str, as str.'''
+    if isinstance(frame, str):
+        return frame
+    return bytes(frame).decode('utf-8', 'replace')
 
 
 def pick(frames, index):
-    '''Return the frame at index, converted to bytes, or None.'''
+    '''Return the frame at index, converted to str, or None.'''
     try:
-        return bytes(frames[index])
+        return text(frames[index])
     except IndexError:
         return None
 
@@ -54,10 +85,78 @@ def increment(prop, key):
         prop[key] = 1
 
 
+def get_trace_sample_rate():
+    '''Return the trace sample rate configured for this process.'''
+    try:
+        rate = float(os.environ.get(TRACE_SAMPLE_RATE_ENV, 0))
+    except ValueError:
+        return 0.0
+    return min(max(rate, 0.0), 1.0)
+
+
+def trace_header(sample_rate):
+    '''Return a trace header for a sampled message or None.'''
+    if sample_rate and random.random() < sample_rate:
+        return TRACE_PREFIX + repr(time.monotonic())
+    return None
+
+
+def parse_trace_header(value):
+    '''Return the send time carried by a trace header or None.'''
+    if not value or not value.startswith(TRACE_PREFIX):
+        return None
+    try:
+        return float(value[len(TRACE_PREFIX):])
+    except ValueError:
+        return None
+
+
+class LatencyHistogram:
+    '''Fixed bucket histogram of latencies in seconds.'''
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        '''Estimate a percentile as the upper bound of its bucket.'''
+        if not self.count:
+            return None
+        rank = self.count * percent / 100.0
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                if index < len(LATENCY_BUCKETS):
+                    return min(LATENCY_BUCKETS[index], self.max)
+                break
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count,
+                'mean': self.total / self.count if self.count else None,
+                'max': self.max,
+                'p50': self.percentile(50),
+                'p90': self.percentile(90),
+                'p99': self.percentile(99)}
+
+
 class Tracker:
     '''Object for sharing data between the router and control objects.'''
 
-    def __init__(self):
+    def __init__(self, sample_rate=0.0):
+        self.sample_rate = sample_rate
         self._reset()
         self.enabled = False
 
@@ -73,7 +172,14 @@ class Tracker:
             'unroutable': {'error': {}, 'peer': {}},
             'incoming': {'peer': {}, 'user': {}, 'subsystem': {}},
             'outgoing': {'peer': {}, 'user': {}, 'subsystem': {}},
+            # Sends refused because the peer's queue was at its high
+            # water mark.
+            'queue_full': {},
         }
+        # (subsystem, sender, receiver) -> {'route': ..., 'delivery': ...}
+        self.latency = {}
+        # Send time, sender and subsystem of the traced message being routed.
+        self._pending = None
 
     def hit(self, topic, frames, extra):
         '''Increment counters for given topic and frames.'''
@@ -86,14 +192,64 @@ class Tracker:
                 subsystem = pick(frames, 5)
                 if topic == ERROR:
                     stat = self.stats['error']
-                    increment(stat['error'], bytes(extra[0]))
+                    errnum = text(extra[0])
+                    increment(stat['error'], errnum)
+                    if errnum == _EAGAIN:
+                        increment(self.stats['queue_full'], pick(frames, 0))
                 else:
                     stat = self.stats[
                         'incoming' if topic == INCOMING else 'outgoing']
+                    if topic == INCOMING:
+                        self._trace_incoming(frames, user, subsystem)
+                    elif self._pending is not None:
+                        self._trace_outgoing(frames)
                 increment(stat['user'], user)
                 increment(stat['subsystem'], subsystem)
             increment(stat['peer'], pick(frames, 0))
 
+    def _trace_incoming(self, frames, user, subsystem):
+        self._pending = None
+        sent = parse_trace_header(user)
+        if sent is None:
+            return
+        sender = pick(frames, 0)
+        self._record('route', subsystem, sender, pick(frames, 1) or 'router',
+                     time.monotonic() - sent)
+        self._pending = (sent, sender, subsystem)
+
+    def _trace_outgoing(self, frames):
+        # Routed messages leave the router as [RECIPIENT, SENDER, ...]
+        # right after they arrived, anything else is the router's own.
+        sent, sender, subsystem = self._pending
+        if pick(frames, 1) != sender:
+            return
+        self._pending = None
+        self._record('delivery', subsystem, sender, pick(frames, 0),
+                     time.monotonic() - sent)
+
+    def _record(self, kind, subsystem, sender, receiver, latency):
+        if latency < 0:
+            # The sender's clock is not this host's monotonic clock.
+            return
+        key = (subsystem, sender, receiver)
+        try:
+            histograms = self.latency[key]
+        except KeyError:
+            histograms = self.latency[key] = {'route': LatencyHistogram(),
+                                              'delivery': LatencyHistogram()}
+        histograms[kind].record(latency)
+
+    def get_stats(self):
+        '''Return the counters and a summary of the latency histograms.'''
+        stats = dict(self.stats)
+        stats['sample_rate'] = self.sample_rate
+        stats['latency'] = [
+            {'subsystem': subsystem, 'sender': sender, 'receiver': receiver,
+             'route': histograms['route'].to_dict(),
+             'delivery': histograms['delivery'].to_dict()}
+            for (subsystem, sender, receiver), histograms in self.latency.items()]
+        return stats
+
     def enable(self):
         '''Enable tracking.'''
         if not self.enabled:
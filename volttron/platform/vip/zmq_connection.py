@@ -27,6 +27,7 @@ import logging
 
 from .green import Socket as GreenSocket
 from .rmq_connection import BaseConnection
+from .tracking import get_trace_sample_rate, trace_header
 _log = logging.getLogger(__name__)
 
 
@@ -40,6 +41,7 @@ class ZMQConnection(BaseConnection):
         self.socket = None
         self.context = context
         self._identity = identity
+        self._trace_sample_rate = get_trace_sample_rate()
         self._logger = logging.getLogger(__name__)
         self._logger.debug("ZMQ connection {}".format(identity))
 
@@ -77,6 +79,8 @@ class ZMQConnection(BaseConnection):
 
     def send_vip(self, peer, subsystem, args=None, msg_id: bytes = b'',
                  user=b'', via=None, flags=0, copy=True, track=False):
+        if not user and self._trace_sample_rate:
+            user = trace_header(self._trace_sample_rate) or user
         self.socket.send_vip(peer, subsystem, args=args, msg_id=msg_id, user=user,
                              via=via, flags=flags, copy=copy, track=track)
 
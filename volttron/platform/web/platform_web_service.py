@@ -33,6 +33,7 @@ import zlib
 from collections import defaultdict
 
 import gevent
+import gevent.pool
 import gevent.pywsgi
 import werkzeug
 import jwt
@@ -71,6 +72,9 @@ from ...utils.rmq_config_params import RMQConfig
 
 _log = logging.getLogger(__name__)
 
+# Maximum number of calls from one JSON-RPC batch request dispatched at the same time.
+JSONRPC_BATCH_CONCURRENCY = 10
+
 
 class CouldNotRegister(Exception):
     pass
@@ -447,6 +451,10 @@ class PlatformWebService(Agent):
             _log.debug('Calling peer {} back with env={} data={}'.format(
                 peer, passenv, data
             ))
+            if res_type == "jsonrpc" and isinstance(data, list):
+                return self.create_batch_response(self._dispatch_batch(
+                    data, lambda call: self._route_jsonrpc(peer, passenv, call)), start_response)
+
             res = self.vip.rpc.call(peer, 'route.callback',
                                     passenv, data).get(timeout=60)
 
@@ -604,6 +612,14 @@ class PlatformWebService(Agent):
                            [('Content-Type', 'application/json')])
             return [jsonapi.dumpb(res)]
 
+    def create_batch_response(self, responses, start_response):
+        # Content-Length lets the client reuse the (HTTP/1.1 keep-alive)
+        # connection for its next request without chunked encoding.
+        body = jsonapi.dumpb(responses)
+        start_response('200 OK', [('Content-Type', 'application/json'),
+                                  ('Content-Length', str(len(body)))])
+        return [body]
+
     def _sendfile(self, env, start_response, filename):
         from wsgiref.util import FileWrapper
         status = '200 OK'
@@ -646,6 +662,9 @@ class PlatformWebService(Agent):
         subsequent request.  The session is tied to the ip address
         of the caller.
 
+        A JSON-RPC 2.0 batch (a list of calls) is dispatched concurrently and
+        answered with the list of responses in the same order.
+
         :param object env: Environment dictionary for the request.
         :param object data: The JSON-RPC 2.0 method to call.
         :return object: An JSON-RPC 2.0 response.
@@ -654,6 +673,26 @@ class PlatformWebService(Agent):
             return JsonResponse(jsonapi.dumps(jsonrpc.json_error('NA', INVALID_REQUEST,
                                       'Invalid request method, only POST allowed')))
 
+        if isinstance(data, list):
+            return JsonResponse(jsonapi.dumps(self._dispatch_batch(data, self._dispatch_jsonrpc)))
+        return JsonResponse(jsonapi.dumps(self._dispatch_jsonrpc(data)))
+
+    def _dispatch_batch(self, batch, dispatch):
+        """ Call dispatch for every call in a JSON-RPC batch, at most
+        JSONRPC_BATCH_CONCURRENCY at a time.
+
+        :return: The list of responses, in the order of the batch.
+        """
+        if not batch:
+            return jsonrpc.json_error(None, INVALID_REQUEST, 'Empty batch request')
+        pool = gevent.pool.Pool(min(len(batch), JSONRPC_BATCH_CONCURRENCY))
+        return pool.map(dispatch, batch)
+
+    def _dispatch_jsonrpc(self, data):
+        """ Authenticate and dispatch a single JSON-RPC 2.0 call.
+
+        :return: The JSON-RPC 2.0 result or error object for the call.
+        """
         try:
             rpcdata = self._to_jsonrpc_obj(data)
             _log.info('rpc method: {}'.format(rpcdata.method))
@@ -663,16 +702,13 @@ class PlatformWebService(Agent):
                 if self.jsonrpc_verify_and_dispatch(rpcdata.params['authentication']):
                     del rpcdata.params['authentication']
                 else:
-                    return JsonResponse(jsonapi.dumps(jsonrpc.json_error(rpcdata.id, UNAUTHORIZED,
-                                                           "Invalid username/password specified.")))
+                    return jsonrpc.json_error(rpcdata.id, UNAUTHORIZED, "Invalid username/password specified.")
             else:
-                return JsonResponse(jsonapi.dumps(jsonrpc.json_error(rpcdata.id, UNAUTHORIZED,
-                                                       "Authentication parameter missing.")))
+                return jsonrpc.json_error(rpcdata.id, UNAUTHORIZED, "Authentication parameter missing.")
 
             _log.debug('RPC METHOD IS: {}'.format(rpcdata.method))
             if not rpcdata.method:
-                return JsonResponse(jsonapi.dumps(jsonrpc.json_error(
-                    'NA', INVALID_REQUEST, 'Invalid rpc data {}'.format(data))))
+                return jsonrpc.json_error('NA', INVALID_REQUEST, 'Invalid rpc data {}'.format(data))
             else:
                 if rpcdata.params:
                     result_or_error = self.vip.rpc(rpcdata.id, rpcdata.method, **rpcdata.params).get()
@@ -680,21 +716,31 @@ class PlatformWebService(Agent):
                     result_or_error = self.vip.rpc(rpcdata.id, rpcdata.method).get()
 
         except AssertionError:
-            return JsonResponse(jsonapi.dumps(jsonrpc.json_error(
-                'NA', INVALID_REQUEST, 'Invalid rpc data {}'.format(data))))
+            return jsonrpc.json_error('NA', INVALID_REQUEST, 'Invalid rpc data {}'.format(data))
         except Unreachable:
-            return JsonResponse(jsonapi.dumps(jsonrpc.json_error(
+            return jsonrpc.json_error(
                 rpcdata.id, UNAVAILABLE_PLATFORM,
                 "Couldn't reach platform with method {} params: {}".format(
                     rpcdata.method,
-                    rpcdata.params))))
+                    rpcdata.params))
         except Exception as e:
+            return jsonrpc.json_error('NA', UNHANDLED_EXCEPTION, str(e))
+
+        return self._get_jsonrpc_response(rpcdata.id, result_or_error)
 
-            return JsonResponse(jsonapi.dumps(jsonrpc.json_error(
-                'NA', UNHANDLED_EXCEPTION, e
-            )))
+    def _route_jsonrpc(self, peer, passenv, data):
+        """ Call the agent serving a "jsonrpc" endpoint with a single call
+        from a batch.
 
-        return JsonResponse(jsonapi.dumps(self._get_jsonrpc_response(rpcdata.id, result_or_error)))
+        :return: The JSON-RPC 2.0 result or error object for the call.
+        """
+        id = data.get('id') if isinstance(data, dict) else None
+        try:
+            res = self.vip.rpc.call(peer, 'route.callback', passenv, data).get(timeout=60)
+        except Exception as e:
+            _log.error('Error routing batch call to {}: {}'.format(peer, e))
+            return jsonrpc.json_error(id, INTERNAL_ERROR, str(e))
+        return self._get_jsonrpc_response(id, res)
 
     def _get_jsonrpc_response(self, id, result_or_error):
         """ Wrap the response in either a json-rpc error or result.
@@ -4,9 +4,12 @@ from treelib import Tree, Node
 from treelib.exceptions import DuplicatedNodeIdError, NodeIDAbsentError
 from collections import defaultdict
 
-from volttron.platform.agent.known_identities import CONFIGURATION_STORE
+from volttron.platform.agent.known_identities import CONFIGURATION_STORE, PLATFORM_DRIVER
+from volttron.platform.jsonrpc import MethodNotFound
 
 import re
+import weakref
+from fnmatch import translate
 from os.path import normpath
 
 import logging
@@ -23,7 +26,30 @@ class TopicNode(Node):
         return True if self.segment_type == 'TOPIC_SEGMENT' else False
 
 
+def _release_view(nodes, tree_id):
+    # Drop the parent and child pointers a view registered on the nodes it shares with its source tree.
+    for node in nodes:
+        node._predecessor.pop(tree_id, None)
+        node._successors.pop(tree_id, None)
+
+
 class TopicTree(Tree):
+    """Tree of topic segments.
+
+    Node identifiers are the full topic including the root, so the child of a node with a given segment is found by
+    identifier rather than by searching. Topic patterns used by get_matches and prune are split on "/" and each
+    segment is one of:
+
+    * a literal segment,
+    * "+" or "-", matching any single segment,
+    * a glob (e.g. "ahu*"), matching a single segment with fnmatch rules,
+    * "#", matching the node reached so far and everything below it.
+
+    e.g. ``campus/+/ahu*/#``. Only branches matching the pattern are visited.
+    """
+    # Set on views returned by prune, which share their nodes with the tree they were made from.
+    _read_only = False
+
     def __init__(self, topic_list=None, root_name='root', node_class=None, *args, **kwargs):
         node_class = node_class if node_class else TopicNode
         super(TopicTree, self).__init__(node_class=node_class, *args, **kwargs)
@@ -48,10 +74,23 @@ class TopicTree(Tree):
                 parent = nid
 
     def add_node(self, node, parent=None):
+        self._check_writable()
         super(TopicTree, self).add_node(node, parent)
         node.topic = node.identifier[(len(self.root) + 1):]
         return node
 
+    def update_node(self, nid, **attrs):
+        self._check_writable()
+        return super(TopicTree, self).update_node(nid, **attrs)
+
+    def remove_node(self, identifier):
+        self._check_writable()
+        return super(TopicTree, self).remove_node(identifier)
+
+    def _check_writable(self):
+        if self._read_only:
+            raise TypeError('Pruned topic trees are read-only views of the tree they were pruned from.')
+
     # TODO: Should this actually be get_child_topics() where topics or routes are returned with wildcards?
     def get_children_dict(self, sub_root_node_id: Union[list, str], include_root: bool = True,
                           prefix: str = '', replace_topic: str = None) -> dict:
@@ -81,29 +120,89 @@ class TopicTree(Tree):
         return ret_dict
 
     def prune(self, topic_pattern: str = None, regex: str = None, exact_matches: Iterable = None, *args, **kwargs):
+        """Return a read-only view containing the nodes matching all the given filters, their descendants
+        (for topic_pattern) and their ancestors.
+
+        The view shares its nodes, and their data, with this tree. topic_pattern may be given with or without the
+        root segment.
+        """
         if topic_pattern:
-            pattern = re.compile(topic_pattern.replace('-', '[^/]+') + '(/|$)')
-            nids = [n.identifier for n in self.filter_nodes(lambda x: pattern.search(x.identifier))]
+            segments = topic_pattern.split('/')
+            if segments[0] == self.root:
+                segments.pop(0)
+            nids = [n for m in self._match(self.root, segments) for n in self.expand_tree(m)]
+        elif exact_matches and not regex:
+            nids = [n for n in exact_matches if n in self._nodes]
+            exact_matches = None
         else:
             nids = list(self.expand_tree())
         if regex:
             regex = re.compile(regex)
             nids = [n for n in nids if regex.search(n)]
         if exact_matches:
+            exact_matches = set(exact_matches)
             nids = [n for n in nids if n in exact_matches]
-        pruned = self.__class__(topic_list=nids, root_name=self.root, *args, **kwargs)
-        for nid in [n.identifier for n in pruned.all_nodes()]:
-            old = self.get_node(nid)
-            pruned.update_node(nid, data=old.data, segment_type=old.segment_type)
-        return pruned
+
+        keep = {self.root}
+        for nid in nids:
+            while nid not in keep:
+                keep.add(nid)
+                nid = self[nid].predecessor(self._identifier)
+        return self._view(keep)
+
+    def _view(self, keep):
+        view = self.__class__.__new__(self.__class__)
+        Tree.__init__(view, node_class=self.node_class)
+        view._read_only = True
+        # Keep the source (and its node pointers) alive as long as the view.
+        view._source = self
+        view.root = self.root
+        tree_id = view.identifier
+        stack = [(self.root, None)]
+        while stack:
+            nid, parent = stack.pop()
+            node = self[nid]
+            children = [c for c in self.is_branch(nid) if c in keep]
+            view._nodes[nid] = node
+            node.set_predecessor(parent, tree_id)
+            node.set_successors(children, tree_id)
+            stack.extend((c, nid) for c in reversed(children))
+        weakref.finalize(view, _release_view, list(view._nodes.values()), tree_id)
+        return view
+
+    def _match(self, nid, segments):
+        """Yield the identifiers of nodes below nid matching the pattern segments, visiting matching branches only."""
+        if not segments:
+            yield nid
+            return
+        segment, rest = segments[0], segments[1:]
+        if segment == '#':
+            yield from self.expand_tree(nid, sorting=False)
+        elif segment in ('+', '-'):
+            for child in self.is_branch(nid):
+                yield from self._match(child, rest)
+        elif any(c in segment for c in '*?['):
+            glob = re.compile(translate(segment))
+            for child in self.is_branch(nid):
+                if glob.match(self[child].tag):
+                    yield from self._match(child, rest)
+        else:
+            child = '/'.join([nid, segment])
+            if child in self._nodes:
+                yield from self._match(child, rest)
 
     def get_matches(self, topic, return_nodes=True):
-        pattern = topic.replace('-', '[^/]+') + '$'
-        nodes = self.filter_nodes(lambda x: re.match(pattern, x.identifier))
+        """Return the nodes (or their identifiers) matching a topic pattern which starts with the root segment."""
+        segments = topic.split('/')
+        root_segment = segments.pop(0)
+        if root_segment in ('+', '-', '#') or re.match(translate(root_segment), self.root):
+            nids = list(self._match(self.root, ['#'] if root_segment == '#' else segments))
+        else:
+            nids = []
         if return_nodes:
-            return list(nodes)
+            return [self[n] for n in nids]
         else:
-            return [n.identifier for n in nodes]
+            return nids
 
 
 class DeviceNode(TopicNode):
@@ -151,20 +250,35 @@ class DeviceTree(TopicTree):
     def from_store(cls, platform, rpc_caller):
         # TODO: Duplicate logic for external_platform check from VUIEndpoints to remove reference to it from here.
         kwargs = {'external_platform': platform} if 'VUIEndpoints' in rpc_caller.__repr__() else {}
-        devices = rpc_caller(CONFIGURATION_STORE, 'list_configs', 'platform.driver', **kwargs)
-        devices = devices if kwargs else devices.get(timeout=5)
-        devices = [d for d in devices if re.match('^devices/.*', d)]
+
+        def call(method, *args, **call_kwargs):
+            # TODO: If not AsyncResponse instead of if kwargs
+            result = rpc_caller(CONFIGURATION_STORE, method, PLATFORM_DRIVER, *args, **call_kwargs, **kwargs)
+            return result if kwargs else result.get(timeout=5)
+
+        def get_configs(config_names):
+            # Fetch all the configurations in one round trip, falling back to one call per configuration
+            # for platforms whose configuration store predates get_configs.
+            try:
+                return call('get_configs', config_names)
+            except MethodNotFound:
+                return {name: call('get_config', name, raw=False) for name in config_names}
+
+        devices = [d for d in call('list_configs') if re.match('^devices/.*', d)]
         device_tree = cls(devices)
+        dev_configs = get_configs(devices) if devices else {}
+        reg_cfg_names = {}
         for d in devices:
-            dev_config = rpc_caller(CONFIGURATION_STORE, 'get_config', 'platform.driver', d, raw=False, **kwargs)
-            # TODO: If not AsyncResponse instead of if kwargs
-            dev_config = dev_config if kwargs else dev_config.get(timeout=5)
-            reg_cfg_name = dev_config.pop('registry_config')[len('config://'):]
+            dev_config = dict(dev_configs[d])
+            reg_cfg_name = dev_config.pop('registry_config', None)
             device_tree.update_node(d, data=dev_config, segment_type='DEVICE')
-            registry_config = rpc_caller('config.store', 'get_config', 'platform.driver',
-                                         f'{reg_cfg_name}', raw=False, **kwargs)
-            registry_config = registry_config if kwargs else registry_config.get(timeout=5)
-            for pnt in registry_config:
+            if reg_cfg_name:
+                reg_cfg_names[d] = reg_cfg_name[len('config://'):]
+        # Devices frequently share a registry, each one is only fetched once.
+        registry_configs = get_configs(sorted(set(reg_cfg_names.values()))) if reg_cfg_names else {}
+        for d, reg_cfg_name in reg_cfg_names.items():
+            for pnt in registry_configs[reg_cfg_name]:
+                pnt = dict(pnt)
                 point_name = pnt.pop('Volttron Point Name')
                 n = device_tree.create_node(point_name, f"{d}/{point_name}", parent=d, data=pnt)
                 n.segment_type = 'POINT'
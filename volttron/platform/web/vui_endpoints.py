@@ -2,6 +2,7 @@ import functools
 import os
 import re
 import json
+import time
 from os.path import normpath, join
 from gevent.timeout import Timeout
 from collections import defaultdict
@@ -10,6 +11,8 @@ from typing import List, Union
 from werkzeug import Response
 from werkzeug.urls import url_decode
 
+from volttron.platform.agent.known_identities import PLATFORM_DRIVER
+from volttron.platform.messaging import topics
 from volttron.platform.vip.agent.subsystems.query import Query
 from volttron.platform.jsonrpc import MethodNotFound, RemoteError
 from volttron.platform.web.topic_tree import DeviceTree, TopicTree
@@ -19,6 +22,9 @@ from volttron.platform.web.vui_pubsub import VUIPubsubManager
 import logging
 _log = logging.getLogger(__name__)
 
+# Seconds a device tree is reused without a configuration store change notification.
+DEVICE_TREE_MAX_AGE = 300
+
 
 class OverrideError(Exception):
     """Error raised by driver when the user tries to set/revert point when global override is set."""
@@ -147,6 +153,11 @@ class VUIEndpoints:
         if self.active_routes['vui']['platforms']['pubsub']:
             self.pubsub_manager = VUIPubsubManager(self._agent)
 
+        # Device trees by platform, dropped when the platform driver's configuration store changes.
+        self._device_trees = {}
+        self._agent.vip.pubsub.subscribe('pubsub', topics.PLATFORM_CONFIG_STORE(identity=PLATFORM_DRIVER),
+                                         self._invalidate_device_trees, all_platforms=True)
+
     def get_routes(self):
         """
         Returns a list of tuples with the routes for the administration endpoints
@@ -613,8 +624,7 @@ class VUIEndpoints:
             tag_list = None
         # Prune device tree and get nodes matching topic:
         try:
-            # TODO: Should we be storing this tree to use for faster requests later? How to keep it updated?
-            device_tree = DeviceTree.from_store(platform, self._rpc).prune(topic, regex, tag_list)
+            device_tree = self._get_device_tree(platform).prune(topic, regex, tag_list)
             topic_nodes = device_tree.get_matches(f'devices/{topic}' if topic else 'devices')
             if not topic_nodes:
                 return Response(json.dumps({f'error': f'Device topic {topic} not found on platform: {platform}.'}),
@@ -861,7 +871,7 @@ class VUIEndpoints:
             return_values = self._to_bool(query_params.get('values', True))
 
             try:
-                if read_all or all([n.is_leaf() for n in topic_nodes]):
+                if read_all or all([n.is_leaf(historian_tree.identifier) for n in topic_nodes]):
                     # Either leaf values are explicitly requested, or all nodes are already points -- Return points:
                     ret_dict = defaultdict(dict)
 
@@ -1002,6 +1012,23 @@ class VUIEndpoints:
                   external_platform=platform)
         return None
 
+    def _get_device_tree(self, platform):
+        """Return the device tree of a platform, loading it from the configuration store if it is not cached.
+
+        Cached trees are replaced after DEVICE_TREE_MAX_AGE seconds in case change notifications from a remote
+        platform's configuration store do not reach this instance.
+        """
+        cached = self._device_trees.get(platform)
+        if cached is not None and time.monotonic() - cached[1] < DEVICE_TREE_MAX_AGE:
+            return cached[0]
+        device_tree = DeviceTree.from_store(platform, self._rpc)
+        self._device_trees[platform] = (device_tree, time.monotonic())
+        return device_tree
+
+    def _invalidate_device_trees(self, peer, sender, bus, topic, headers, message):
+        _log.debug('VUI: Platform driver configuration changed, dropping cached device trees.')
+        self._device_trees.clear()
+
     def _rpc(self, vip_identity, method, *args, external_platform=None, **kwargs):
         external_platform = {'external_platform': external_platform}\
             if external_platform != self.local_instance_name else {}
@@ -1,3 +1,4 @@
+import gevent
 import json
 from weakref import WeakValueDictionary
 from collections import defaultdict
@@ -8,10 +9,16 @@ import logging
 
 _log = logging.getLogger()
 
+# Minimum number of seconds between sends to a single websocket. Publishes arriving within the window are coalesced,
+# so only the latest message for each topic is sent.
+DEFAULT_MIN_SEND_INTERVAL = 0.25
+
 
 class VUIPubsubManager:
-    def __init__(self, agent):
+    def __init__(self, agent, min_send_interval=DEFAULT_MIN_SEND_INTERVAL):
         self._agent = agent
+        self.min_send_interval = min_send_interval
+        self.subscription_groups = {}  # One shared pubsub subscription per topic with open websockets.
         self.subscription_websockets = WeakValueDictionary() # Websockets for all topics with current subscriptions.
         self.publication_websockets = {}  # Websockets for all topics with current publication queue.
         self.user_websockets = defaultdict(dict)  # References to all websockets for each user access_token.
@@ -57,50 +64,59 @@ class VUIPubsubManager:
         return ws_app
 
     def client_opened(self, ws, topic, access_token):
-        _log.debug(f'VUIPubsubManager: Subscribing to {topic}')
-        self._agent.vip.pubsub.subscribe('pubsub', topic, ws.on_topic)
+        group = self.subscription_groups.get(topic)
+        if group is None:
+            _log.debug(f'VUIPubsubManager: Subscribing to {topic}')
+            group = self.subscription_groups[topic] = SubscriptionGroup(self._agent.vip.pubsub, topic)
+        ws.min_send_interval = self.min_send_interval
+        group.add(ws)
         self.user_websockets[access_token][topic] = ws
 
-        # if topic not in self.subscription_websockets:
-        #     err = f'Websocket opened for unintialized topic: {topic}'
-        #     _log.error(err)
-        #     ws.close(reason=err)
-        #     return
-
-        # TODO: Use this if we need to look over websockets connected to one subscription.
-        # if ws in  self.subscription_websockets[topic]:
-        #     _log.debug("IDENTITY,CLIENT: {} already in endpoint set".format(identity))
-        # else:
-        #     _log.debug("IDENTITY,CLIENT: {} added to endpoint set".format(identity))
-        #     self.subscription_websockets[endpoint].add((identity, ws))
-#
-# class SubscriptionGroup:
-#     def __init__(self, pubsub_interface, topic: str):
-#         self.topic = topic
-#         self.websockets = []
-#         self.pubsub = pubsub_interface
-#         self.pubsub.subscribe('pubsub', topic, self.on_publish)
-#
-#
-#     def add(self, ws: WebSocket):
-#         self.websockets.append(ws)
-#
-#     def on_publish(self, peer, sender, bus, topic, headers, message):
-#         for ws in self.websockets:
-#             if not ws.terminated:
-#                 try:
-#                     ws.send(message)
-#                 except Exception as e:
-#                     _log.warning(f'Error sending subscription data: {e}')
-#
-#     def remove(self, ):
-#         pass
+    def client_closed(self, ws, topic, access_token):
+        group = self.subscription_groups.get(topic)
+        if group is not None:
+            group.remove(ws)
+            if not group.websockets:
+                _log.debug(f'VUIPubsubManager: Unsubscribing from {topic}')
+                group.close()
+                del self.subscription_groups[topic]
+        if self.user_websockets[access_token].get(topic) is ws:
+            del self.user_websockets[access_token][topic]
+
+
+class SubscriptionGroup:
+    """A single pubsub subscription shared by every websocket open on a topic.
+
+    Each publish is serialized once and offered to every websocket in the group, which send it at their own pace.
+    """
+    def __init__(self, pubsub_interface, topic: str):
+        self.topic = topic
+        self.websockets = set()
+        self.pubsub = pubsub_interface
+        self.pubsub.subscribe('pubsub', topic, self.on_publish)
+
+    def add(self, ws: WebSocket):
+        self.websockets.add(ws)
+
+    def remove(self, ws: WebSocket):
+        self.websockets.discard(ws)
+
+    def close(self):
+        self.pubsub.unsubscribe('pubsub', self.topic, self.on_publish)
+
+    def on_publish(self, peer, sender, bus, topic, headers, message):
+        payload = json.dumps(message)
+        for ws in list(self.websockets):
+            ws.offer(topic, payload)
 
 
 class VUIWebSocket(WebSocket):
     def __init__(self, *args, **kwargs):
         super(VUIWebSocket, self).__init__(*args, **kwargs)
         _log = logging.getLogger(self.__class__.__name__)
+        self.min_send_interval = DEFAULT_MIN_SEND_INTERVAL
+        self._pending = {}  # Latest serialized message for each topic, waiting to be sent.
+        self._sender = None
 
     def _get_topic(self):
         from volttron.platform.web import get_bearer
@@ -126,18 +142,37 @@ class VUIWebSocket(WebSocket):
         pass
 
     def closed(self, code, reason="A client left the room without a proper explanation."):
-        # _log.info('Socket closed!')
-        # app = self.environ.pop('ws4py.app')
-        # identity, endpoint = self._get_identity_and_endpoint()
-        # app.client_closed(self, endpoint, identity, reason)
-        pass
+        _log.info('Socket closed')
+        self._pending.clear()
+        app = self.environ.get('ws4py.app')
+        if app is not None:
+            topic, access_token = self._get_topic()
+            app.client_closed(self, topic, access_token)
+
+    def offer(self, topic, payload):
+        """Queue a serialized message for sending, replacing any message for the same topic not yet sent.
+
+        Sending happens in a separate greenlet, so a slow client only falls behind (dropping intermediate messages)
+        and never blocks the pubsub callback.
+        """
+        if self.terminated:
+            return
+        self._pending[topic] = payload
+        if self._sender is None:
+            self._sender = gevent.spawn(self._send_pending)
+
+    def _send_pending(self):
+        try:
+            while self._pending and not self.terminated:
+                pending, self._pending = self._pending, {}
+                for payload in pending.values():
+                    self.send(payload)
+                if self.min_send_interval:
+                    gevent.sleep(self.min_send_interval)
+        except Exception as e:
+            _log.warning(f'Error sending subscription data: {e}')
+        finally:
+            self._sender = None
 
     def on_topic(self, peer, sender, bus, topic, headers, message):
-        _log.debug('VUIWebSocket: in _on_topic')
-        _log.debug(f'topic is: {topic}')
-        _log.debug(f'message is: {message}')
-        if not self.terminated:
-            try:
-                self.send(json.dumps(message))
-            except Exception as e:
-                _log.warning(f'Error sending subscription data: {e}')
+        self.offer(topic, json.dumps(message))
@@ -8,7 +8,8 @@ import pickle
 
 from volttron.platform import jsonapi
 
-from threading import Thread
+from threading import Condition, Event, Lock, Thread
+from collections import deque
 from queue import Queue
 from copy import deepcopy
 
@@ -130,6 +131,254 @@ class PersistentDict(dict):
         raise ValueError('File not in a supported format')
 
 
+class JournaledDict(dict):
+    """ Persistent dictionary backed by a snapshot file and an append-only journal.
+
+    The snapshot is a plain json file in the same format written by
+    PersistentDict so existing files are loaded transparently.  Changes are
+    recorded as set/delete/clear records appended to ``<filename>.journal``
+    so the cost of a write is proportional to the size of the changed value
+    rather than the size of the whole dictionary.
+
+    Records are written by a worker thread which drains every pending record
+    before calling fsync, batching the fsync cost of bursts of changes. Once
+    enough records accumulate the worker compacts the journal into a new
+    snapshot. On load the snapshot is read and the journal replayed; a
+    partially written trailing record left by a crash is discarded.
+
+    Only the dictionary mutation methods used by the configuration store are
+    journaled: item assignment and deletion, pop, clear and update.
+    """
+
+    # A deque guarded by a Condition rather than a Queue so the worker keeps
+    # working when the queue module has been monkey patched by gevent.
+    _event_queue = deque()
+    _event_condition = Condition()
+    _process_thread = None
+
+    # Minimum number of records written to the journal before it is compacted.
+    # The journal is also allowed to grow to the number of entries in the
+    # dictionary so that compaction cost is amortized over the writes.
+    compact_threshold = 1000
+
+    def __init__(self, filename, mode=None, *args, **kwds):
+        self.filename = filename
+        self.journal_filename = filename + '.journal'
+        self.mode = mode
+        self._lock = Lock()
+        self._pending = []
+        self._journal_records = 0
+        dict.__init__(self, *args, **kwds)
+
+        self._has_snapshot = os.access(filename, os.R_OK)
+        if self._has_snapshot:
+            with open(filename, 'r') as fileobj:
+                dict.update(self, jsonapi.load(fileobj))
+
+        if os.access(self.journal_filename, os.R_OK):
+            self._journal_records = self._replay()
+
+        if JournaledDict._process_thread is None:
+            JournaledDict._process_thread = Thread(target=JournaledDict._process_loop)
+            JournaledDict._process_thread.daemon = True  # Don't wait on thread to exit.
+            JournaledDict._process_thread.start()
+
+    def _replay(self):
+        """Apply the journal to the loaded snapshot. Returns the number of records applied."""
+        count = 0
+        valid_offset = 0
+        with open(self.journal_filename, 'rb') as fileobj:
+            for line in fileobj:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("Incomplete record")
+                    record = jsonapi.loadb(line)
+                    self._apply(record)
+                except Exception:
+                    _log.warning("Discarding incomplete record at offset {} of {}".format(valid_offset,
+                                                                                           self.journal_filename))
+                    break
+                valid_offset += len(line)
+                count += 1
+
+        if valid_offset != os.path.getsize(self.journal_filename):
+            with open(self.journal_filename, 'r+b') as fileobj:
+                fileobj.truncate(valid_offset)
+                fileobj.flush()
+                os.fsync(fileobj.fileno())
+        return count
+
+    def _apply(self, record):
+        op = record['op']
+        if op == 'set':
+            dict.__setitem__(self, record['key'], record['value'])
+        elif op == 'del':
+            dict.pop(self, record['key'], None)
+        elif op == 'clear':
+            dict.clear(self)
+        else:
+            raise ValueError('Unknown journal operation: ' + repr(op))
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._pending.append({'op': 'set', 'key': key, 'value': value})
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._pending.append({'op': 'del', 'key': key})
+
+    _marker = object()
+
+    def pop(self, key, default=_marker):
+        if key in self:
+            value = dict.pop(self, key)
+            self._pending.append({'op': 'del', 'key': key})
+            return value
+        if default is JournaledDict._marker:
+            raise KeyError(key)
+        return default
+
+    def clear(self):
+        dict.clear(self)
+        self._pending.append({'op': 'clear'})
+
+    def update(self, *args, **kwds):
+        for key, value in dict(*args, **kwds).items():
+            self[key] = value
+
+    def _take_work(self):
+        """Serialize the pending records, deciding whether this flush should compact the journal.
+
+        Serialization happens on the calling thread so the worker never reads
+        values that may still be modified by the caller. An empty snapshot
+        means the files should be removed.
+        """
+        records, self._pending = self._pending, []
+        self._journal_records += len(records)
+        if not self:
+            # Mirror PersistentDict: an empty store has no files on disk.
+            self._journal_records = 0
+            self._has_snapshot = False
+            return b'', b''
+        if self._journal_records > max(self.compact_threshold, len(self)) or not self._has_snapshot:
+            # Always write a snapshot first so the store file exists for anything looking for it.
+            self._journal_records = 0
+            self._has_snapshot = True
+            return b'', jsonapi.dumpb(self, separators=(',', ':'))
+        return b''.join(jsonapi.dumpb(record, separators=(',', ':')) + b'\n' for record in records), None
+
+    def sync(self):
+        """ Write pending changes to disk and wait for them to complete """
+        self._wait(*self._take_work())
+
+    def compact(self):
+        """ Fold the journal into a new snapshot and wait for it to complete """
+        self._pending = []
+        self._journal_records = 0
+        self._has_snapshot = bool(self)
+        self._wait(b'', jsonapi.dumpb(self, separators=(',', ':')) if self else b'')
+
+    def _wait(self, records, snapshot):
+        done = Event()
+        JournaledDict._put((self, records, snapshot, done))
+        done.wait()
+
+    def async_sync(self):
+        """Write pending changes to disk via the worker thread"""
+        records, snapshot = self._take_work()
+        if records or snapshot is not None:
+            JournaledDict._put((self, records, snapshot, None))
+
+    @staticmethod
+    def _put(item):
+        with JournaledDict._event_condition:
+            JournaledDict._event_queue.append(item)
+            JournaledDict._event_condition.notify()
+
+    @staticmethod
+    def _process_loop():
+        queue = JournaledDict._event_queue
+        while True:
+            with JournaledDict._event_condition:
+                while not queue:
+                    JournaledDict._event_condition.wait()
+                # Take everything pending so that a burst of changes costs one fsync per journal.
+                work = list(queue)
+                queue.clear()
+
+            journals = {}
+            for store, records, snapshot, done in work:
+                try:
+                    with store._lock:
+                        if snapshot is not None:
+                            _, fileobj = journals.pop(id(store), (None, None))
+                            if fileobj is not None:
+                                fileobj.close()
+                            store._write_snapshot(snapshot)
+                        elif records:
+                            _, fileobj = journals.get(id(store), (None, None))
+                            if fileobj is None:
+                                fileobj = open(store.journal_filename, 'ab')
+                                journals[id(store)] = (store, fileobj)
+                            fileobj.write(records)
+                except Exception as e:
+                    _log.error("Unable to sync to file {}: {}".format(store.filename, e))
+                if done is not None:
+                    JournaledDict._flush_journals(journals)
+                    done.set()
+
+            JournaledDict._flush_journals(journals)
+
+    @staticmethod
+    def _flush_journals(journals):
+        for store, fileobj in journals.values():
+            try:
+                with store._lock:
+                    fileobj.flush()
+                    os.fsync(fileobj.fileno())
+                    fileobj.close()
+                    if store.mode is not None:
+                        os.chmod(store.journal_filename, store.mode)
+            except Exception as e:
+                _log.error("Unable to sync to file {}: {}".format(store.journal_filename, e))
+        journals.clear()
+
+    def _write_snapshot(self, contents):
+        """Atomically replace the snapshot and start a new, empty journal."""
+        if not contents:
+            for filename in (self.filename, self.journal_filename):
+                try:
+                    os.remove(filename)
+                except OSError:
+                    pass
+            return
+
+        tempname = self.filename + '.tmp'
+        with open(tempname, 'wb') as fileobj:
+            fileobj.write(contents)
+            fileobj.flush()
+            os.fsync(fileobj.fileno())
+        os.replace(tempname, self.filename)  # atomic commit
+        if self.mode is not None:
+            os.chmod(self.filename, self.mode)
+        # Every record in the old journal is already reflected in the new
+        # snapshot and replaying it again yields the same state, so a crash
+        # before the journal is removed cannot lose or corrupt data.
+        try:
+            os.remove(self.journal_filename)
+        except OSError:
+            pass
+
+    def close(self):
+        self.compact()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 if __name__ == '__main__':
     import random
 
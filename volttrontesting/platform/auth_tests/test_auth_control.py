@@ -549,10 +549,12 @@ def _remove_known_host(platform, host):
 
 
 @pytest.fixture()
-def mock_auth_service():
+def mock_auth_service(tmp_path):
     AuthService.__bases__ = (AgentMock.imitate(Agent, Agent()), )
+    # The auth and protected topics files are created on disk, keep them out of the working directory.
     auth_service = AuthService(
-        auth_file=MagicMock(), protected_topics_file=MagicMock(), setup_mode=MagicMock(), aip=MagicMock())
+        auth_file=str(tmp_path / "auth.json"), protected_topics_file=str(tmp_path / "protected_topics.json"),
+        setup_mode=MagicMock(), aip=MagicMock())
     auth_service.authentication_server = ZMQServerAuthentication(auth_service=auth_service)
     auth_service.authorization_server = ZMQAuthorization(auth_service=auth_service)
     yield auth_service
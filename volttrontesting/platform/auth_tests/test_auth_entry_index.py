@@ -0,0 +1,60 @@
+import pytest
+
+from volttron.platform.auth.auth_entry import AuthEntry, AuthEntryIndex
+
+KEY1 = "A" * 43
+KEY2 = "B" * 43
+KEY3 = "C" * 43
+
+
+def _linear_match(entries, domain, address, mechanism, credentials):
+    for entry in entries:
+        if entry.match(domain, address, mechanism, credentials):
+            return entry
+    return None
+
+
+@pytest.fixture
+def entries():
+    entries = [AuthEntry(credentials=KEY1, user_id="exact1"),
+               AuthEntry(credentials=KEY2, user_id="exact2", address="/192\\.168\\..*/"),
+               AuthEntry(credentials=KEY3, user_id="exact3"),
+               AuthEntry(mechanism="PLAIN", credentials=["user", "admin"], user_id="plain_list"),
+               AuthEntry(mechanism="NULL", address="127.0.0.1", user_id="null"),
+               AuthEntry(credentials="/A+/", user_id="regex_a"),
+               AuthEntry(credentials="/.*/", domain="vip", user_id="regex_any")]
+    entries.sort()
+    return entries
+
+
+@pytest.mark.auth
+@pytest.mark.parametrize("domain, address, mechanism, credentials", [
+    ("vip", "10.0.0.1", "CURVE", [KEY1]),
+    ("vip", "192.168.1.2", "CURVE", [KEY2]),
+    ("vip", "10.0.0.1", "CURVE", [KEY2]),
+    ("vip", "10.0.0.1", "CURVE", [KEY3]),
+    ("vip", "10.0.0.1", "CURVE", ["D" * 43]),
+    ("other", "10.0.0.1", "CURVE", ["D" * 43]),
+    ("other", "10.0.0.1", "CURVE", ["A" * 10]),
+    ("vip", "127.0.0.1", "NULL", []),
+    ("vip", "127.0.0.2", "NULL", []),
+    ("vip", "10.0.0.1", "PLAIN", ["user", "password"]),
+    ("vip", "10.0.0.1", "PLAIN", ["guest", "password"]),
+    ("vip", "10.0.0.1", "PLAIN", [b"user", b"password"]),
+])
+def test_index_matches_linear_scan(entries, domain, address, mechanism, credentials):
+    index = AuthEntryIndex(entries)
+    assert index.match(domain, address, mechanism, credentials) is \
+        _linear_match(entries, domain, address, mechanism, credentials)
+
+
+@pytest.mark.auth
+def test_index_update(entries):
+    index = AuthEntryIndex(entries)
+    assert index.match("vip", "10.0.0.1", "CURVE", [KEY1]).user_id == "exact1"
+
+    index.update([entry for entry in entries if entry.user_id != "exact1"])
+    assert index.match("vip", "10.0.0.1", "CURVE", [KEY1]).user_id == "regex_a"
+
+    index.update([])
+    assert index.match("vip", "10.0.0.1", "CURVE", [KEY1]) is None
@@ -138,6 +138,23 @@ def test_poly_line_no_intersection():
     assert len(intersection) == 2
 
 
+@pytest.mark.market
+@pytest.mark.parametrize('demand_points, supply_points', [
+    ([(0, 10), (5, 5), (10, 0)], [(0, 0), (5, 5), (10, 10)]),
+    ([(0, 10), (4, 6), (4, 4), (10, 0)], [(0, 0), (2, 5), (8, 5), (10, 10)]),
+    ([(0, 10), (3, 5), (6, 5), (10, 0)], [(0, 0), (3, 5), (6, 5), (10, 10)]),
+    ([(0, 10), (10, 8)], [(0, 0), (10, 2)]),
+])
+def test_poly_line_sweep_matches_scan(demand_points, supply_points):
+    demand = PolyLine()
+    demand.extend([Point(*p) for p in demand_points])
+    supply = PolyLine()
+    supply.extend([Point(*p) for p in supply_points])
+    for pl_1, pl_2 in ((demand, supply), (supply, demand)):
+        assert PolyLine.sweep_intersects(pl_1.points, pl_2.points) == \
+            PolyLine.scan_intersects(pl_1.points, pl_2.points)
+
+
 def create_supply_curve():
     supply_curve = PolyLine()
     price = 0
@@ -54,6 +54,25 @@ def test_poly_line_combine_demand():
     assert combined_curves.max_y() == 1000
 
 
+@pytest.mark.market
+def test_poly_line_combine_matches_line_x():
+    supply_curve = create_supply_curve()
+    demand_curve = create_demand_curve()
+    combined_curves = PolyLineFactory.combine([supply_curve, demand_curve], 11)
+    assert len(combined_curves.points) == 11
+    for point in combined_curves.points:
+        assert point.x == pytest.approx(supply_curve.x(point.y) + demand_curve.x(point.y))
+
+
+@pytest.mark.market
+def test_poly_line_combine_withoutincrement():
+    supply_curve = create_supply_curve()
+    stepped_curve = PolyLineFactory.fromTupples([(0, 0), (100, 500), (300, 1000)])
+    combined_curves = PolyLineFactory.combine_withoutincrement([supply_curve, stepped_curve])
+    # The composite has a point at every breakpoint of either curve, highest price first.
+    assert combined_curves.tuppleize() == [(1300, 1000), (600, 500), (0, 0)]
+
+
 @pytest.mark.market
 def test_poly_line_from_tupples():
     demand_curve = create_demand_curve()
@@ -7,7 +7,8 @@ import mock
 from volttron.platform.agent import utils
 from volttron.platform.messaging import headers as header_mod
 from volttron.platform.vip.agent import Agent
-from volttron.platform.agent.base_historian import BaseHistorianAgent, BaseQueryHistorianAgent, BackupDatabase
+from volttron.platform.agent.base_historian import BaseHistorianAgent, BaseQueryHistorianAgent, BackupDatabase, \
+    INSERT_ENCODINGS, encode_insert_records
 from volttron.platform.vip.agent.results import AsyncResult
 # need import so that we can mock it.
 from volttron.platform.vip.agent.subsystems.query import Query
@@ -130,3 +131,29 @@ def test_cache_enable():
         # give a small amount of time so that the queue can get empty
         assert agent.has_published_items()
         assert len(agent.get_publish_list()) == 2
+
+
+def test_insert_encoded_reports_failed_records():
+    agent = BaseHistorianAgent()
+    captured = []
+
+    def capture(peer, sender, bus, topic, headers, message):
+        if message == "bad":
+            raise ValueError("bad record")
+        captured.append(message)
+
+    agent._capture_record_data = capture
+    records = [{"topic": "record/a", "headers": {}, "message": 1},
+               {"topic": "record/b", "headers": {}, "message": "bad"},
+               {"topic": "unknown/c", "headers": {}, "message": 3},
+               {"topic": "record/d", "headers": {}, "message": 4}]
+
+    assert agent.insert(records) == [1]
+    assert captured == [1, 4]
+
+    captured.clear()
+    assert "zlib" in agent.get_insert_encodings()
+    for encoding in INSERT_ENCODINGS:
+        assert agent.insert_encoded(encoding, encode_insert_records(records, encoding)) == [1]
+    assert captured == [1, 4] * len(INSERT_ENCODINGS)
+
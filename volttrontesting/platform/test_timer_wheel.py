@@ -0,0 +1,99 @@
+import heapq
+import random
+from datetime import timedelta
+
+import gevent
+import pytest
+
+from volttron.platform.agent.utils import get_aware_utc_now
+from volttron.platform.vip.agent.core import BasicCore, TimerWheel
+
+
+@pytest.mark.agent
+def test_wheel_matches_heap_order():
+    start = 1000000.0
+    wheel = TimerWheel(resolution=0.01, slots=16, levels=3, now=start)
+    heap = []
+    rng = random.Random(7)
+    canceled = set()
+    entries = {}
+    for i in range(2000):
+        # Spread deadlines over every level and the overflow bucket.
+        deadline = start + rng.choice([0.5, 5.0, 60.0, 1000.0]) * rng.random()
+        entries[i] = wheel.add(deadline, i)
+        heapq.heappush(heap, (deadline, i))
+    for i in rng.sample(range(2000), 500):
+        entries[i].cancel()
+        entries[i].cancel()
+        canceled.add(i)
+    assert len(wheel) == 1500
+
+    fired = []
+    now = start
+    while len(wheel):
+        now += rng.random() * 3
+        due = wheel.expire(now)
+        expected = []
+        while heap and heap[0][0] <= now - wheel.resolution:
+            deadline, i = heapq.heappop(heap)
+            if i not in canceled:
+                expected.append(i)
+        # Deadlines within the last tick may or may not be due yet.
+        assert due[:len(expected)] == expected
+        heap = [item for item in heap if item[1] not in due]
+        heapq.heapify(heap)
+        fired.extend(due)
+    assert sorted(fired) == sorted(set(range(2000)) - canceled)
+
+
+@pytest.mark.agent
+def test_cancel_removes_scheduled_events():
+    core = BasicCore(None)
+    calls = []
+    events = [core.schedule(get_aware_utc_now() + timedelta(hours=1), calls.append, i) for i in range(100)]
+    assert len(core._schedule) == 100
+    for event in events:
+        event.cancel()
+    assert len(core._schedule) == 0
+    assert not calls
+
+
+@pytest.mark.agent
+def test_scheduled_callbacks_run():
+    core = BasicCore(None)
+    calls = []
+    greenlet = gevent.spawn(core.run)
+    gevent.sleep(0.01)
+    now = get_aware_utc_now()
+    core.schedule(now + timedelta(seconds=0.05), calls.append, "once")
+    canceled = core.schedule(now + timedelta(seconds=0.05), calls.append, "canceled")
+    repeated = core.schedule(iter([now + timedelta(seconds=0.02 * i) for i in range(1, 4)]),
+                             calls.append, "repeated")
+    canceled.cancel()
+    gevent.sleep(0.2)
+    assert calls.count("once") == 1
+    assert calls.count("repeated") == 3
+    assert "canceled" not in calls
+    assert repeated.finished
+    assert len(core._schedule) == 0
+    core.stop()
+    greenlet.join(1)
+
+
+@pytest.mark.agent
+def test_timeout_after_cancel_and_reuse():
+    wheel = TimerWheel(resolution=1, slots=4, levels=2, now=0)
+    first = wheel.add(2, 'first')
+    wheel.add(9, 'second')
+    assert wheel.timeout(0) == 2
+    first.cancel()
+    # The canceled bucket is skipped, the level 1 bucket holding tick 9 is processed at tick 8.
+    assert wheel.timeout(0) == 8
+
+    assert wheel.expire(5) == []
+    # Slot 2 of level 0 is reused for tick 6 once tick 2 has passed.
+    wheel.add(6, 'third')
+    assert wheel.timeout(5) == 1
+    assert wheel.expire(6) == ['third']
+    assert wheel.expire(9) == ['second']
+    assert wheel.timeout(9) is None
@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+from volttron.platform import jsonapi
+from volttron.platform.vip.router import BaseRouter, TRACE_PREFIX
+from volttron.platform.vip.tracking import Tracker, parse_trace_header, trace_header
+
+
+class _Socket(object):
+    identity = b'router'
+
+    def __init__(self):
+        self.sent = []
+
+    def send_multipart(self, frames, flags=0, copy=True):
+        self.sent.append([bytes(frame) for frame in frames])
+
+
+class _TracingRouter(BaseRouter):
+
+    def __init__(self, tracker):
+        super(_TracingRouter, self).__init__(service_notifier=None)
+        self.socket = _Socket()
+        self._tracker = tracker
+
+    def issue(self, topic, frames, extra=None):
+        self._tracker.hit(topic, frames, extra)
+
+
+@pytest.mark.control
+def test_trace_header():
+    assert trace_header(0) is None
+    header = trace_header(1)
+    assert header.startswith(TRACE_PREFIX)
+    assert parse_trace_header(header) <= time.monotonic()
+    assert parse_trace_header('') is None
+    assert parse_trace_header('vip.agent') is None
+    assert parse_trace_header(TRACE_PREFIX + 'bad') is None
+
+
+@pytest.mark.control
+def test_router_records_traced_latency():
+    tracker = Tracker(sample_rate=1)
+    tracker.enable()
+    router = _TracingRouter(tracker)
+    router._peers.update(['sender', 'receiver'])
+
+    sent = time.monotonic() - 0.01
+    router.route(['sender', 'receiver', 'VIP1', TRACE_PREFIX + repr(sent), '1', 'RPC', 'request'])
+    router.route(['sender', 'receiver', 'VIP1', '', '2', 'RPC', 'request'])
+
+    # The trace header is not forwarded to the receiver.
+    assert [frames[3] for frames in router.socket.sent] == [b'sender', b'sender']
+
+    stats = jsonapi.loads(jsonapi.dumps(tracker.get_stats()))
+    assert stats['incoming']['peer'] == {'sender': 2}
+    assert stats['outgoing']['peer'] == {'receiver': 2}
+    [latency] = stats['latency']
+    assert (latency['subsystem'], latency['sender'], latency['receiver']) == ('RPC', 'sender', 'receiver')
+    assert latency['route']['count'] == latency['delivery']['count'] == 1
+    assert latency['delivery']['p99'] >= 0.01
@@ -176,8 +176,43 @@ def test_prune_final_segments():
     included = ['root', 'root/Campus', 'root/Campus/Building1', 'root/Campus/Building1/Fake1',
                 'root/Campus/Building1/Fake1/EKG']
     assert [n.identifier for n in pruned.all_nodes()] == included
-    
-    
+
+
+@pytest.mark.parametrize('pattern, expected',
+                         [('root/Campus/+/Fake1/SampleBool1', ['root/Campus/Building1/Fake1/SampleBool1',
+                                                              'root/Campus/Building2/Fake1/SampleBool1',
+                                                              'root/Campus/Building3/Fake1/SampleBool1']),
+                          ('root/Campus/Building[12]/Fake1/Sample*', ['root/Campus/Building1/Fake1/SampleWritableFloat1',
+                                                                      'root/Campus/Building1/Fake1/SampleBool1',
+                                                                      'root/Campus/Building2/Fake1/SampleWritableFloat1',
+                                                                      'root/Campus/Building2/Fake1/SampleBool1']),
+                          ('root/Campus/Building3/#', ['root/Campus/Building3', 'root/Campus/Building3/Fake1',
+                                                       'root/Campus/Building3/Fake1/SampleWritableFloat1',
+                                                       'root/Campus/Building3/Fake1/SampleBool1']),
+                          ('root/Campus/Building4/#', []),
+                          ('other/Campus', [])])
+def test_get_matches_wildcards(pattern, expected):
+    t = TopicTree(TOPIC_LIST)
+    assert t.get_matches(pattern, return_nodes=False) == expected
+
+
+def test_prune_returns_view():
+    t = TopicTree(TOPIC_LIST)
+    t.update_node('root/Campus/Building1/Fake1/SampleBool1', data={'foo': 'bar'})
+    pruned = t.prune(topic_pattern='Campus/+/Fake1/SampleBool1')
+    assert pruned.get_node('root/Campus/Building1/Fake1/SampleBool1') is \
+        t.get_node('root/Campus/Building1/Fake1/SampleBool1')
+    assert [n.identifier for n in pruned.leaves()] == ['root/Campus/Building1/Fake1/SampleBool1',
+                                                        'root/Campus/Building2/Fake1/SampleBool1',
+                                                        'root/Campus/Building3/Fake1/SampleBool1']
+    # The source tree is unchanged.
+    assert len(t.children('root/Campus/Building1/Fake1')) == 2
+    with pytest.raises(TypeError):
+        pruned.create_node('foo', 'root/foo', parent='root')
+    with pytest.raises(TypeError):
+        pruned.update_node('root/Campus', data={})
+
+
 def test_device_node_init():
     n = DeviceNode()
     assert _is_valid_uuid(n.tag)
@@ -241,7 +276,10 @@ def test_devices(nid, expected):
 
 
 def _mock_rpc_caller(peer, method, agent, file_name=None, raw=False, external_platform=None):
-    if method == 'list_configs':
+    if method == 'get_configs':
+        _mock_rpc_caller.calls.append(method)
+        return {name: _mock_rpc_caller(peer, 'get_config', agent, name) for name in file_name}
+    elif method == 'list_configs':
         return ['config', 'devices/Campus/Building1/Fake1', 'devices/Campus/Building2/Fake1',
                 'devices/Campus/Building3/Fake1', 'registry_configs/fake.csv']
     elif method == 'get_config' and '.csv' in file_name:
@@ -261,10 +299,14 @@ def _mock_rpc_caller(peer, method, agent, file_name=None, raw=False, external_pl
 
 
 _mock_rpc_caller.__repr__ = lambda: 'VUIEndpoints'
+_mock_rpc_caller.calls = []
 
 
 def test_from_store():
+    _mock_rpc_caller.calls.clear()
     t = DeviceTree.from_store('my_instance_name', _mock_rpc_caller)
+    # One bulk call for the device configurations and one for the shared registry.
+    assert _mock_rpc_caller.calls == ['get_configs', 'get_configs']
     assert len(t) == 14
     assert len(t.leaves()) == 6
     assert all([isinstance(n, DeviceNode) for n in t.all_nodes()])
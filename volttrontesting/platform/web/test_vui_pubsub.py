@@ -1,3 +1,32 @@
+import gevent
+
+from volttron.platform.web.vui_pubsub import VUIPubsubManager, VUIWebSocket
+
+
+class FakePubSub:
+    def __init__(self):
+        self.subscriptions = []
+
+    def subscribe(self, peer, prefix, callback):
+        self.subscriptions.append((prefix, callback))
+
+    def unsubscribe(self, peer, prefix, callback):
+        self.subscriptions.remove((prefix, callback))
+
+
+class FakeAgent:
+    def __init__(self):
+        self.vip = type('vip', (), {'pubsub': FakePubSub()})()
+
+
+class FakeSocket:
+    def __init__(self):
+        self.offered = []
+
+    def offer(self, topic, payload):
+        self.offered.append((topic, payload))
+
+
 def test_vui_pubsub_manager_init():
     # TODO: write_test
     pass
@@ -9,8 +38,31 @@ def test_create_websocket():
 
 
 def test_client_opened():
-    # TODO: write_test
-    pass
+    agent = FakeAgent()
+    manager = VUIPubsubManager(agent)
+    ws1, ws2 = FakeSocket(), FakeSocket()
+    manager.client_opened(ws1, 'devices/Campus', 'token1')
+    manager.client_opened(ws2, 'devices/Campus', 'token2')
+    # Both websockets share one subscription and each publish is serialized once.
+    assert len(agent.vip.pubsub.subscriptions) == 1
+    prefix, callback = agent.vip.pubsub.subscriptions[0]
+    callback('pubsub', 'sender', '', 'devices/Campus/all', {}, [{'a': 1}, {}])
+    assert ws1.offered == ws2.offered == [('devices/Campus/all', '[{"a": 1}, {}]')]
+    assert manager.user_websockets['token2']['devices/Campus'] is ws2
+
+
+def test_client_closed():
+    agent = FakeAgent()
+    manager = VUIPubsubManager(agent)
+    ws1, ws2 = FakeSocket(), FakeSocket()
+    manager.client_opened(ws1, 'devices/Campus', 'token1')
+    manager.client_opened(ws2, 'devices/Campus', 'token2')
+    manager.client_closed(ws1, 'devices/Campus', 'token1')
+    assert len(agent.vip.pubsub.subscriptions) == 1
+    assert 'devices/Campus' not in manager.user_websockets['token1']
+    manager.client_closed(ws2, 'devices/Campus', 'token2')
+    assert agent.vip.pubsub.subscriptions == []
+    assert manager.subscription_groups == {}
 
 
 def test_close_socket():
@@ -49,8 +101,19 @@ def test_closed():
 
 
 def test_on_topic():
-    # TODO: write_test
-    pass
+    ws = VUIWebSocket.__new__(VUIWebSocket)
+    ws.client_terminated = ws.server_terminated = False
+    ws.min_send_interval = 0
+    ws._pending = {}
+    ws._sender = None
+    sent = []
+    ws.send = sent.append
+    ws.on_topic('pubsub', 'sender', '', 'devices/Campus/Fake1/all', {}, 1)
+    ws.on_topic('pubsub', 'sender', '', 'devices/Campus/Fake2/all', {}, 2)
+    ws.on_topic('pubsub', 'sender', '', 'devices/Campus/Fake1/all', {}, 3)
+    gevent.sleep(0)
+    # Only the latest message for each topic is sent.
+    assert sent == ['3', '2']
 
 
 def test_opened():
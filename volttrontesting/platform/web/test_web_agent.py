@@ -5,6 +5,7 @@ from unittest.mock import MagicMock
 
 import pytest
 
+from volttron.platform import jsonapi
 from volttron.platform.vip.agent import Agent
 from volttron.platform.web import PlatformWebService
 from volttrontesting.utils.utils import AgentMock
@@ -77,3 +78,23 @@ def test_register_routes(mock_platformweb_service):
 
     finally:
         shutil.rmtree(str(Path(html_root).parent), ignore_errors=True)
+
+
+def test_jsonrpc_batch_routed(mock_platformweb_service):
+    pws = mock_platformweb_service
+    pws.endpoints['/vc/jsonrpc'] = ('foo', 'jsonrpc')
+
+    def route_callback(peer, method, env, data):
+        result = MagicMock()
+        result.get.return_value = {'jsonrpc': '2.0', 'id': data['id'], 'result': data['method']}
+        return result
+    pws.vip.rpc.call.side_effect = route_callback
+
+    batch = [{'jsonrpc': '2.0', 'id': i, 'method': f'method{i}', 'params': {}} for i in range(25)]
+    start_response = MagicMock()
+    data = pws.app_routing(get_test_web_env('/vc/jsonrpc', input_data=jsonapi.dumpb(batch), method='POST',
+                                            CONTENT_TYPE='application/json'), start_response)
+    # All of the calls are answered, in order, in one response.
+    assert jsonapi.loadb(b''.join(data)) == [{'jsonrpc': '2.0', 'id': i, 'result': f'method{i}'} for i in range(25)]
+    assert pws.vip.rpc.call.call_count == 25
+    assert "200 OK" in start_response.call_args[0]
@@ -28,6 +28,7 @@ Pytest test cases for testing actuator agent using rpc calls.
 import gevent
 import pytest
 from volttron.platform.vip.agent import Agent
+from volttron.platform.vip.agent.subsystems.configstore import _LazyConfig
 from volttron.platform.agent.known_identities import CONFIGURATION_STORE
 from volttron.platform import jsonrpc
 
@@ -179,6 +180,74 @@ def test_delete_config(default_config_test_agent):
     assert second == ("config", "DELETE", None)
 
 
+@pytest.mark.config_store
+def test_set_configs(default_config_test_agent):
+    configs = [{"config_name": "config", "raw_contents": """{"value":1}""", "config_type": "json"},
+               {"config_name": "registry.csv", "raw_contents": "value\n1", "config_type": "csv"},
+               {"config_name": "device", "raw_contents": """{"registry":"config://registry.csv"}""",
+                "config_type": "json"}]
+    default_config_test_agent.vip.rpc.call(CONFIGURATION_STORE, 'set_configs',
+                                           "config_test_agent", configs).get()
+
+    results = default_config_test_agent.callback_results
+    assert len(results) == 3
+    assert results[0] == ("config", "NEW", {"value": 1})
+    assert ("registry.csv", "NEW", [{"value": "1"}]) in results
+    assert ("device", "NEW", {"registry": [{"value": "1"}]}) in results
+
+    configs = [{"config_name": "registry.csv", "raw_contents": "value\n2", "config_type": "csv"},
+               {"config_name": "config", "raw_contents": """{"value":2}""", "config_type": "json"}]
+    default_config_test_agent.vip.rpc.call(CONFIGURATION_STORE, 'set_configs',
+                                           "config_test_agent", configs).get()
+
+    # Each affected configuration triggers its callback once for the batch.
+    assert len(results) == 6
+    assert results[3] == ("config", "UPDATE", {"value": 2})
+    assert ("registry.csv", "UPDATE", [{"value": "2"}]) in results[4:]
+    assert ("device", "UPDATE", {"registry": [{"value": "2"}]}) in results[4:]
+
+
+@pytest.mark.config_store
+def test_set_configs_invalid(default_config_test_agent):
+    configs = [{"config_name": "config", "raw_contents": """{"value":1}""", "config_type": "json"},
+               {"config_name": "bad", "raw_contents": "not json", "config_type": "json"}]
+    with pytest.raises(jsonrpc.RemoteError):
+        default_config_test_agent.vip.rpc.call(CONFIGURATION_STORE, 'set_configs',
+                                               "config_test_agent", configs).get()
+
+    assert default_config_test_agent.callback_results == []
+    assert default_config_test_agent.vip.rpc.call(CONFIGURATION_STORE, 'list_configs',
+                                                  "config_test_agent").get() == []
+
+
+@pytest.mark.config_store
+def test_delete_configs(default_config_test_agent):
+    configs = [{"config_name": name, "raw_contents": """{"value":1}""", "config_type": "json"}
+               for name in ("config", "first", "second")]
+    default_config_test_agent.vip.rpc.call(CONFIGURATION_STORE, 'set_configs',
+                                           "config_test_agent", configs).get()
+
+    results = default_config_test_agent.callback_results
+    assert len(results) == 3
+
+    default_config_test_agent.vip.rpc.call(CONFIGURATION_STORE, 'delete_configs',
+                                           "config_test_agent", ["first", "second"]).get()
+    assert len(results) == 5
+    assert set(results[3:]) == {("first", "DELETE", None), ("second", "DELETE", None)}
+    assert default_config_test_agent.vip.rpc.call(CONFIGURATION_STORE, 'list_configs',
+                                                  "config_test_agent").get() == ["config"]
+
+
+@pytest.mark.config_store
+def test_set_and_delete_configs_empty(default_config_test_agent):
+    default_config_test_agent.vip.rpc.call(CONFIGURATION_STORE, 'set_configs', "config_test_agent", []).get()
+    default_config_test_agent.vip.rpc.call(CONFIGURATION_STORE, 'delete_configs', "config_test_agent", []).get()
+
+    assert default_config_test_agent.callback_results == []
+    assert default_config_test_agent.vip.rpc.call(CONFIGURATION_STORE, 'list_configs',
+                                                  "config_test_agent").get() == []
+
+
 @pytest.mark.config_store
 def test_manage_delete_config(default_config_test_agent):
     json_config = """{"value":1}"""
@@ -580,6 +649,56 @@ def test_agent_sub_options(request, volttron_instance):
     assert delete_result == ("delete/config", "DELETE", None)
 
 
+@pytest.mark.config_store
+def test_agent_lazy_loading(request, volttron_instance, config_test_agent):
+
+    lazy_agent = None
+
+    def cleanup():
+        config_test_agent.vip.rpc.call(CONFIGURATION_STORE, 'delete_store', 'test_lazy_agent').get()
+        if lazy_agent:
+            lazy_agent.core.stop()
+
+    request.addfinalizer(cleanup)
+
+    registry = "Point Name,Units\nPoint1,F\n"
+    configs = [{"config_name": "registry_a.csv", "raw_contents": registry, "config_type": "csv"},
+               {"config_name": "registry_b.csv", "raw_contents": registry, "config_type": "csv"},
+               {"config_name": "devices/one", "raw_contents": '{"registry_config": "config://registry_a.csv"}',
+                "config_type": "json"},
+               {"config_name": "devices/two", "raw_contents": '{"registry_config": "config://registry_b.csv"}',
+                "config_type": "json"},
+               {"config_name": "unused", "raw_contents": '{"value": 1}', "config_type": "json"}]
+    config_test_agent.vip.rpc.call(CONFIGURATION_STORE, 'set_configs', "test_lazy_agent", configs).get()
+
+    class test_lazy_agent(_config_test_agent):
+        def __init__(self, **kwargs):
+            super(test_lazy_agent, self).__init__(**kwargs)
+            self.vip.config.enable_lazy_loading()
+            self.setup_callback(actions="NEW", pattern="devices/*")
+
+    lazy_agent = volttron_instance.build_agent(identity='test_lazy_agent',
+                                               agent_class=test_lazy_agent,
+                                               enable_store=True)
+
+    # Give the agent a chance to process it's configurations.
+    gevent.sleep(1.0)
+
+    expected_registry = [{"Point Name": "Point1", "Units": "F"}]
+    results = sorted(lazy_agent.callback_results)
+    assert results == [("devices/one", "NEW", {"registry_config": expected_registry}),
+                       ("devices/two", "NEW", {"registry_config": expected_registry})]
+
+    # Identical registries share one parsed copy and unused configurations are not retrieved.
+    agent_store = lazy_agent.vip.config._store
+    assert agent_store["registry_a.csv"] is agent_store["registry_b.csv"]
+    assert isinstance(agent_store["unused"], _LazyConfig)
+
+    assert lazy_agent.vip.config.list() == ["devices/one", "devices/two", "registry_a.csv", "registry_b.csv",
+                                            "unused"]
+    assert lazy_agent.vip.config.get("unused") == {"value": 1}
+
+
 @pytest.mark.config_store
 def test_config_store_security(volttron_instance, default_config_test_agent):
     try:
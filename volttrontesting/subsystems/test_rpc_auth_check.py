@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import pytest
+
+from volttron.platform.jsonrpc import Error
+from volttron.platform.vip.agent.subsystems.rpc import RPC
+
+
+def get_point(point, value=None):
+    return point, value
+
+
+@pytest.fixture
+def auth_check():
+    capabilities = {"regex_user": {"read": {"point": "/dev.*/"}},
+                    "value_user": {"read": {"point": "dev1"}},
+                    "any_user": {"read": None},
+                    "bad_user": {"read": {"missing": 1}}}
+    rpc = RPC.__new__(RPC)
+    rpc.context = SimpleNamespace(vip_message=SimpleNamespace(user=None))
+    rpc._message_bus = "zmq"
+    rpc._owner = SimpleNamespace(vip=SimpleNamespace(auth=SimpleNamespace(
+        get_capabilities=lambda user: capabilities.get(user, []))))
+    checked = rpc._add_auth_check(get_point, {"read"})
+
+    def call(user, *args, **kwargs):
+        rpc.context.vip_message.user = user
+        return checked(*args, **kwargs)
+
+    call.capabilities = capabilities
+    return call
+
+
+@pytest.mark.rpc
+def test_parameter_restrictions(auth_check):
+    assert auth_check("regex_user", "dev2") == ("dev2", None)
+    assert auth_check("regex_user", point="dev2", value=1) == ("dev2", 1)
+    assert auth_check("value_user", "dev1") == ("dev1", None)
+    assert auth_check("any_user", "other") == ("other", None)
+
+    with pytest.raises(Error, match="matching pattern"):
+        auth_check("regex_user", "other")
+    with pytest.raises(Error, match="only with point=dev1"):
+        auth_check("value_user", point="dev2")
+    with pytest.raises(Error, match="does not have a parameter missing"):
+        auth_check("bad_user", "dev1")
+    with pytest.raises(Error, match="requires capabilities"):
+        auth_check("unknown_user", "dev1")
+    with pytest.raises(TypeError):
+        auth_check("regex_user")
+
+
+@pytest.mark.rpc
+def test_capability_update_recompiles(auth_check):
+    assert auth_check("regex_user", "dev1") == ("dev1", None)
+
+    # An auth.update push replaces the capabilities of the user.
+    auth_check.capabilities["regex_user"] = {"read": {"point": "other"}}
+    assert auth_check("regex_user", "other") == ("other", None)
+    with pytest.raises(Error):
+        auth_check("regex_user", "dev1")
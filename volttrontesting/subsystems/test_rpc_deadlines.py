@@ -0,0 +1,44 @@
+import time
+
+import gevent
+import pytest
+from gevent.event import AsyncResult
+
+from volttron.platform.vip.agent.results import DeadlineWheel
+from volttron.platform.vip.agent.subsystems.rpc import RPC
+
+
+class _Message(object):
+    def __init__(self, args):
+        self.args = args
+        self.peer = "peer"
+
+
+@pytest.mark.rpc
+def test_deadline_wheel_expires_outstanding_results():
+    expired = []
+    wheel = DeadlineWheel(expired.append, resolution=0.01)
+    late = AsyncResult()
+    done = AsyncResult()
+    wheel.add(late, time.time() + 0.05)
+    wheel.add(done, time.time() + 0.05)
+    done.set(1)
+    assert len(wheel) == 2
+
+    gevent.sleep(0.2)
+    assert expired == [late]
+    assert len(wheel) == 0
+
+
+@pytest.mark.rpc
+def test_expired_requests_are_dropped():
+    past = time.time() - 1
+    future = time.time() + 60
+    message = _Message([{"method": "a", "id": 1, "deadline": past},
+                        {"method": "b", "id": 2, "deadline": future},
+                        {"method": "c", "id": 3},
+                        {"result": 4, "id": 4},
+                        [{"method": "d", "deadline": past}, {"method": "e"}]])
+    RPC._drop_expired_requests(message)
+    assert [request["id"] for request in message.args[:3]] == [2, 3, 4]
+    assert message.args[3] == [{"method": "e"}]
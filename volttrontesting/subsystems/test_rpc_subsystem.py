@@ -49,3 +49,29 @@ def test_method_inspection(volttron_instance):
     result = new_agent2.vip.rpc.call('test_inspect1', 'test_method.inspect').get()
 
     assert result == test_output
+
+
+@pytest.mark.rpc
+def test_call_many(volttron_instance):
+    """ Tests concurrent calls with ordered results, errors and an overall deadline.
+
+    :param volttron_instance:
+    :return:
+    """
+    new_agent1 = volttron_instance.build_agent(identity='test_call_many1', agent_class=_ExporterTestAgent)
+    new_agent2 = volttron_instance.build_agent(identity='test_call_many2')
+
+    calls = [('test_call_many1', 'test_method', (i, 'value'), {'param4': 1.0}) for i in range(5)]
+    calls.append(('test_call_many1', 'missing_method'))
+    calls.append(('test_call_many_unknown', 'test_method', (1, 'value')))
+
+    results = new_agent2.vip.rpc.call_many(calls, concurrency=3, timeout=10)
+
+    assert len(results) == len(calls)
+    for i in range(5):
+        assert results[i]['param1'] == i
+    assert isinstance(results[5], Exception)
+    assert isinstance(results[6], Exception)
+
+    new_agent1.core.stop()
+    new_agent2.core.stop()
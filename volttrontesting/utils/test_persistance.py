@@ -0,0 +1,83 @@
+"""
+Test cases for the journaled configuration store backend
+"""
+import os
+
+from volttron.platform import jsonapi
+from volttron.utils.persistance import JournaledDict
+
+
+def _config(data):
+    return {"type": "raw", "modified": None, "data": data}
+
+
+def test_journal_replay(tmp_path):
+    filename = str(tmp_path / "agent.store")
+    store = JournaledDict(filename)
+    store["config"] = _config("first")
+    store.async_sync()
+    store["other"] = _config("other")
+    store["config"] = _config("second")
+    store.pop("other")
+    store.sync()
+
+    # The first write creates the snapshot, later writes only append to the journal.
+    with open(filename) as f:
+        assert jsonapi.load(f) == {"config": _config("first")}
+    assert os.path.isfile(filename + ".journal")
+
+    reloaded = JournaledDict(filename)
+    assert dict(reloaded) == {"config": _config("second")}
+
+
+def test_journal_discards_partial_record(tmp_path):
+    filename = str(tmp_path / "agent.store")
+    store = JournaledDict(filename)
+    store["config"] = _config("first")
+    store.sync()
+    store["config"] = _config("second")
+    store.sync()
+
+    # Simulate a crash in the middle of appending a record.
+    with open(filename + ".journal", "ab") as f:
+        f.write(b'{"op":"set","key":"config","value":{"type"')
+
+    reloaded = JournaledDict(filename)
+    assert reloaded["config"]["data"] == "second"
+
+    reloaded["new"] = _config("new")
+    reloaded.sync()
+    assert set(JournaledDict(filename)) == {"config", "new"}
+
+
+def test_journal_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(JournaledDict, "compact_threshold", 5)
+    filename = str(tmp_path / "agent.store")
+    store = JournaledDict(filename)
+    for i in range(20):
+        store["config{}".format(i % 3)] = _config(str(i))
+        store.sync()
+
+    with open(filename + ".journal") as f:
+        assert len(f.readlines()) <= 5
+
+    assert dict(JournaledDict(filename)) == dict(store)
+
+    store.compact()
+    assert not os.path.exists(filename + ".journal")
+    with open(filename) as f:
+        assert jsonapi.load(f) == dict(store)
+
+
+def test_journal_empty_store_removes_files(tmp_path):
+    filename = str(tmp_path / "agent.store")
+    store = JournaledDict(filename)
+    store["config"] = _config("first")
+    store.sync()
+    store["config2"] = _config("second")
+    store.sync()
+
+    store.clear()
+    store.sync()
+    assert not os.path.exists(filename)
+    assert not os.path.exists(filename + ".journal")